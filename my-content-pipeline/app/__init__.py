@@ -12,6 +12,16 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from .agent import root_agent
+from typing import Any
 
 __all__ = ["root_agent"]
+
+
+def __getattr__(name: str) -> Any:
+    # The agent graph is imported on first access, so that processes that
+    # only use app.utils (e.g. render workers) do not load it.
+    if name == "root_agent":
+        from .agent import root_agent
+
+        return root_agent
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
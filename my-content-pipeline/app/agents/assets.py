@@ -0,0 +1,365 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Programmatic (non-LLM) generation of a video's images and voiceovers.
+
+`media_planner_agent` plans every section in one structured model call; the
+agent here then generates each section's image and voiceover concurrently
+by calling the tools directly, instead of having a model issue one tool call
+per asset and re-reading the whole article on every turn.
+
+With segment rendering (RENDER_MODE=segments, the default), each section's
+video segment is rendered as soon as both of its assets exist, while other
+sections are still being generated. The video producer then finds every
+segment in the segment cache and only joins them, so a finished video takes
+about as long as the slowest section plus the join, rather than all
+generation followed by a full render. Finished segments are also published
+in order as a progressive HLS preview (app/utils/preview.py), which can be
+played before the whole video exists.
+
+In speculative mode, SpeculativeImageAgent generates images from the outline
+while the article is still being written. AssetProducerAgent then keeps a
+speculative image for each final section whose heading matches an outline
+section, and generates the others as usual. Speculative images that are not
+kept are deleted, so they never show up in the job's artifacts.
+"""
+
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import re
+from collections.abc import AsyncGenerator
+from typing import Any
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from google.adk.tools import ToolContext
+from google.genai import types
+from pydantic import Field
+
+from app.tools import (
+    generate_image,
+    prerender_segment,
+    synthesize_voiceover_with_random_voice,
+)
+from app.tools.multimedia import ENCODING_PROFILE_KEY, RENDER_MODE, RENDITIONS_KEY
+from app.utils.metrics import stage_span
+from app.utils.preview import PROGRESSIVE_PREVIEW, PreviewPublisher, target_duration
+from app.utils.renditions import primary_rendition
+from app.utils.typing import MediaPlan, OutlineImagePlan, SectionPlan
+from app.utils.video import get_encoding_profile
+from app.utils.workspace import get_workspace
+
+logger = logging.getLogger(__name__)
+
+# Image and TTS requests in flight at once for one job.
+ASSET_CONCURRENCY = int(os.getenv("ASSET_CONCURRENCY", "4"))
+
+# Word overlap (Jaccard) between headings above which a speculative image is
+# kept for a final section.
+SPECULATION_MATCH_THRESHOLD = 0.6
+
+SPECULATIVE_IMAGES_KEY = "speculative_images"
+
+
+def _words(text: str) -> set[str]:
+    return set(re.findall(r"[a-z0-9]+", text.lower()))
+
+
+def match_speculative_images(
+    sections: list[SectionPlan],
+    speculative: list[dict[str, Any]],
+    threshold: float = SPECULATION_MATCH_THRESHOLD,
+) -> dict[int, dict[str, Any]]:
+    """Pairs final sections with speculative images generated from the outline.
+
+    Each speculative image is used at most once, for the section whose heading
+    overlaps most with the outline heading it was generated for.
+
+    Args:
+        sections: The final media plan's sections.
+        speculative: Speculative images, each with "heading", "image_path" and
+            the "artifacts" it was saved as.
+        threshold: Minimum heading word overlap for a match.
+
+    Returns:
+        Speculative image per matched section index.
+    """
+    scores = []
+    for i, section in enumerate(sections):
+        heading = _words(section.heading)
+        for j, image in enumerate(speculative):
+            outline_heading = _words(image["heading"])
+            union = heading | outline_heading
+            score = len(heading & outline_heading) / len(union) if union else 0.0
+            if score >= threshold:
+                scores.append((score, i, j))
+    matches: dict[int, dict[str, Any]] = {}
+    used: set[int] = set()
+    # Best overlaps first; ties go to the earlier section and image.
+    for _, i, j in sorted(scores, key=lambda s: (-s[0], s[1], s[2])):
+        if i not in matches and j not in used:
+            matches[i] = speculative[j]
+            used.add(j)
+    return matches
+
+
+async def _tool_result(coro: Any) -> dict[str, Any]:
+    """Awaits a tool call, turning an exception into an error result.
+
+    generate_image raises on Imagen errors, which would otherwise fail the
+    whole job instead of the one section.
+    """
+    try:
+        return await coro
+    except Exception as e:
+        logger.exception("Asset generation failed")
+        return {"status": "error", "message": f"{type(e).__name__}: {e}"}
+
+
+async def _delete_artifacts(ctx: InvocationContext, filenames: list[str]) -> None:
+    """Deletes artifacts of the invocation's session, logging failures."""
+    if ctx.artifact_service is None:
+        return
+    for filename in filenames:
+        try:
+            await ctx.artifact_service.delete_artifact(
+                app_name=ctx.app_name,
+                user_id=ctx.user_id,
+                session_id=ctx.session.id,
+                filename=filename,
+            )
+        except Exception as e:
+            logger.warning("Could not delete artifact %s: %s", filename, e)
+
+
+class AssetProducerAgent(BaseAgent):
+    """Generates the image and voiceover of every section of a media plan."""
+
+    plan_key: str = "media_plan"
+    output_key: str = "multimedia_assets"
+    concurrency: int = Field(default=ASSET_CONCURRENCY, ge=1)
+    # Render each section's segment as soon as its image and audio exist.
+    prerender: bool = RENDER_MODE == "segments"
+    # Publish prerendered segments as a progressive HLS preview.
+    preview: bool = PROGRESSIVE_PREVIEW
+
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        plan = MediaPlan.model_validate(ctx.session.state[self.plan_key])
+        profile = get_encoding_profile(ctx.session.state.get(ENCODING_PROFILE_KEY))
+        renditions = ctx.session.state.get(RENDITIONS_KEY)
+        # Tools record saved artifacts on their context's actions; sharing one
+        # EventActions lets the final event carry all of them.
+        actions = EventActions()
+        tool_context = ToolContext(ctx, event_actions=actions)
+        asset_index = get_workspace(tool_context).assets
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def limited(coro: Any) -> dict[str, Any]:
+            async with semaphore:
+                return await _tool_result(coro)
+
+        prerender_turn = asyncio.Lock()
+
+        speculative = ctx.session.state.get(SPECULATIVE_IMAGES_KEY)
+        reused: dict[int, dict[str, Any]] = {}
+        if speculative is not None:
+            with stage_span("reconcile_speculation", kind="tool") as reconcile:
+                reused = match_speculative_images(plan.sections, speculative)
+                reconcile.add(
+                    speculation_hits=len(reused),
+                    speculation_misses=len(plan.sections) - len(reused),
+                )
+            logger.info(
+                "Reusing %d of %d speculative images for %d sections",
+                len(reused),
+                len(speculative),
+                len(plan.sections),
+            )
+            for image in reused.values():
+                actions.artifact_delta.update(image["artifacts"])
+            used = [image["image_path"] for image in reused.values()]
+            await _delete_artifacts(
+                ctx,
+                [
+                    a
+                    for i in speculative
+                    if i["image_path"] not in used
+                    for a in i["artifacts"]
+                ],
+            )
+
+        async def section_image(i: int, section: SectionPlan) -> dict[str, Any]:
+            if i in reused:
+                return {"status": "success", "image_path": reused[i]["image_path"]}
+            return await limited(generate_image(section.image_prompt, tool_context))
+
+        async def section_assets(
+            i: int, section: SectionPlan
+        ) -> tuple[dict[str, Any], dict[str, Any]]:
+            image, audio = await asyncio.gather(
+                section_image(i, section),
+                limited(
+                    synthesize_voiceover_with_random_voice(
+                        section.transcript, tool_context
+                    )
+                ),
+            )
+            if image.get("status") != "success" or audio.get("status") != "success":
+                if publisher is not None:
+                    await publisher.section_ready(i, None)
+            elif self.prerender:
+                # The job was admitted with one render's share of the pool
+                # (see POST /jobs), so its prerenders take turns and wait for
+                # a worker instead of taking admissions of their own, which
+                # would be rejected once the pool is busy and could crowd out
+                # another job's final render.
+                try:
+                    async with prerender_turn:
+                        segments = await prerender_segment(
+                            image["image_path"],
+                            audio["audio_path"],
+                            profile,
+                            renditions,
+                            asset_index,
+                        )
+                except Exception as e:
+                    # The video producer renders the segment instead; the
+                    # preview skips it rather than wait for it forever.
+                    logger.warning(
+                        "Could not prerender section %r: %s", section.heading, e
+                    )
+                    if publisher is not None:
+                        await publisher.section_ready(i, None)
+                else:
+                    if publisher is not None:
+                        # The preview plays the main rendition.
+                        await publisher.section_ready(
+                            i, segments[primary_rendition(renditions)]
+                        )
+            return image, audio
+
+        publisher: PreviewPublisher | None = None
+        async with contextlib.AsyncExitStack() as stack:
+            if self.prerender and self.preview:
+                publisher = PreviewPublisher(
+                    ctx,
+                    self.name,
+                    len(plan.sections),
+                    target_duration([s.transcript for s in plan.sections]),
+                )
+                stack.callback(publisher.close)
+            gathering = asyncio.ensure_future(
+                asyncio.gather(
+                    *(section_assets(i, s) for i, s in enumerate(plan.sections))
+                )
+            )
+            if publisher is not None:
+                async for event in publisher.stream_until(gathering):
+                    yield event
+            results = await gathering
+
+        sections = []
+        for section, (image, audio) in zip(plan.sections, results, strict=True):
+            failed = [
+                r["message"] for r in (image, audio) if r.get("status") != "success"
+            ]
+            if failed:
+                logger.warning(
+                    "Skipping section %r: %s", section.heading, "; ".join(failed)
+                )
+                continue
+            sections.append(
+                {
+                    **section.model_dump(),
+                    "image_path": image["image_path"],
+                    "audio_path": audio["audio_path"],
+                }
+            )
+        if not sections:
+            raise RuntimeError("No section assets could be generated.")
+
+        assets = {
+            "sections": sections,
+            "image_paths": [s["image_path"] for s in sections],
+            "audio_paths": [s["audio_path"] for s in sections],
+        }
+        actions.state_delta[self.output_key] = assets
+        yield Event(
+            author=self.name,
+            invocation_id=ctx.invocation_id,
+            branch=ctx.branch,
+            content=types.Content(
+                role="model",
+                parts=[types.Part.from_text(text=json.dumps(assets, indent=2))],
+            ),
+            actions=actions,
+        )
+
+
+class SpeculativeImageAgent(BaseAgent):
+    """Generates images from outline sections ahead of the final media plan."""
+
+    plan_key: str = "outline_image_plan"
+    concurrency: int = Field(default=ASSET_CONCURRENCY, ge=1)
+
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        plan = OutlineImagePlan.model_validate(ctx.session.state[self.plan_key])
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def generate(section: Any) -> dict[str, Any] | None:
+            # Each image gets its own actions, to record which artifacts are its own.
+            actions = EventActions()
+            async with semaphore:
+                result = await _tool_result(
+                    generate_image(
+                        section.image_prompt, ToolContext(ctx, event_actions=actions)
+                    )
+                )
+            if result.get("status") != "success":
+                # Speculation is an optimization: the section's image is
+                # generated from the final plan instead.
+                logger.warning(
+                    "No speculative image for %r: %s",
+                    section.heading,
+                    result.get("message"),
+                )
+                return None
+            return {
+                **section.model_dump(),
+                "image_path": result["image_path"],
+                "artifacts": dict(actions.artifact_delta),
+            }
+
+        results = await asyncio.gather(*(generate(s) for s in plan.sections))
+        actions = EventActions()
+        # State only, no content or artifact delta: later stages and the job
+        # should not see these images until reconciliation has picked the
+        # ones that are used (and deleted the others).
+        actions.state_delta[SPECULATIVE_IMAGES_KEY] = [
+            r for r in results if r is not None
+        ]
+        yield Event(
+            author=self.name,
+            invocation_id=ctx.invocation_id,
+            branch=ctx.branch,
+            actions=actions,
+        )
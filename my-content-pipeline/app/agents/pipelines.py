@@ -12,35 +12,78 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from google.adk.agents import SequentialAgent
+import os
+
+from google.adk.agents import BaseAgent, ParallelAgent, SequentialAgent
+
+from app.utils.context import apply_context_budgets
+from app.utils.metrics import append_callback, instrument_pipeline
+from app.utils.workspace import release_workspace_callback
+
 from .specialized import (
-    research_agent,
-    url_extraction_agent,
     analysis_agent,
-    outline_generator_agent,
-    writer_agent,
+    media_planner_agent,
     multimedia_producer_agent,
+    outline_generator_agent,
+    outline_image_planner_agent,
+    query_planner_agent,
+    research_agent,
+    research_merge_agent,
+    speculative_image_agent,
     video_producer_agent,
+    writer_agent,
 )
 
 strategist_agent = SequentialAgent(
-   name="strategist_agent",
-   description="Orchestrates research, URL extraction, analysis, and outline generation.",
-   sub_agents=[
-       research_agent,
-       url_extraction_agent,
-       analysis_agent,
-       outline_generator_agent,
-   ]
+    name="strategist_agent",
+    description="Orchestrates query planning, parallel research, source extraction, analysis, and outline generation.",
+    sub_agents=[
+        query_planner_agent,
+        research_agent,
+        research_merge_agent,
+        analysis_agent,
+        outline_generator_agent,
+    ],
 )
 
+# Optional speculative mode: generate images from the outline while the
+# article is being written, and keep those that match the final sections.
+SPECULATIVE_ASSETS = os.getenv("SPECULATIVE_ASSETS", "").lower() in ("1", "true", "yes")
+
+writing_stage: BaseAgent
+if SPECULATIVE_ASSETS:
+    writing_stage = ParallelAgent(
+        name="writing_stage",
+        description="Writes the article while speculatively generating images from the outline.",
+        sub_agents=[
+            writer_agent,
+            SequentialAgent(
+                name="speculation_agent",
+                description="Plans and generates images from the outline.",
+                sub_agents=[outline_image_planner_agent, speculative_image_agent],
+            ),
+        ],
+    )
+else:
+    writing_stage = writer_agent
+
 content_creation_pipeline = SequentialAgent(
-   name="content_creation_pipeline",
-   description="A full pipeline that takes a topic, researches it, and generates a complete video with a script, images, and voiceover. Use this tool when a user has confirmed a clear and specific request.",
-   sub_agents=[
-       strategist_agent,
-       writer_agent,
-       multimedia_producer_agent,
-       video_producer_agent,
-   ]
+    name="content_creation_pipeline",
+    description="A full pipeline that takes a topic, researches it, and generates a complete video with a script, images, and voiceover. Use this tool when a user has confirmed a clear and specific request.",
+    sub_agents=[
+        strategist_agent,
+        writing_stage,
+        media_planner_agent,
+        multimedia_producer_agent,
+        video_producer_agent,
+    ],
+)
+
+# Record per-stage spans, timings and token usage, plus a summary per job.
+instrument_pipeline(content_creation_pipeline)
+# Delete the local files of runs outside jobs when they end.
+append_callback(
+    content_creation_pipeline, "after_agent_callback", release_workspace_callback
 )
+# Compact earlier stages' output in each stage's prompts to a token budget.
+apply_context_budgets(content_creation_pipeline)
@@ -0,0 +1,174 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Parallel multi-query research.
+
+`query_planner_agent` expands the topic into RESEARCH_QUERIES sub-queries,
+one search agent per query runs concurrently under a ParallelAgent, and
+ResearchMergeAgent then fetches every source page in one batched call,
+drops near-duplicate and boilerplate-heavy pages (app/utils/dedup.py),
+condenses very long pages into bounded digests (app/utils/summarize.py) and
+merges findings and sources in query order, so the result does not depend
+on which search finished first.
+"""
+
+import asyncio
+import logging
+import re
+from collections.abc import AsyncGenerator
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from google.genai import types
+
+from app.tools import extract_contents_from_urls
+from app.utils.dedup import deduplicate_sources
+from app.utils.metrics import stage_span
+from app.utils.summarize import SUMMARIZE_ABOVE_CHARS, summarize_document
+from app.utils.typing import ResearchPlan
+
+logger = logging.getLogger(__name__)
+
+RESEARCH_QUERIES = 3
+MAX_SOURCES = 8
+
+_URL = re.compile(r"https?://[^\s<>()\[\]\"'`]+")
+
+
+def query_key(index: int) -> str:
+    return f"research_query_{index}"
+
+
+def results_key(index: int) -> str:
+    return f"search_results_{index}"
+
+
+def fan_out_queries(callback_context: CallbackContext) -> None:
+    """after_agent_callback that gives each search agent its own query.
+
+    Copies the planned queries into "research_query_<i>" state keys so that
+    they can be templated into the search agents' instructions; if the plan
+    has fewer queries than search agents, the first query is repeated.
+    """
+    plan = ResearchPlan.model_validate(callback_context.state["research_plan"])
+    queries = plan.queries or [""]
+    for i in range(RESEARCH_QUERIES):
+        callback_context.state[query_key(i)] = (
+            queries[i] if i < len(queries) else queries[0]
+        )
+
+
+class ResearchMergeAgent(BaseAgent):
+    """Fetches the sources found by the search agents and merges the results."""
+
+    search_agent_names: list[str]
+    max_sources: int = MAX_SOURCES
+    output_key: str = "research"
+
+    def _source_urls(self, ctx: InvocationContext) -> list[str]:
+        """Source URLs in query order: grounding sources, then URLs in the text."""
+        urls: list[str] = []
+        for i, name in enumerate(self.search_agent_names):
+            for event in ctx.session.events:
+                if event.invocation_id != ctx.invocation_id or event.author != name:
+                    continue
+                for chunk in (
+                    event.grounding_metadata
+                    and event.grounding_metadata.grounding_chunks
+                ) or []:
+                    if chunk.web and chunk.web.uri:
+                        urls.append(chunk.web.uri)
+            text = str(ctx.session.state.get(results_key(i)) or "")
+            urls.extend(url.rstrip(".,;:") for url in _URL.findall(text))
+        return list(dict.fromkeys(urls))[: self.max_sources]
+
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        urls = self._source_urls(ctx)
+        pages = await extract_contents_from_urls(urls) if urls else {}
+
+        lines = ["# Research", "", "## Findings"]
+        for i in range(len(self.search_agent_names)):
+            query = ctx.session.state.get(query_key(i), "")
+            findings = str(ctx.session.state.get(results_key(i)) or "").strip()
+            lines += ["", f"### Query {i + 1}: {query}", findings]
+        lines += ["", "## Sources"]
+        pages = {
+            url: text
+            for url, text in pages.items()
+            if not text.startswith("Error fetching URL")
+        }
+        with stage_span("deduplicate_sources", kind="tool") as dedup:
+            sources = deduplicate_sources(pages)
+            dedup.add(
+                bytes_in=sources.bytes_before,
+                bytes_out=sources.bytes_after,
+                tokens_saved=sources.tokens_dropped,
+            )
+        kept = list(sources.kept.items())
+        long_sources = {
+            n: text
+            for n, (_, text) in enumerate(kept, start=1)
+            if len(text) > SUMMARIZE_ABOVE_CHARS
+        }
+        digests: dict[int, str] = {}
+        if long_sources:
+            with stage_span("summarize_sources", kind="tool") as summarizing:
+                results = await asyncio.gather(
+                    *(summarize_document(text, n) for n, text in long_sources.items()),
+                    return_exceptions=True,
+                )
+                for n, result in zip(long_sources, results, strict=True):
+                    if isinstance(result, BaseException):
+                        # The source goes in whole instead; context budgets
+                        # (app/utils/context.py) compact it if need be.
+                        logger.warning("Could not summarize source [%d]: %s", n, result)
+                    else:
+                        digests[n] = result
+                summarizing.add(
+                    bytes_in=sum(len(long_sources[n].encode()) for n in digests),
+                    bytes_out=sum(len(d.encode()) for d in digests.values()),
+                )
+        for n, (url, text) in enumerate(kept, start=1):
+            if n in digests:
+                lines += [
+                    "",
+                    f"### [{n}] {url} (digest of {len(text)} characters; "
+                    f"[{n}:start-end] cites character offsets in this source)",
+                    digests[n],
+                ]
+            else:
+                lines += ["", f"### [{n}] {url}", text]
+        research = "\n".join(lines)
+        logger.info(
+            "Merged research from %d queries and %d of %d sources (%d bytes, ~%d tokens dropped)",
+            len(self.search_agent_names),
+            len(sources.kept),
+            len(pages),
+            sources.bytes_dropped,
+            sources.tokens_dropped,
+        )
+
+        yield Event(
+            author=self.name,
+            invocation_id=ctx.invocation_id,
+            branch=ctx.branch,
+            content=types.Content(
+                role="model", parts=[types.Part.from_text(text=research)]
+            ),
+            actions=EventActions(state_delta={self.output_key: research}),
+        )
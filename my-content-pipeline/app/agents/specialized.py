@@ -12,30 +12,63 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from google.adk.agents import LlmAgent
+from google.adk.agents import BaseAgent, LlmAgent, ParallelAgent
 from google.adk.tools import google_search
+
 from app.tools import (
-    extract_content_from_url,
     analyze_themes,
-    generate_image,
-    synthesize_voiceover_with_random_voice,
     create_video_from_assets,
 )
+from app.utils.typing import MediaPlan, OutlineImagePlan, ResearchPlan
+
+from .assets import AssetProducerAgent, SpeculativeImageAgent
+from .research import (
+    RESEARCH_QUERIES,
+    ResearchMergeAgent,
+    fan_out_queries,
+    query_key,
+    results_key,
+)
 
-research_agent = LlmAgent(
+query_planner_agent = LlmAgent(
     model="gemini-2.5-flash",
+    name="query_planner_agent",
+    instruction=f"""You are a research planner. Expand the user's topic into exactly {RESEARCH_QUERIES} distinct, specific web search queries that together cover its most important aspects.""",
+    description="Expands the topic into several web search queries.",
+    output_schema=ResearchPlan,
+    output_key="research_plan",
+    disallow_transfer_to_parent=True,
+    disallow_transfer_to_peers=True,
+    after_agent_callback=fan_out_queries,
+)
+
+search_agents: list[BaseAgent] = [
+    LlmAgent(
+        model="gemini-2.5-flash",
+        name=f"search_agent_{i + 1}",
+        instruction=f"""You are a research assistant. Only use the provided tools to find information.
+    Search the web for: {{{query_key(i)}}}
+    Summarize what you found and list the full URL of every source you used.""",
+        description="Performs one web search.",
+        include_contents="none",
+        output_key=results_key(i),
+        tools=[google_search],
+    )
+    for i in range(RESEARCH_QUERIES)
+]
+
+research_agent = ParallelAgent(
     name="research_agent",
-    instruction="You are a research assistant. Only use the provided tools to find information.",
-    description="Performs web research.",
-    tools=[google_search]
+    description="Runs the planned web searches concurrently.",
+    sub_agents=search_agents,
 )
 
-url_extraction_agent = LlmAgent(
-    model="gemini-2.5-flash",
-    name="url_extraction_agent",
-    instruction="You are a research assistant. Only use the provided tools to get content from URLs.",
-    description="Extracts content from URLs.",
-    tools=[extract_content_from_url]
+# Fetches every source page in one batched tool call and merges the results
+# in query order, without a model call.
+research_merge_agent = ResearchMergeAgent(
+    name="research_merge_agent",
+    description="Extracts the content of all sources and merges the research.",
+    search_agent_names=[agent.name for agent in search_agents],
 )
 
 analysis_agent = LlmAgent(
@@ -43,52 +76,89 @@ analysis_agent = LlmAgent(
     name="analysis_agent",
     instruction="You are an analysis expert. Only use the provided tools to identify key themes in text.",
     description="Analyzes text to identify key themes.",
-    tools=[analyze_themes]
+    tools=[analyze_themes],
 )
 
 outline_generator_agent = LlmAgent(
     model="gemini-2.5-flash",
     name="outline_generator_agent",
-    instruction='''You are an expert content strategist. Your task is to take the analyzed information and generate a structured content outline.
+    instruction="""You are an expert content strategist. Your task is to take the analyzed information and generate a structured content outline.
     The outline should include a title, a tone, and a list of sections with headings and key points.
-    Your final output must be a structured content outline.''',
+    Your final output must be a structured content outline.""",
     description="Generates a structured content outline from analyzed data.",
     output_key="content_outline",
 )
 
 writer_agent = LlmAgent(
-   model="gemini-2.5-flash",
-   name="writer_agent",
-   instruction='''You are an expert content writer specializing in technology topics. Your task is to take a structured outline provided in the session state under the key 'content_outline' and write a full, engaging, and technically accurate article based on it. Adhere strictly to the professional and informative tone specified in the outline. Your final output must be a single string of well-formatted text, ready for publication.''',
-   description="Transforms a structured content outline into a complete, well-written article.",
-   output_key="draft_article"
+    model="gemini-2.5-flash",
+    name="writer_agent",
+    instruction="""You are an expert content writer specializing in technology topics. Your task is to take a structured outline provided in the session state under the key 'content_outline' and write a full, engaging, and technically accurate article based on it. Adhere strictly to the professional and informative tone specified in the outline. Your final output must be a single string of well-formatted text, ready for publication.""",
+    description="Transforms a structured content outline into a complete, well-written article.",
+    output_key="draft_article",
+)
+
+media_planner_agent = LlmAgent(
+    model="gemini-2.5-flash",
+    name="media_planner_agent",
+    instruction="""You are a multimedia producer. Your task is to plan a rich, synchronized visual and auditory experience based on the article below.
+
+    Break the article down into 8 to 12 logical, thematic sections. For each section, provide:
+    -   **heading:** a short title for the section; where the article has its own section headings, use them verbatim.
+    -   **transcript:** the exact text of that section to be narrated as a voiceover.
+    -   **image_prompt:** a unique, highly descriptive prompt that captures the essence of the section's text, for generating a visually compelling image.
+
+    Plan every section in this single response; the images and voiceovers are generated from your plan afterwards.
+
+    Article:
+    {draft_article}""",
+    description="Plans the transcript and image prompt of every section of an article in one structured response.",
+    include_contents="none",
+    output_schema=MediaPlan,
+    disallow_transfer_to_parent=True,
+    disallow_transfer_to_peers=True,
+    output_key="media_plan",
 )
 
-multimedia_producer_agent = LlmAgent(
+# Speculative mode: plans and generates images from the outline while the
+# article is being written (see app/agents/assets.py).
+outline_image_planner_agent = LlmAgent(
     model="gemini-2.5-flash",
+    name="outline_image_planner_agent",
+    instruction="""You are a multimedia producer. The article for the outline below is still being written; plan one image per outline section now so that images can be generated in the meantime.
+
+    For each section of the outline, provide:
+    -   **heading:** the section's heading, exactly as in the outline.
+    -   **image_prompt:** a unique, highly descriptive prompt that captures the essence of the section's key points, for generating a visually compelling image.
+
+    Outline:
+    {content_outline}""",
+    description="Plans an image per outline section ahead of the article.",
+    include_contents="none",
+    output_schema=OutlineImagePlan,
+    output_key="outline_image_plan",
+    disallow_transfer_to_parent=True,
+    disallow_transfer_to_peers=True,
+)
+
+speculative_image_agent = SpeculativeImageAgent(
+    name="speculative_image_agent",
+    description="Generates images for the outline sections ahead of the article.",
+)
+
+# Generates the planned images and voiceovers concurrently, without further
+# model calls; the result is stored under "multimedia_assets".
+multimedia_producer_agent = AssetProducerAgent(
     name="multimedia_producer_agent",
-    instruction='''You are a multimedia producer. Your primary task is to create a rich, synchronized visual and auditory experience based on the provided article.
-
-    Your process is as follows:
-    1.  **Deconstruct the Article:** Break the draft article down into 8 to 12 logical, thematic sections or paragraphs.
-    2.  **Iterate and Generate:** For each section, perform the following two steps:
-        a.  **Generate Image:** Create a unique, highly descriptive prompt that captures the essence of the section's text and use it to generate a visually compelling image.
-        b.  **Generate Audio:** Synthesize a voiceover for the text of that section only.
-    3.  **Store Results:** For each section, you must store the image prompt, the resulting image URL, the audio URL, and the transcript text together.
-    
-    Only use the provided tools for these tasks. Your final output must be a structured collection of all the generated multimedia assets.''',
-    description="Generates a synchronized set of 8-12 images and audio clips from an article, including transcripts and image prompts.",
-    output_key="multimedia_assets",
-    tools=[generate_image, synthesize_voiceover_with_random_voice]
+    description="Generates a synchronized set of images and audio clips from a media plan, including transcripts and image prompts.",
 )
 
 video_producer_agent = LlmAgent(
     model="gemini-2.5-flash",
     name="video_producer_agent",
-    instruction='''You are a video producer. Your task is to take the structured multimedia assets, which include lists of image paths and corresponding audio paths, and create a single, synchronized video.
+    instruction="""You are a video producer. Your task is to take the structured multimedia assets, which include lists of image paths and corresponding audio paths, and create a single, synchronized video.
     You must use the create_video_from_assets tool, passing the list of image paths and the list of audio paths to it.
-    Your final output should be the path to the generated video.''',
+    Your final output should be the path to the generated video.""",
     description="Creates a synchronized video from a collection of images and audio clips.",
     output_key="video_path",
-    tools=[create_video_from_assets]
+    tools=[create_video_from_assets],
 )
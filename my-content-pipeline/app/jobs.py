@@ -0,0 +1,311 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Background jobs that run the content pipeline on a confirmed topic.
+
+The chat flow (`/run_sse`) keeps the coordinator in the loop and holds a
+stream open for the whole run. Jobs instead run `content_creation_pipeline`
+directly in a background task, so clients submit once, poll for progress
+and download artifacts when the job is done.
+
+A job may be rendered with the fast "draft" encoding profile for review;
+approving it renders the final video from the same images and narration,
+without running the pipeline again.
+
+Files a job writes locally live in its workspace (app/utils/workspace.py).
+The workspace is released when the job fails, when its final video has been
+rendered, when a succeeded job is not approved within JOB_APPROVAL_WINDOW_S
+and when the job is forgotten.
+"""
+
+import asyncio
+import logging
+import os
+import time
+import uuid
+from collections.abc import AsyncIterator
+
+from google.adk.agents import BaseAgent
+from google.adk.artifacts import BaseArtifactService
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from app.tools.multimedia import (
+    ENCODING_PROFILE_KEY,
+    RENDITIONS_KEY,
+    render_video_files,
+)
+from app.utils.bundle import artifact_chunks, package_entries, stream_zip
+from app.utils.metrics import abort_job
+from app.utils.preview import PREVIEW_PLAYLIST
+from app.utils.renditions import primary_rendition, rendition_slug
+from app.utils.typing import JobRequest, JobStatus
+from app.utils.video import get_encoding_profile
+from app.utils.workspace import get_workspace_manager
+
+logger = logging.getLogger(__name__)
+
+APP_NAME = "app"
+MAX_FINISHED_JOBS = 500
+# How long a succeeded job keeps the images and narration approving it
+# renders from.
+APPROVAL_WINDOW_S = float(os.environ.get("JOB_APPROVAL_WINDOW_S", 60 * 60))
+
+
+class JobManager:
+    """Runs pipeline jobs in the background and tracks their status."""
+
+    def __init__(
+        self,
+        agent: BaseAgent,
+        artifact_service: BaseArtifactService,
+        app_name: str = APP_NAME,
+        approval_window_s: float = APPROVAL_WINDOW_S,
+    ) -> None:
+        """
+        Initialize the manager.
+
+        Args:
+            agent: The pipeline agent each job runs.
+            artifact_service: Where tools save the job's artifacts.
+            app_name: App name used for sessions and artifacts.
+            approval_window_s: How long a succeeded job can be approved
+                before its workspace is released.
+        """
+        self.app_name = app_name
+        self.approval_window_s = approval_window_s
+        self.session_service = InMemorySessionService()
+        self.artifact_service = artifact_service
+        self.runner = Runner(
+            app_name=app_name,
+            agent=agent,
+            session_service=self.session_service,
+            artifact_service=artifact_service,
+        )
+        self.jobs: dict[str, JobStatus] = {}
+        self._tasks: dict[str, asyncio.Task] = {}
+
+    async def submit(self, request: JobRequest) -> JobStatus:
+        """Creates a job and starts running it in the background.
+
+        Args:
+            request: The topic to produce content for.
+
+        Returns:
+            The status of the newly queued job.
+        """
+        job_id = str(uuid.uuid4())
+        profile = get_encoding_profile(request.profile).name
+        state: dict[str, object] = {"job_id": job_id, ENCODING_PROFILE_KEY: profile}
+        renditions: list[str] | None = (
+            list(dict.fromkeys(request.renditions)) if request.renditions else None
+        )
+        if renditions:
+            state[RENDITIONS_KEY] = renditions
+        session = await self.session_service.create_session(
+            app_name=self.app_name, user_id=request.user_id, state=state
+        )
+        job = JobStatus(
+            job_id=job_id,
+            user_id=request.user_id,
+            session_id=session.id,
+            created_at=time.time(),
+            profile=profile,
+            renditions=renditions,
+        )
+        self.jobs[job_id] = job
+        task = asyncio.create_task(self._run(job, request.topic))
+        self._tasks[job_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job_id, None))
+        self._prune()
+        return job
+
+    async def approve(self, job: JobStatus, profile: str) -> JobStatus:
+        """Starts the final render of a succeeded job in the background.
+
+        Args:
+            job: The job whose video was approved.
+            profile: Encoding profile of the final video.
+
+        Returns:
+            The job status, with the final render running.
+
+        Raises:
+            ValueError: If the job has not succeeded, has no assets to render
+                or its final render is already running.
+        """
+        if job.status != "succeeded":
+            raise ValueError(
+                f"Job is {job.status}; only succeeded jobs can be approved"
+            )
+        if job.final_render == "running":
+            raise ValueError("The final render is already running")
+        session = await self.session_service.get_session(
+            app_name=self.app_name, user_id=job.user_id, session_id=job.session_id
+        )
+        assets = session.state.get("multimedia_assets") if session else None
+        if not assets:
+            raise ValueError("Job has no assets to render")
+        if not all(
+            os.path.exists(p) for p in [*assets["image_paths"], *assets["audio_paths"]]
+        ):
+            raise ValueError("Job assets are no longer available")
+        encoding = get_encoding_profile(profile)
+        job.final_render = "running"
+        key = f"{job.job_id}:final"
+        task = asyncio.create_task(self._render_final(job, assets, encoding.name))
+        self._tasks[key] = task
+        task.add_done_callback(lambda _: self._tasks.pop(key, None))
+        return job
+
+    @property
+    def active_jobs(self) -> int:
+        """Number of jobs and final renders started and not yet finished."""
+        return len(self._tasks)
+
+    def get(self, job_id: str) -> JobStatus | None:
+        """Returns the job's current status, or None if it is unknown."""
+        return self.jobs.get(job_id)
+
+    async def load_artifact(self, job: JobStatus, filename: str) -> types.Part | None:
+        """Loads the latest version of one of the job's artifacts."""
+        return await self.artifact_service.load_artifact(
+            app_name=self.app_name,
+            user_id=job.user_id,
+            session_id=job.session_id,
+            filename=filename,
+        )
+
+    async def bundle(self, job: JobStatus) -> AsyncIterator[bytes]:
+        """Streams the job's package as a ZIP archive (see app/utils/bundle.py).
+
+        Raises:
+            ValueError: If the job has not succeeded.
+        """
+        if job.status != "succeeded":
+            raise ValueError(
+                f"Job is {job.status}; only succeeded jobs can be exported"
+            )
+        session = await self.session_service.get_session(
+            app_name=self.app_name, user_id=job.user_id, session_id=job.session_id
+        )
+
+        def open_artifact(filename: str) -> AsyncIterator[bytes]:
+            return artifact_chunks(
+                self.artifact_service,
+                app_name=self.app_name,
+                user_id=job.user_id,
+                session_id=job.session_id,
+                filename=filename,
+            )
+
+        entries = package_entries(
+            session.state if session else {},
+            list(job.artifacts),
+            open_artifact,
+            job=job.model_dump(
+                include={"job_id", "created_at", "profile", "renditions", "final_video"}
+            ),
+        )
+        return stream_zip(entries)
+
+    async def _run(self, job: JobStatus, topic: str) -> None:
+        job.status = "running"
+        job.started_at = time.time()
+        message = types.Content(role="user", parts=[types.Part.from_text(text=topic)])
+        workspaces = get_workspace_manager()
+        try:
+            with workspaces.get(job.job_id).in_use():
+                async for event in self.runner.run_async(
+                    user_id=job.user_id, session_id=job.session_id, new_message=message
+                ):
+                    if event.error_message:
+                        raise RuntimeError(event.error_message)
+                    job.stage = event.author
+                    for filename in event.actions.artifact_delta:
+                        if filename not in job.artifacts:
+                            job.artifacts.append(filename)
+                        if filename == PREVIEW_PLAYLIST:
+                            job.preview = filename
+            job.status = "succeeded"
+            asyncio.get_running_loop().call_later(
+                self.approval_window_s, self._expire_approval, job
+            )
+        except Exception as e:
+            logger.exception("Job %s failed", job.job_id)
+            abort_job(str(e))
+            job.status = "failed"
+            job.error = str(e)
+            workspaces.release(job.job_id)
+        finally:
+            job.finished_at = time.time()
+            session = await self.session_service.get_session(
+                app_name=self.app_name, user_id=job.user_id, session_id=job.session_id
+            )
+            if session is not None:
+                job.metrics = session.state.get("job_metrics")
+
+    async def _render_final(self, job: JobStatus, assets: dict, profile: str) -> None:
+        workspaces = get_workspace_manager()
+        try:
+            with workspaces.get(job.job_id).in_use() as workspace:
+                video_paths = await render_video_files(
+                    assets["image_paths"],
+                    assets["audio_paths"],
+                    get_encoding_profile(profile),
+                    workspace,
+                    job.renditions,
+                )
+            primary = primary_rendition(job.renditions)
+            for rendition, video_path in video_paths.items():
+                with open(video_path, "rb") as f:
+                    video_bytes = f.read()
+                workspace.remove(video_path)
+                if rendition == primary:
+                    filename = f"video_{profile}_{uuid.uuid4()}.mp4"
+                else:
+                    filename = f"video_{profile}_{rendition_slug(rendition)}_{uuid.uuid4()}.mp4"
+                await self.artifact_service.save_artifact(
+                    app_name=self.app_name,
+                    user_id=job.user_id,
+                    session_id=job.session_id,
+                    filename=filename,
+                    artifact=types.Part.from_bytes(
+                        data=video_bytes, mime_type="video/mp4"
+                    ),
+                )
+                job.artifacts.append(filename)
+                if rendition == primary:
+                    job.final_video = filename
+            job.final_render = "succeeded"
+            # The approved job is done with its images and narration.
+            workspaces.release(job.job_id)
+        except Exception as e:
+            logger.exception("Final render of job %s failed", job.job_id)
+            job.final_render = "failed"
+            job.error = str(e)
+
+    def _expire_approval(self, job: JobStatus) -> None:
+        """Releases the workspace of a job that was not approved in time."""
+        if job.final_render != "running":
+            get_workspace_manager().release(job.job_id)
+
+    def _prune(self) -> None:
+        """Forgets the oldest finished jobs beyond MAX_FINISHED_JOBS."""
+        finished = [j for j in self.jobs.values() if j.finished_at is not None]
+        finished.sort(key=lambda j: j.finished_at or 0)
+        for job in finished[: max(len(finished) - MAX_FINISHED_JOBS, 0)]:
+            del self.jobs[job.job_id]
+            get_workspace_manager().release(job.job_id)
@@ -12,50 +12,214 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import asyncio
+import contextlib
+import importlib
 import os
+from collections.abc import AsyncIterator
 
 import google.auth
-from fastapi import FastAPI
-from google.adk.cli.fast_api import get_fast_api_app
+from fastapi import FastAPI, HTTPException, Response
+from fastapi.responses import (
+    FileResponse,
+    JSONResponse,
+    PlainTextResponse,
+    RedirectResponse,
+    StreamingResponse,
+)
+from google.adk.auth.credential_service.in_memory_credential_service import (
+    InMemoryCredentialService,
+)
+from google.adk.cli import fast_api as adk_fast_api
+from google.adk.cli.adk_web_server import AdkWebServer
+from google.adk.cli.utils.agent_loader import AgentLoader
+from google.adk.evaluation.local_eval_set_results_manager import (
+    LocalEvalSetResultsManager,
+)
+from google.adk.evaluation.local_eval_sets_manager import LocalEvalSetsManager
+from google.adk.memory import InMemoryMemoryService
+from google.adk.sessions import InMemorySessionService
 from google.cloud import logging as google_cloud_logging
-from opentelemetry import trace
+from opentelemetry import metrics, trace
 from opentelemetry.sdk.trace import TracerProvider, export
 
-from app.utils.gcs import create_bucket_if_not_exists
+from app.jobs import JobManager
+from app.utils.delivery import (
+    LOCAL_DELIVERY_PATH,
+    DeliveryUnavailable,
+    LocalDelivery,
+    create_delivery,
+    delivered,
+)
+from app.utils.gcs import (
+    ContentAddressedGcsArtifactService,
+    create_bucket_if_not_exists,
+)
+from app.utils.metrics import meter_provider, render_prometheus
+from app.utils.render_pool import get_render_pool
+from app.utils.startup import Startup, process_started_at
 from app.utils.tracing import CloudTraceLoggingSpanExporter
-from app.utils.typing import Feedback
+from app.utils.typing import ApprovalRequest, Feedback, JobRequest, JobStatus
+
+# Load tests run the server against local fakes instead of Vertex AI. Images
+# are built without them unless built for load tests (see the Dockerfile), in
+# which case this import fails rather than the fakes being installed.
+if os.getenv("FAKE_MODEL_BACKENDS"):
+    from app.utils.fake_backends import FakeBackendConfig, install_fake_backends
+
+    install_fake_backends(FakeBackendConfig.from_env())
 
-_, project_id = google.auth.default()
-logging_client = google_cloud_logging.Client()
-logger = logging_client.logger(__name__)
 allow_origins = (
     os.getenv("ALLOW_ORIGINS", "").split(",") if os.getenv("ALLOW_ORIGINS") else None
 )
 
-bucket_name = f"gs://{project_id}-my-content-pipeline-logs-data"
-create_bucket_if_not_exists(
-    bucket_name=bucket_name, project=project_id, location="us-central1"
-)
-
+# Spans are exported once the tracing startup check has added the exporter.
 provider = TracerProvider()
-processor = export.BatchSpanProcessor(CloudTraceLoggingSpanExporter())
-provider.add_span_processor(processor)
 trace.set_tracer_provider(provider)
+metrics.set_meter_provider(meter_provider)
+
+JOB_RETRY_AFTER_SECONDS = 30
+
+_project_id: str | None = os.getenv("GOOGLE_CLOUD_PROJECT")
+_feedback_logger: google_cloud_logging.Logger | None = None
+_job_manager: JobManager | None = None
+
+
+def get_project_id() -> str:
+    """Returns the project, from GOOGLE_CLOUD_PROJECT or else the credentials.
+
+    Raises:
+        RuntimeError: If neither names a project.
+    """
+    global _project_id
+    if _project_id is None:
+        # Can take a metadata server round trip, so not done at import.
+        _, _project_id = google.auth.default()
+        if _project_id is None:
+            raise RuntimeError(
+                "No Google Cloud project found; set GOOGLE_CLOUD_PROJECT"
+            )
+    return _project_id
+
+
+def get_bucket_name() -> str:
+    """Returns the bucket holding the artifacts."""
+    return f"{get_project_id()}-my-content-pipeline-logs-data"
+
+
+def get_feedback_logger() -> google_cloud_logging.Logger:
+    """Returns the Cloud Logging logger feedback is written to."""
+    global _feedback_logger
+    if _feedback_logger is None:
+        _feedback_logger = google_cloud_logging.Client(project=get_project_id()).logger(
+            __name__
+        )
+    return _feedback_logger
+
+
+def _create_bucket() -> None:
+    create_bucket_if_not_exists(
+        bucket_name=get_bucket_name(), project=get_project_id(), location="us-central1"
+    )
+    # Creates the artifact service's storage client, resolving the credentials,
+    # here rather than on the first request.
+    _ = artifact_service.bucket
+
+
+def _export_traces() -> None:
+    provider.add_span_processor(
+        export.BatchSpanProcessor(CloudTraceLoggingSpanExporter())
+    )
+
+
+def _warm_imports() -> None:
+    # Libraries the pipeline's tools import on first use.
+    for module in ("gensim.models", "sklearn.feature_extraction.text"):
+        importlib.import_module(module)
+
+
+def _load_pipeline() -> None:
+    global _job_manager
+    # Building the pipeline's agents imports their tools, so it is left to
+    # the lifespan rather than done at import.
+    from app.agents.pipelines import content_creation_pipeline
+
+    _job_manager = JobManager(
+        agent=content_creation_pipeline, artifact_service=artifact_service
+    )
+
+
+def get_job_manager() -> JobManager:
+    """Returns the job manager, once the pipeline has loaded.
+
+    Raises:
+        HTTPException: 503 while the pipeline is still loading.
+    """
+    if _job_manager is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Server is starting, retry later",
+            headers={"Retry-After": str(JOB_RETRY_AFTER_SECONDS)},
+        )
+    return _job_manager
+
+
+startup = Startup(started_at=process_started_at())
+startup.add("pipeline", _load_pipeline)
+startup.add("artifact_bucket", _create_bucket)
+startup.add("cloud_logging", get_feedback_logger, required=False)
+startup.add("tracing", _export_traces, required=False)
+startup.add("warm_imports", _warm_imports, required=False)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Runs the startup checks in the background while the server starts serving."""
+    checks = asyncio.create_task(startup.run())
+    yield
+    checks.cancel()
+
 
 AGENT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-# In-memory session configuration - no persistent storage
-session_service_uri = None
+# Jobs store each distinct image, narration and video once in the bucket.
+artifact_service = ContentAddressedGcsArtifactService(get_bucket_name)
 
-app: FastAPI = get_fast_api_app(
+# get_fast_api_app can only build an artifact service from a URI, so its web
+# server is assembled here, to serve the artifacts the jobs write.
+adk_web_server = AdkWebServer(
+    agent_loader=AgentLoader(AGENT_DIR),
+    # In-memory session configuration - no persistent storage
+    session_service=InMemorySessionService(),
+    memory_service=InMemoryMemoryService(),
+    artifact_service=artifact_service,
+    credential_service=InMemoryCredentialService(),
+    eval_sets_manager=LocalEvalSetsManager(agents_dir=AGENT_DIR),
+    eval_set_results_manager=LocalEvalSetResultsManager(agents_dir=AGENT_DIR),
     agents_dir=AGENT_DIR,
-    web=True,
-    artifact_service_uri=bucket_name,
+)
+app: FastAPI = adk_web_server.get_fast_api_app(
+    lifespan=lifespan,
     allow_origins=allow_origins,
-    session_service_uri=session_service_uri,
+    web_assets_dir=os.path.join(os.path.dirname(adk_fast_api.__file__), "browser"),
 )
 app.title = "my-content-pipeline"
 app.description = "API for interacting with the Agent my-content-pipeline"
 
+# Media downloads are redirected to short-lived URLs unless ARTIFACT_DELIVERY is "proxy".
+artifact_delivery = create_delivery(artifact_service)
+
+
+@app.get("/readyz")
+def readiness() -> JSONResponse:
+    """Report whether the server's dependencies are ready, for readiness probes.
+
+    Returns:
+        The startup checks and cold start timing; status 503 until the
+        required checks have succeeded
+    """
+    report = startup.report()
+    return JSONResponse(report, status_code=200 if report["ready"] else 503)
+
 
 @app.post("/feedback")
 def collect_feedback(feedback: Feedback) -> dict[str, str]:
@@ -67,10 +231,183 @@ def collect_feedback(feedback: Feedback) -> dict[str, str]:
     Returns:
         Success message
     """
-    logger.log_struct(feedback.model_dump(), severity="INFO")
+    get_feedback_logger().log_struct(feedback.model_dump(), severity="INFO")
     return {"status": "success"}
 
 
+@app.post("/jobs", status_code=202)
+async def submit_job(request: JobRequest) -> JobStatus:
+    """Start the content pipeline for a topic in the background.
+
+    Args:
+        request: The topic and the user submitting it
+
+    Returns:
+        The status of the queued job
+    """
+    job_manager = get_job_manager()
+    # Every job ends in a render, so admitting more jobs than the render pool
+    # can hold would only move the rejection to the end of a long job.
+    if job_manager.active_jobs >= get_render_pool().capacity:
+        raise HTTPException(
+            status_code=503,
+            detail="Render capacity exhausted, retry later",
+            headers={"Retry-After": str(JOB_RETRY_AFTER_SECONDS)},
+        )
+    return await job_manager.submit(request)
+
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str) -> JobStatus:
+    """Report a job's progress, artifacts and, once finished, its metrics.
+
+    Args:
+        job_id: The ID returned when the job was submitted
+
+    Returns:
+        The job status
+    """
+    job = get_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@app.post("/jobs/{job_id}/approve", status_code=202)
+async def approve_job(job_id: str, request: ApprovalRequest) -> JobStatus:
+    """Approve a job's (draft) video and render the final video in the background.
+
+    Args:
+        job_id: The ID returned when the job was submitted
+        request: The encoding profile of the final video
+
+    Returns:
+        The job status, with `final_render` running
+    """
+    job_manager = get_job_manager()
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if get_render_pool().saturated:
+        raise HTTPException(
+            status_code=503,
+            detail="Render capacity exhausted, retry later",
+            headers={"Retry-After": str(JOB_RETRY_AFTER_SECONDS)},
+        )
+    try:
+        return await job_manager.approve(job, request.profile)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e)) from e
+
+
+@app.get("/jobs/{job_id}/artifacts/{filename}")
+async def download_job_artifact(job_id: str, filename: str) -> Response:
+    """Download one of a job's artifacts.
+
+    With an artifact delivery mode set, media artifacts redirect to a
+    short-lived URL rather than passing through the API, when the delivery
+    can make one.
+
+    Args:
+        job_id: The job that produced the artifact
+        filename: The artifact name listed in the job status
+
+    Returns:
+        The artifact bytes with their MIME type, or a redirect to them
+    """
+    job_manager = get_job_manager()
+    job = job_manager.get(job_id)
+    if (
+        artifact_delivery is not None
+        and job
+        and filename in job.artifacts
+        and delivered(filename)
+    ):
+        try:
+            delivery_url = await artifact_delivery.url(
+                app_name=job_manager.app_name,
+                user_id=job.user_id,
+                session_id=job.session_id,
+                filename=filename,
+            )
+        except FileNotFoundError as e:
+            raise HTTPException(status_code=404, detail="Artifact not found") from e
+        except DeliveryUnavailable:
+            delivery_url = None
+        if delivery_url is not None:
+            return RedirectResponse(delivery_url.url, status_code=307)
+    part = await job_manager.load_artifact(job, filename) if job else None
+    if part is None or part.inline_data is None:
+        raise HTTPException(status_code=404, detail="Artifact not found")
+    return Response(
+        content=part.inline_data.data, media_type=part.inline_data.mime_type
+    )
+
+
+@app.get("/jobs/{job_id}/bundle")
+async def download_job_bundle(job_id: str) -> StreamingResponse:
+    """Download a job's article, videos, images, narration, prompts and transcripts as one ZIP.
+
+    The archive is streamed from the artifact store as it is written, so it
+    is never held in memory as a whole.
+
+    Args:
+        job_id: The ID returned when the job was submitted
+
+    Returns:
+        The ZIP archive
+    """
+    job_manager = get_job_manager()
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    try:
+        archive = await job_manager.bundle(job)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e)) from e
+    return StreamingResponse(
+        archive,
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{job_id}.zip"'},
+    )
+
+
+@app.get(LOCAL_DELIVERY_PATH + "/{key}/{filename}")
+def download_delivered_artifact(
+    key: str, filename: str, expires: str, signature: str
+) -> FileResponse:
+    """Serve an artifact copied out by local delivery (ARTIFACT_DELIVERY=local).
+
+    Args:
+        key: The artifact version's key in the delivery URL
+        filename: The artifact name
+        expires: Expiry of the URL, in seconds since the epoch
+        signature: Signature of the URL
+
+    Returns:
+        The artifact file
+    """
+    if not isinstance(artifact_delivery, LocalDelivery):
+        raise HTTPException(status_code=404, detail="Not found")
+    try:
+        path = artifact_delivery.resolve(key, filename, expires, signature)
+    except PermissionError as e:
+        raise HTTPException(status_code=403, detail=str(e)) from e
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail="Artifact not found") from e
+    return FileResponse(path)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics() -> str:
+    """Expose pipeline stage, tool and render metrics.
+
+    Returns:
+        Metrics in the Prometheus text exposition format
+    """
+    return render_prometheus()
+
+
 # Main execution
 if __name__ == "__main__":
     import uvicorn
@@ -1,19 +1,22 @@
-from .web import extract_content_from_url
 from .analysis import analyze_themes
+from .markdown import convert_to_markdown
 from .multimedia import (
+    create_video_from_assets,
     generate_image,
+    prerender_segment,
     synthesize_voiceover,
     synthesize_voiceover_with_random_voice,
-    create_video_from_assets,
 )
-from .markdown import convert_to_markdown
+from .web import extract_content_from_url, extract_contents_from_urls
 
 __all__ = [
-    "extract_content_from_url",
     "analyze_themes",
+    "convert_to_markdown",
+    "create_video_from_assets",
+    "extract_content_from_url",
+    "extract_contents_from_urls",
     "generate_image",
+    "prerender_segment",
     "synthesize_voiceover",
     "synthesize_voiceover_with_random_voice",
-    "create_video_from_assets",
-    "convert_to_markdown",
 ]
@@ -1,8 +1,7 @@
-import gensim
-from gensim.corpora import Dictionary
-from gensim.models import LdaModel
-from sklearn.feature_extraction.text import CountVectorizer
+from app.utils.metrics import instrumented_tool, record_usage
 
+
+@instrumented_tool
 def analyze_themes(text: str, num_topics: int = 5, num_words: int = 5) -> str:
     """
     Analyzes the themes of a given text using LDA topic modeling.
@@ -15,14 +14,22 @@ def analyze_themes(text: str, num_topics: int = 5, num_words: int = 5) -> str:
     Returns:
         A string containing the extracted themes.
     """
+    # gensim and scikit-learn take about a second to import, so they are
+    # loaded on first use (or by the server's startup warm-up), not when
+    # the agents are.
+    import gensim
+    from gensim.models import LdaModel
+    from sklearn.feature_extraction.text import CountVectorizer
+
+    record_usage(bytes_in=len(text.encode()))
     try:
         # Preprocess the text
-        vectorizer = CountVectorizer(stop_words='english')
+        vectorizer = CountVectorizer(stop_words="english")
         data_vectorized = vectorizer.fit_transform([text])
 
         # Create a dictionary and corpus
         corpus = gensim.matutils.Sparse2Corpus(data_vectorized, documents_columns=False)
-        id2word = dict((v, k) for k, v in vectorizer.vocabulary_.items())
+        id2word = {v: k for k, v in vectorizer.vocabulary_.items()}
 
         # Build the LDA model
         lda = LdaModel(corpus=corpus, id2word=id2word, num_topics=num_topics)
@@ -32,4 +39,4 @@ def analyze_themes(text: str, num_topics: int = 5, num_words: int = 5) -> str:
 
         return str(topics)
     except Exception as e:
-        return f"Error analyzing themes: {e}"
\ No newline at end of file
+        return f"Error analyzing themes: {e}"
@@ -1,5 +1,9 @@
 from markdownify import markdownify as md
 
+from app.utils.metrics import instrumented_tool
+
+
+@instrumented_tool
 def convert_to_markdown(text: str, image_urls: list[str]) -> str:
     """
     Converts a given text to Markdown and embeds images.
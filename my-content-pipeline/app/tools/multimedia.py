@@ -1,150 +1,624 @@
+import asyncio
 import logging
 import os
-import uuid
 import random
+import uuid
 from typing import Any
 
-from google.cloud import texttospeech
 from google.adk.tools import ToolContext
+from google.cloud import texttospeech
+from PIL import Image
 from vertexai.generative_models import Part
-from vertexai.vision_models import ImageGenerationModel
-from moviepy import ImageClip, concatenate_videoclips, AudioFileClip, concatenate_audioclips
+
+from app.utils.asset_index import AssetIndex
+from app.utils.backends import get_image_model, get_tts_client
+from app.utils.images import DELIVERY_EXTENSION, DELIVERY_MIME_TYPE, normalize_image
+from app.utils.loudness import LOUDNESS_NORMALIZATION, join_voiceover
+from app.utils.metrics import StageRecord, instrumented_tool, record_usage, stage_span
+from app.utils.render_pool import RenderPool, get_render_pool
+from app.utils.renditions import (
+    PRIMARY_RENDITION,
+    RENDITIONS,
+    primary_rendition,
+    render_renditions,
+    rendition_frame_size,
+    rendition_slug,
+    video_artifact_name,
+)
+from app.utils.segment_cache import get_segment_cache
+from app.utils.video import (
+    EncodingProfile,
+    concat_segments,
+    get_encoding_profile,
+    render_segment,
+    render_video,
+)
+from app.utils.workspace import Workspace, get_workspace
 
 logger = logging.getLogger(__name__)
 
+# "segments" renders each section separately (in parallel, cached) and joins
+# them with a stream copy; "timeline" encodes the whole video in one pass.
+RENDER_MODE = os.getenv("RENDER_MODE", "segments")
+
+# Session state key naming the job's encoding profile (see
+# app.utils.video.ENCODING_PROFILES); unset means the default profile.
+ENCODING_PROFILE_KEY = "encoding_profile"
+# Session state key listing the renditions to render (keys of
+# app.utils.renditions.RENDITIONS); unset renders only the main video, at
+# the images' own aspect ratio.
+RENDITIONS_KEY = "renditions"
+
 # Voice lists updated for the standard Text-to-Speech API
-female_voices = ["en-US-Wavenet-F", "en-US-Wavenet-H", "en-US-Neural2-C", "en-GB-Neural2-F"]
-male_voices = ['en-US-Wavenet-D', 'en-US-Wavenet-J', 'en-US-Neural2-I', 'en-GB-Neural2-D']
+female_voices = [
+    "en-US-Wavenet-F",
+    "en-US-Wavenet-H",
+    "en-US-Neural2-C",
+    "en-GB-Neural2-F",
+]
+male_voices = [
+    "en-US-Wavenet-D",
+    "en-US-Wavenet-J",
+    "en-US-Neural2-I",
+    "en-GB-Neural2-D",
+]
 
-image_model = ImageGenerationModel.from_pretrained("imagen-3.0-fast-generate-001")
 
+@instrumented_tool
 async def generate_image(prompt: str, tool_context: ToolContext) -> dict[str, Any]:
     """
     Generates an image based on the given prompt.
+
+    The source PNG is kept in the job workspace for rendering; the artifact
+    is a compressed delivery copy, saved with a thumbnail (see
+    app/utils/images.py).
     """
     logger.info("Generating image for prompt: %s", prompt)
-    images = image_model.generate_images(
+    images = await asyncio.to_thread(
+        get_image_model().generate_images,
         prompt=prompt,
         number_of_images=1,
         aspect_ratio="16:9",
     )
     image_bytes = images[0]._image_bytes
     image_id = str(uuid.uuid4())
-    image_part = Part.from_data(data=image_bytes, mime_type="image/png")
-    output_dir = "generated_images"
-    os.makedirs(output_dir, exist_ok=True)
-    local_file_path = os.path.join(output_dir, f"image_{image_id}.png")
-    with open(local_file_path, "wb") as f:
-        f.write(image_bytes)
+    workspace = get_workspace(tool_context)
+    local_file_path = workspace.write_bytes(
+        "images", f"image_{image_id}.png", image_bytes
+    )
+    # Cropped renditions start from the source, so they get no frame.
+    profile = None
+    if not tool_context.state.get(RENDITIONS_KEY):
+        profile = get_encoding_profile(tool_context.state.get(ENCODING_PROFILE_KEY))
+    normalized = await asyncio.to_thread(normalize_image, image_bytes, profile)
+    await asyncio.to_thread(workspace.assets.add, local_file_path, image_bytes)
+    if normalized.frame is not None:
+        width, height = normalized.frame_size
+        frame_path = workspace.write_bytes(
+            "frames", f"image_{image_id}_{width}x{height}.png", normalized.frame
+        )
+        await asyncio.to_thread(
+            workspace.assets.add_frame,
+            local_file_path,
+            normalized.frame_size,
+            frame_path,
+        )
     logger.info(f"Image saved locally to: {local_file_path}")
-    image_url = await tool_context.save_artifact(f"image_{image_id}.png", image_part)
+    record_usage(
+        images=1, bytes_out=len(normalized.delivery) + len(normalized.thumbnail)
+    )
+
+    image_name = f"image_{image_id}.{DELIVERY_EXTENSION}"
+    image_url = await tool_context.save_artifact(
+        image_name,
+        Part.from_data(data=normalized.delivery, mime_type=DELIVERY_MIME_TYPE),
+    )
+    await tool_context.save_artifact(
+        f"image_{image_id}_thumb.{DELIVERY_EXTENSION}",
+        Part.from_data(data=normalized.thumbnail, mime_type=DELIVERY_MIME_TYPE),
+    )
     logger.info("Generated image (artifact service): %s", image_url)
     if image_url == 0:
-        return {"status": "success", "image_url": f"Image generated and saved locally to: {local_file_path} (In-memory ID: image_{image_id}.png)"}
+        return {
+            "status": "success",
+            "image_url": f"Image generated and saved locally to: {local_file_path} (In-memory ID: {image_name})",
+            "image_path": local_file_path,
+        }
     else:
-        return {"status": "success", "image_url": image_url}
+        return {
+            "status": "success",
+            "image_url": image_url,
+            "image_path": local_file_path,
+        }
+
 
-async def synthesize_voiceover(text: str, voice_name: str = "en-US-Neural2-D", tool_context: ToolContext = None) -> dict[str, Any]:
+@instrumented_tool
+async def synthesize_voiceover(
+    text: str, voice_name: str = "en-US-Neural2-D", tool_context: ToolContext = None
+) -> dict[str, Any]:
     """
     Converts the given text to speech (voiceover) using the standard Google Cloud TTS API.
     Handles long text by chunking it into smaller segments.
     Returns the audio URL and the original transcript.
     """
-    logger.info(f"Generating voiceover for text: '{text[:50]}...' with voice: {voice_name}")
+    logger.info(
+        f"Generating voiceover for text: '{text[:50]}...' with voice: {voice_name}"
+    )
     try:
-        client = texttospeech.TextToSpeechClient()
-        
+        client = get_tts_client()
+
         # Chunk the text into smaller parts
-        text_chunks = [text[i:i+4500] for i in range(0, len(text), 4500)]
-        audio_segments = []
-        
-        output_dir = "generated_audio"
-        os.makedirs(output_dir, exist_ok=True)
+        text_chunks = [text[i : i + 4500] for i in range(0, len(text), 4500)]
+        audio_chunks = []
+        audio_id = str(uuid.uuid4())
 
-        for i, chunk in enumerate(text_chunks):
+        workspace = get_workspace(tool_context)
+
+        for chunk in text_chunks:
             synthesis_input = texttospeech.SynthesisInput(text=chunk)
             voice = texttospeech.VoiceSelectionParams(
-                language_code=voice_name.split('-')[0] + '-' + voice_name.split('-')[1],
+                language_code=voice_name.split("-")[0] + "-" + voice_name.split("-")[1],
                 name=voice_name,
             )
             audio_config = texttospeech.AudioConfig(
                 audio_encoding=texttospeech.AudioEncoding.MP3
             )
-            response = client.synthesize_speech(
-                input=synthesis_input, voice=voice, audio_config=audio_config
+            # The client call blocks, so run it in a thread to let concurrent
+            # voiceovers overlap.
+            response = await asyncio.to_thread(
+                client.synthesize_speech,
+                input=synthesis_input,
+                voice=voice,
+                audio_config=audio_config,
             )
-            
-            segment_path = os.path.join(output_dir, f"segment_{i}.mp3")
-            with open(segment_path, "wb") as f:
-                f.write(response.audio_content)
-            audio_segments.append(AudioFileClip(segment_path))
 
-        final_audio = concatenate_audioclips(audio_segments)
-        audio_id = str(uuid.uuid4())
-        local_file_path = os.path.join(output_dir, f"audio_{audio_id}.mp3")
-        final_audio.write_audiofile(local_file_path)
+            audio_chunks.append(response.audio_content)
+
+        if len(audio_chunks) == 1 and not LOUDNESS_NORMALIZATION:
+            # One response is already the final MP3; decoding and re-encoding
+            # it would only cost time and quality.
+            audio_bytes = audio_chunks[0]
+            local_file_path = workspace.write_bytes(
+                "audio", f"audio_{audio_id}.mp3", audio_bytes
+            )
+        else:
+            segment_paths = [
+                workspace.write_bytes("audio", f"segment_{audio_id}_{i}.mp3", audio)
+                for i, audio in enumerate(audio_chunks)
+            ]
+            local_file_path = workspace.path("audio", f"audio_{audio_id}.mp3")
+            # Voices differ in level; every voiceover is brought to the same
+            # loudness so that adjacent sections match.
+            gain_db = await asyncio.to_thread(
+                join_voiceover, segment_paths, local_file_path
+            )
+            logger.debug("Voiceover %s normalized by %+.1f dB", audio_id, gain_db)
+            workspace.check(local_file_path)
 
-        # Clean up segment files
-        for segment_path in [seg.filename for seg in audio_segments]:
-            os.remove(segment_path)
+            # Clean up segment files
+            workspace.remove(*segment_paths)
 
-        with open(local_file_path, "rb") as f:
-            audio_bytes = f.read()
+            with open(local_file_path, "rb") as f:
+                audio_bytes = f.read()
+        asset = await asyncio.to_thread(
+            workspace.assets.add, local_file_path, audio_bytes
+        )
+        record_usage(bytes_in=len(text.encode()), audio_seconds=asset.duration_s or 0.0)
+        record_usage(bytes_out=len(audio_bytes))
 
     except Exception as e:
         logger.error(f"Error synthesizing speech: {e}")
         return {"status": "error", "message": f"Error synthesizing speech: {e}"}
-    
+
     audio_part = Part.from_data(data=audio_bytes, mime_type="audio/mp3")
     audio_url = await tool_context.save_artifact(f"audio_{audio_id}.mp3", audio_part)
     logger.info("Generated audio artifact: %s", audio_url)
-    
+
     response = {
         "status": "success",
         "transcript": text,
-        "audio_url": f"Audio generated and saved locally to: {local_file_path} (In-memory ID: audio_{audio_id}.mp3)"
+        "audio_url": f"Audio generated and saved locally to: {local_file_path} (In-memory ID: audio_{audio_id}.mp3)",
+        "audio_path": local_file_path,
     }
     if audio_url != 0:
         response["audio_url"] = audio_url
-        
+
     return response
 
-async def synthesize_voiceover_with_random_voice(text: str, tool_context: ToolContext) -> dict[str, Any]:
+
+async def synthesize_voiceover_with_random_voice(
+    text: str, tool_context: ToolContext
+) -> dict[str, Any]:
     """
     Synthesizes a voiceover from a given text using a randomly selected voice.
     """
     selected_voice = random.choice(female_voices + male_voices)
-    return await synthesize_voiceover(text, voice_name=selected_voice, tool_context=tool_context)
+    return await synthesize_voiceover(
+        text, voice_name=selected_voice, tool_context=tool_context
+    )
+
+
+def _section_inputs(
+    image_path: str, audio_path: str, assets: AssetIndex | None
+) -> tuple[tuple[int, int], tuple[str, str] | None]:
+    """Image size and content digests of one section's assets.
+
+    With an asset index both come from it, without reading either file;
+    otherwise the image header is read and the digests are left to
+    SegmentCache.key.
+    """
+    if assets is None:
+        with Image.open(image_path) as image:
+            return image.size, None
+    image, audio = assets.get(image_path), assets.get(audio_path)
+    return image.image_size, (image.sha256, audio.sha256)
+
+
+async def _render_cached_segment(
+    pool: RenderPool,
+    render: StageRecord,
+    image_path: str,
+    audio_path: str,
+    size: tuple[int, int],
+    profile: EncodingProfile,
+    key: str | None = None,
+    frame_path: str | None = None,
+) -> str:
+    """Returns the cached segment of one section, rendering it on a miss.
+
+    A miss is rendered from frame_path, a copy of the image already at the
+    frame size (see AssetIndex.frame), if given. Must be called on behalf of
+    an admitted render or job.
+    """
+    cache = get_segment_cache()
+    if key is None:
+        key = await asyncio.to_thread(cache.key, image_path, audio_path, size, profile)
+    cached = cache.get(key)
+    if cached is not None:
+        render.add(cache_hits=1)
+        return cached
+    result = await pool.submit(
+        render_segment,
+        frame_path or image_path,
+        audio_path,
+        cache.path(key),
+        size=size,
+        threads=pool.threads_per_render,
+        profile=profile,
+    )
+    render.cpu_s += result["cpu_s"]
+    render.render_rss_bytes = max(render.render_rss_bytes, result["peak_rss_bytes"])
+    render.add(segments=1, audio_seconds=result["duration_s"])
+    return cache.path(key)
+
+
+async def _render_cached_renditions(
+    pool: RenderPool,
+    render: StageRecord,
+    image_path: str,
+    audio_path: str,
+    profile: EncodingProfile,
+    renditions: list[str],
+    assets: AssetIndex | None = None,
+) -> dict[str, str]:
+    """Returns one section's cached segment per rendition.
+
+    Missing renditions are rendered together in a single pass. Must be called
+    on behalf of an admitted render or job.
+    """
+    cache = get_segment_cache()
+
+    def cache_keys() -> dict[str, str]:
+        image_size, digests = _section_inputs(image_path, audio_path, assets)
+        return {
+            name: cache.key(
+                image_path,
+                audio_path,
+                rendition_frame_size(image_size, RENDITIONS[name], profile),
+                profile,
+                variant=f"rendition:{name}",
+                digests=digests,
+            )
+            for name in renditions
+        }
+
+    keys = await asyncio.to_thread(cache_keys)
+    paths = {}
+    missing = {}
+    for name, key in keys.items():
+        cached = cache.get(key)
+        if cached is not None:
+            render.add(cache_hits=1)
+            paths[name] = cached
+        else:
+            missing[name] = cache.path(key)
+    if missing:
+        result = await pool.submit(
+            render_renditions,
+            image_path,
+            audio_path,
+            missing,
+            profile,
+            threads=pool.threads_per_render,
+        )
+        render.cpu_s += result["cpu_s"]
+        render.render_rss_bytes = max(render.render_rss_bytes, result["peak_rss_bytes"])
+        render.add(segments=len(missing), audio_seconds=result["duration_s"])
+        paths.update(missing)
+    return {name: paths[name] for name in renditions}
 
-async def create_video_from_assets(image_paths: list[str], audio_paths: list[str], tool_context: ToolContext) -> dict[str, Any]:
+
+async def prerender_segment(
+    image_path: str,
+    audio_path: str,
+    profile: EncodingProfile | None = None,
+    renditions: list[str] | None = None,
+    assets: AssetIndex | None = None,
+) -> dict[str, str]:
+    """Renders one section into the segment cache as soon as its assets exist.
+
+    create_video_from_assets then finds the segments in the cache and only
+    has to join them with the others. It takes no admission of its own
+    (RenderPool.admit): it runs on behalf of a job that was admitted, and its
+    renders wait for a free worker. The frame size follows the section's own image; the
+    segment is reused as long as every image of the video has that size,
+    which is the case for images from one model and aspect ratio.
+
+    Args:
+        image_path: The section's image.
+        audio_path: The section's narration.
+        profile: Encoding profile (default: the default profile).
+        renditions: Renditions to render, or None for the main video only.
+        assets: The job's asset index, which supplies the assets' sizes and
+            hashes; without it they are read from the files.
+
+    Returns:
+        The path of the cached segment per rendition.
+    """
+    profile = profile or get_encoding_profile()
+    pool = get_render_pool()
+    with stage_span("prerender_segment", kind="render", profile=profile.name) as render:
+        render.add(bytes_in=os.path.getsize(image_path) + os.path.getsize(audio_path))
+        if renditions:
+            return await _render_cached_renditions(
+                pool, render, image_path, audio_path, profile, renditions, assets
+            )
+        cache = get_segment_cache()
+
+        def cache_key() -> tuple[tuple[int, int], str, str | None]:
+            image_size, digests = _section_inputs(image_path, audio_path, assets)
+            size = profile.frame_size(image_size)
+            key = cache.key(image_path, audio_path, size, profile, digests=digests)
+            return size, key, assets.frame(image_path, size) if assets else None
+
+        size, key, frame_path = await asyncio.to_thread(cache_key)
+        segment = await _render_cached_segment(
+            pool,
+            render,
+            image_path,
+            audio_path,
+            size,
+            profile,
+            key=key,
+            frame_path=frame_path,
+        )
+        return {PRIMARY_RENDITION: segment}
+
+
+async def _render_segments(
+    pool: RenderPool,
+    render: StageRecord,
+    image_paths: list[str],
+    audio_paths: list[str],
+    video_path: str,
+    profile: EncodingProfile,
+    assets: AssetIndex | None = None,
+) -> None:
+    """Renders one segment per section in parallel, then joins them.
+
+    Segments already in the segment cache, including those rendered ahead by
+    prerender_segment, are reused as they are, so only sections whose image
+    or audio changed are encoded here.
+    """
+    cache = get_segment_cache()
+
+    def cache_keys() -> tuple[tuple[int, int], list[str], list[str | None]]:
+        sections = [
+            _section_inputs(i, a, assets)
+            for i, a in zip(image_paths, audio_paths, strict=True)
+        ]
+        # Every segment has the frame size of the first image.
+        size = profile.frame_size(sections[0][0])
+        keys = [
+            cache.key(i, a, size, profile, digests=digests)
+            for i, a, (_, digests) in zip(
+                image_paths, audio_paths, sections, strict=True
+            )
+        ]
+        frames = [assets.frame(i, size) if assets else None for i in image_paths]
+        return size, keys, frames
+
+    size, keys, frames = await asyncio.to_thread(cache_keys)
+
+    async with pool.admit():
+        segment_paths = await asyncio.gather(
+            *(
+                _render_cached_segment(
+                    pool, render, i, a, size, profile, key=k, frame_path=f
+                )
+                for i, a, k, f in zip(
+                    image_paths, audio_paths, keys, frames, strict=True
+                )
+            )
+        )
+        await pool.submit(concat_segments, segment_paths, video_path)
+    await asyncio.to_thread(cache.prune)
+
+
+async def render_video_file(
+    image_paths: list[str],
+    audio_paths: list[str],
+    profile: EncodingProfile,
+    workspace: Workspace,
+) -> str:
+    """Renders section images and narration into an MP4 on the render pool.
+
+    Args:
+        image_paths: One image per section.
+        audio_paths: One audio clip per section, in the same order.
+        profile: Output resolution, frame rate and encoder settings.
+        workspace: The job workspace the video is written to.
+
+    Returns:
+        The path of the rendered video.
+
+    Raises:
+        RenderPoolSaturated: If the render pool is at capacity.
+        WorkspaceQuotaExceeded: If the video does not fit in the workspace.
+    """
+    workspace.ensure_room()
+    video_path = workspace.path("videos", f"{uuid.uuid4()}.mp4")
+
+    # Render on the per-instance worker pool so the API stays responsive.
+    pool = get_render_pool()
+    with stage_span(RENDER_MODE, kind="render", profile=profile.name) as render:
+        if RENDER_MODE == "timeline":
+
+            def frame_paths() -> list[str]:
+                first = workspace.assets.get(image_paths[0])
+                size = profile.frame_size(first.image_size)
+                return [workspace.assets.frame(p, size) for p in image_paths]
+
+            result = await pool.run(
+                render_video,
+                await asyncio.to_thread(frame_paths),
+                audio_paths,
+                video_path,
+                threads=pool.threads_per_render,
+                profile=profile,
+            )
+            render.cpu_s = result["cpu_s"]
+            render.render_rss_bytes = result["peak_rss_bytes"]
+            render.add(audio_seconds=result["duration_s"])
+        else:
+            await _render_segments(
+                pool,
+                render,
+                image_paths,
+                audio_paths,
+                video_path,
+                profile,
+                workspace.assets,
+            )
+        render.add(
+            bytes_in=sum(os.path.getsize(p) for p in [*image_paths, *audio_paths])
+        )
+    workspace.check(video_path)
+    return video_path
+
+
+async def render_video_files(
+    image_paths: list[str],
+    audio_paths: list[str],
+    profile: EncodingProfile,
+    workspace: Workspace,
+    renditions: list[str] | None = None,
+) -> dict[str, str]:
+    """Renders the video of every requested rendition on the render pool.
+
+    Renditions are rendered segment by segment, each section decoded once for
+    all of them (see app/utils/renditions.py), whatever the RENDER_MODE.
+
+    Args:
+        image_paths: One image per section.
+        audio_paths: One audio clip per section, in the same order.
+        profile: Output resolution, frame rate and encoder settings.
+        workspace: The job workspace the videos are written to.
+        renditions: Renditions to render, or None for the main video only.
+
+    Returns:
+        The path of the rendered video per rendition.
+
+    Raises:
+        RenderPoolSaturated: If the render pool is at capacity.
+        WorkspaceQuotaExceeded: If the videos do not fit in the workspace.
+    """
+    if not renditions:
+        video_path = await render_video_file(
+            image_paths, audio_paths, profile, workspace
+        )
+        return {PRIMARY_RENDITION: video_path}
+
+    workspace.ensure_room()
+    video_id = uuid.uuid4()
+    video_paths = {
+        name: workspace.path("videos", f"{video_id}_{rendition_slug(name)}.mp4")
+        for name in renditions
+    }
+    pool = get_render_pool()
+    with stage_span("renditions", kind="render", profile=profile.name) as render:
+        async with pool.admit():
+            sections = await asyncio.gather(
+                *(
+                    _render_cached_renditions(
+                        pool, render, i, a, profile, renditions, workspace.assets
+                    )
+                    for i, a in zip(image_paths, audio_paths, strict=True)
+                )
+            )
+            await asyncio.gather(
+                *(
+                    pool.submit(
+                        concat_segments, [s[name] for s in sections], video_paths[name]
+                    )
+                    for name in renditions
+                )
+            )
+        render.add(
+            bytes_in=sum(os.path.getsize(p) for p in [*image_paths, *audio_paths])
+        )
+    await asyncio.to_thread(get_segment_cache().prune)
+    workspace.check(*video_paths.values())
+    return video_paths
+
+
+@instrumented_tool
+async def create_video_from_assets(
+    image_paths: list[str], audio_paths: list[str], tool_context: ToolContext
+) -> dict[str, Any]:
     """
     Creates a video from a list of images and a corresponding list of audio files.
     Each image is displayed for the duration of its corresponding audio clip.
     """
     logger.info("Creating synchronized video from assets.")
     try:
-        temp_dir = "/tmp/generated_videos"
-        os.makedirs(temp_dir, exist_ok=True)
-        video_filename = f"{uuid.uuid4()}.mp4"
-        video_path = os.path.join(temp_dir, video_filename)
-
-        audio_clips = [AudioFileClip(path) for path in audio_paths]
-        final_audio = concatenate_audioclips(audio_clips)
-
-        clips = []
-        for i, image_path in enumerate(image_paths):
-            duration = audio_clips[i].duration
-            clips.append(ImageClip(image_path, duration=duration))
-
-        video = concatenate_videoclips(clips, method="compose")
-        video.audio = final_audio
-        video.write_videofile(video_path, fps=24)
-
-        with open(video_path, "rb") as f:
-            video_bytes = f.read()
-        video_url = await tool_context.save_artifact(f"video_{uuid.uuid4()}.mp4", Part.from_data(data=video_bytes, mime_type="video/mp4"))
-        logger.info("Generated video: %s", video_url)
-        return {"status": "success", "video_url": video_url}
+        profile = get_encoding_profile(tool_context.state.get(ENCODING_PROFILE_KEY))
+        renditions = tool_context.state.get(RENDITIONS_KEY)
+        workspace = get_workspace(tool_context)
+        video_paths = await render_video_files(
+            image_paths, audio_paths, profile, workspace, renditions
+        )
+
+        video_urls = {}
+        for name, video_path in video_paths.items():
+            with open(video_path, "rb") as f:
+                video_bytes = f.read()
+            # The artifact service holds the video from here on.
+            workspace.remove(video_path)
+            record_usage(bytes_out=len(video_bytes))
+            video_urls[name] = await tool_context.save_artifact(
+                video_artifact_name(name, renditions),
+                Part.from_data(data=video_bytes, mime_type="video/mp4"),
+            )
+        logger.info("Generated %s video: %s", profile.name, video_urls)
+        response = {
+            "status": "success",
+            "video_url": video_urls[primary_rendition(renditions)],
+            "profile": profile.name,
+        }
+        if renditions:
+            response["renditions"] = video_urls
+        return response
     except Exception as e:
         logger.error("Error creating video: %s", e)
         return {"status": "error", "message": f"Error creating video: {e}"}
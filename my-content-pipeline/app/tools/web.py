@@ -1,6 +1,28 @@
+import asyncio
+
 import requests
 from bs4 import BeautifulSoup
 
+from app.utils.metrics import instrumented_tool, record_usage
+
+FETCH_TIMEOUT_S = 20
+FETCH_CONCURRENCY = 8
+
+
+def _fetch_text(url: str) -> str:
+    """Downloads a page and returns its text without scripts and styles."""
+    response = requests.get(url, timeout=FETCH_TIMEOUT_S)
+    response.raise_for_status()  # Raise an exception for bad status codes
+    soup = BeautifulSoup(response.content, "html.parser")
+    # Remove script and style elements
+    for script in soup(["script", "style"]):
+        script.extract()
+    text = soup.get_text()
+    record_usage(bytes_in=len(response.content), bytes_out=len(text.encode()))
+    return text
+
+
+@instrumented_tool
 def extract_content_from_url(url: str) -> str:
     """
     Extracts the text content from a given URL.
@@ -12,12 +34,32 @@ def extract_content_from_url(url: str) -> str:
         The text content of the URL.
     """
     try:
-        response = requests.get(url)
-        response.raise_for_status()  # Raise an exception for bad status codes
-        soup = BeautifulSoup(response.content, 'html.parser')
-        # Remove script and style elements
-        for script in soup(["script", "style"]):
-            script.extract()
-        return soup.get_text()
+        return _fetch_text(url)
     except requests.exceptions.RequestException as e:
-        return f"Error fetching URL: {e}"
\ No newline at end of file
+        return f"Error fetching URL: {e}"
+
+
+@instrumented_tool
+async def extract_contents_from_urls(urls: list[str]) -> dict[str, str]:
+    """
+    Extracts the text content of several URLs concurrently.
+
+    Args:
+        urls: The URLs to extract content from.
+
+    Returns:
+        The text content of each URL, keyed by URL in the order given.
+        Pages that could not be fetched map to an error message.
+    """
+    semaphore = asyncio.Semaphore(FETCH_CONCURRENCY)
+
+    async def fetch(url: str) -> str:
+        async with semaphore:
+            try:
+                return await asyncio.to_thread(_fetch_text, url)
+            except requests.exceptions.RequestException as e:
+                return f"Error fetching URL: {e}"
+
+    urls = list(dict.fromkeys(urls))
+    texts = await asyncio.gather(*(fetch(url) for url in urls))
+    return dict(zip(urls, texts, strict=True))
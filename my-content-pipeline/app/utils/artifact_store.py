@@ -0,0 +1,412 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Artifact service for local runs that keeps memory bounded.
+
+ADK's InMemoryArtifactService holds every version of every image, voiceover
+and video in process memory for the life of the process, so a few pipeline
+runs exhaust RAM. SpillingArtifactService is a drop-in replacement for local
+runs, benchmarks and tests:
+
+- contents are stored by SHA-256, once however many artifact versions (of
+  any name, session or user) have them; versions reference their content,
+  and content is removed once no version references it;
+- artifacts smaller than the spill threshold are kept in memory, larger
+  ones are written to a local spill directory straight away;
+- when the in-memory artifacts exceed the memory budget, the least recently
+  used ones are moved to disk;
+- when the spilled artifacts exceed the disk budget, the least recently
+  used contents are evicted, and the versions referencing them can no
+  longer be loaded (load_artifact returns None, as for an unknown artifact).
+
+Reads and writes of spilled artifacts run in a worker thread. usage()
+reports what is held where, and the same figures are exported as gauges,
+with counters of spilled, deduplicated and evicted bytes or contents.
+
+Configuration (environment variables):
+    ARTIFACT_MEMORY_BUDGET_BYTES: bytes of artifacts kept in memory
+        (default 256 MiB).
+    ARTIFACT_SPILL_THRESHOLD_BYTES: artifacts at least this large go to
+        disk directly (default 1 MiB).
+    ARTIFACT_DISK_BUDGET_BYTES: bytes of spilled artifacts kept before the
+        least recently used are evicted (default 8 GiB, 0 for no limit).
+    ARTIFACT_SPILL_DIR: parent directory of the spill directories (default:
+        the system temporary directory).
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from google.adk.artifacts import BaseArtifactService
+from google.genai import types
+from opentelemetry.metrics import CallbackOptions, Observation
+
+from app.utils.metrics import meter_provider
+
+logger = logging.getLogger(__name__)
+
+MEMORY_BUDGET_BYTES = int(os.getenv("ARTIFACT_MEMORY_BUDGET_BYTES", str(256 << 20)))
+SPILL_THRESHOLD_BYTES = int(os.getenv("ARTIFACT_SPILL_THRESHOLD_BYTES", str(1 << 20)))
+DISK_BUDGET_BYTES = int(os.getenv("ARTIFACT_DISK_BUDGET_BYTES", str(8 << 30)))
+SPILL_ROOT = os.getenv("ARTIFACT_SPILL_DIR") or None
+
+_meter = meter_provider.get_meter(__name__)
+_spills = _meter.create_counter(
+    "pipeline.artifacts.spilled",
+    unit="By",
+    description="Bytes of artifacts spilled to disk, on save or on eviction from memory.",
+)
+_deduplicated = _meter.create_counter(
+    "pipeline.artifacts.deduplicated",
+    unit="By",
+    description="Bytes of saved artifacts whose content was already stored.",
+)
+_evictions = _meter.create_counter(
+    "pipeline.artifacts.evicted",
+    description="Artifact contents evicted from the spill directory to stay within the disk budget.",
+)
+
+
+@dataclass
+class _Content:
+    """Bytes stored once for every artifact version that has them."""
+
+    sha256: str
+    size: int
+    data: bytes | None = None
+    # The spill file, once the content is on disk.
+    path: str | None = None
+    # The versions referencing the content, as (artifact path, version).
+    refs: set[tuple[str, int]] = field(default_factory=set)
+
+
+@dataclass
+class _Version:
+    """One artifact version: a reference to its content."""
+
+    content: _Content
+    # None for text artifacts.
+    mime_type: str | None
+
+
+def _part_bytes(part: types.Part) -> bytes:
+    if part.inline_data is not None:
+        return part.inline_data.data or b""
+    return (part.text or "").encode()
+
+
+class SpillingArtifactService(BaseArtifactService):
+    """Artifact service keeping small artifacts in memory and spilling the rest to disk."""
+
+    def __init__(
+        self,
+        memory_budget_bytes: int = MEMORY_BUDGET_BYTES,
+        spill_threshold_bytes: int = SPILL_THRESHOLD_BYTES,
+        disk_budget_bytes: int = DISK_BUDGET_BYTES,
+        spill_root: str | None = SPILL_ROOT,
+    ) -> None:
+        """
+        Initialize the service with an empty spill directory of its own.
+
+        The directory is removed by close() or when the service is garbage
+        collected.
+
+        Args:
+            memory_budget_bytes: Bytes of artifacts kept in memory.
+            spill_threshold_bytes: Artifacts at least this large go to disk directly.
+            disk_budget_bytes: Bytes of spilled artifacts kept; 0 for no limit.
+            spill_root: Parent directory of the spill directory.
+        """
+        self.memory_budget_bytes = memory_budget_bytes
+        self.spill_threshold_bytes = spill_threshold_bytes
+        self.disk_budget_bytes = disk_budget_bytes
+        if spill_root:
+            os.makedirs(spill_root, exist_ok=True)
+        self.spill_dir = tempfile.mkdtemp(prefix="artifacts-", dir=spill_root)
+        self._finalizer = weakref.finalize(self, shutil.rmtree, self.spill_dir, True)
+        # Versions by artifact path; evicted versions are None.
+        self._artifacts: dict[str, list[_Version | None]] = {}
+        # Contents by SHA-256, least recently used first.
+        self._in_memory: OrderedDict[str, _Content] = OrderedDict()
+        self._on_disk: OrderedDict[str, _Content] = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_bytes = 0
+        self._spilled_bytes = 0
+        self._deduplicated_bytes = 0
+        self._evicted = 0
+        _services.add(self)
+
+    def close(self) -> None:
+        """Drops every artifact and removes the spill directory."""
+        self._artifacts.clear()
+        self._in_memory.clear()
+        self._on_disk.clear()
+        self._memory_bytes = self._disk_bytes = 0
+        self._finalizer()
+
+    def usage(self) -> dict[str, int]:
+        """What the service holds, and how much it spilled, deduplicated and evicted so far."""
+        return {
+            "memory_bytes": self._memory_bytes,
+            "memory_contents": len(self._in_memory),
+            "disk_bytes": self._disk_bytes,
+            "disk_contents": len(self._on_disk),
+            "artifact_versions": sum(
+                v is not None for vs in self._artifacts.values() for v in vs
+            ),
+            "spilled_bytes": self._spilled_bytes,
+            "deduplicated_bytes": self._deduplicated_bytes,
+            "evicted_contents": self._evicted,
+        }
+
+    def _artifact_path(
+        self, app_name: str, user_id: str, session_id: str, filename: str
+    ) -> str:
+        # Same namespacing as ADK's artifact services.
+        if filename.startswith("user:"):
+            return f"{app_name}/{user_id}/user/{filename}"
+        return f"{app_name}/{user_id}/{session_id}/{filename}"
+
+    def _version(self, key: str, version: int | None) -> _Version | None:
+        versions = self._artifacts.get(key)
+        if not versions:
+            return None
+        if version is None:
+            version = len(versions) - 1
+        if not 0 <= version < len(versions):
+            return None
+        return versions[version]
+
+    def spilled_path(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        filename: str,
+        version: int | None = None,
+    ) -> str | None:
+        """The file holding an artifact version if it was spilled, else None.
+
+        Lets readers that stream artifacts (see app/utils/bundle.py) read
+        spilled ones in chunks rather than loading them whole.
+        """
+        entry = self._version(
+            self._artifact_path(app_name, user_id, session_id, filename), version
+        )
+        if entry is None or entry.content.path is None:
+            return None
+        self._on_disk.move_to_end(entry.content.sha256)
+        return entry.content.path
+
+    async def save_artifact(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        filename: str,
+        artifact: types.Part,
+    ) -> int:
+        key = self._artifact_path(app_name, user_id, session_id, filename)
+        data = _part_bytes(artifact)
+        sha256 = hashlib.sha256(data).hexdigest()
+        content = self._in_memory.get(sha256) or self._on_disk.get(sha256)
+        if content is not None:
+            self._deduplicated_bytes += content.size
+            _deduplicated.add(content.size)
+        else:
+            content = _Content(sha256, len(data), data=data)
+            if content.size >= self.spill_threshold_bytes:
+                self._on_disk[sha256] = content
+                await self._spill(content, "save")
+            else:
+                self._in_memory[sha256] = content
+                self._memory_bytes += content.size
+        mime_type = (
+            artifact.inline_data.mime_type if artifact.inline_data is not None else None
+        )
+        versions = self._artifacts.setdefault(key, [])
+        version = len(versions)
+        versions.append(_Version(content, mime_type))
+        content.refs.add((key, version))
+        self._touch(content)
+        await self._enforce_budgets()
+        return version
+
+    async def load_artifact(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        filename: str,
+        version: int | None = None,
+    ) -> types.Part | None:
+        entry = self._version(
+            self._artifact_path(app_name, user_id, session_id, filename), version
+        )
+        if entry is None:
+            return None
+        content = entry.content
+        self._touch(content)
+        data, path = content.data, content.path
+        if data is None:
+            if path is None:
+                return None
+            try:
+                data = await asyncio.to_thread(_read_file, path)
+            except FileNotFoundError:
+                # Evicted while being read.
+                return None
+        if entry.mime_type is None:
+            return types.Part.from_text(text=data.decode())
+        return types.Part.from_bytes(data=data, mime_type=entry.mime_type)
+
+    async def list_artifact_keys(
+        self, *, app_name: str, user_id: str, session_id: str
+    ) -> list[str]:
+        prefixes = (
+            f"{app_name}/{user_id}/{session_id}/",
+            f"{app_name}/{user_id}/user/",
+        )
+        return sorted(
+            key.split("/", 3)[3]
+            for key, versions in self._artifacts.items()
+            if key.startswith(prefixes) and any(versions)
+        )
+
+    async def delete_artifact(
+        self, *, app_name: str, user_id: str, session_id: str, filename: str
+    ) -> None:
+        key = self._artifact_path(app_name, user_id, session_id, filename)
+        for version, entry in enumerate(self._artifacts.pop(key, [])):
+            if entry is not None:
+                self._release(entry.content, (key, version))
+
+    async def list_versions(
+        self, *, app_name: str, user_id: str, session_id: str, filename: str
+    ) -> list[int]:
+        versions = self._artifacts.get(
+            self._artifact_path(app_name, user_id, session_id, filename)
+        )
+        return [i for i, entry in enumerate(versions or []) if entry is not None]
+
+    def _touch(self, content: _Content) -> None:
+        for tier in (self._in_memory, self._on_disk):
+            if content.sha256 in tier:
+                tier.move_to_end(content.sha256)
+
+    async def _spill(self, content: _Content, reason: str) -> None:
+        """Writes content held in memory to the spill directory."""
+        if content.data is None:
+            return  # Already on disk.
+        # Named after the object too: a content released while being written
+        # may be saved (and spilled) again meanwhile.
+        path = os.path.join(self.spill_dir, f"{content.sha256}-{id(content):x}")
+        await asyncio.to_thread(_write_file, path, content.data)
+        if self._on_disk.get(content.sha256) is not content:
+            # Released while being written.
+            os.remove(path)
+            return
+        content.path = path
+        content.data = None
+        self._disk_bytes += content.size
+        self._spilled_bytes += content.size
+        _spills.add(content.size, {"on": reason})
+
+    async def _enforce_budgets(self) -> None:
+        while self._memory_bytes > self.memory_budget_bytes and self._in_memory:
+            sha256, content = self._in_memory.popitem(last=False)
+            self._memory_bytes -= content.size
+            self._on_disk[sha256] = content
+            await self._spill(content, "eviction")
+        while self.disk_budget_bytes and self._disk_bytes > self.disk_budget_bytes:
+            spilled = [c for c in self._on_disk.values() if c.path is not None]
+            if not spilled:
+                break
+            content = spilled[0]
+            logger.warning(
+                "Evicting %d artifact versions from the spill directory: %s",
+                len(content.refs),
+                ", ".join(
+                    f"{key} version {version}" for key, version in sorted(content.refs)
+                ),
+            )
+            for key, version in content.refs:
+                self._artifacts[key][version] = None
+            content.refs.clear()
+            self._drop(content)
+            self._evicted += 1
+            _evictions.add(1)
+
+    def _release(self, content: _Content, ref: tuple[str, int]) -> None:
+        """Drops a version's reference; content nothing references any more is removed."""
+        content.refs.discard(ref)
+        if not content.refs:
+            self._drop(content)
+
+    def _drop(self, content: _Content) -> None:
+        if self._in_memory.pop(content.sha256, None) is not None:
+            self._memory_bytes -= content.size
+        if (
+            self._on_disk.pop(content.sha256, None) is not None
+            and content.path is not None
+        ):
+            self._disk_bytes -= content.size
+            os.remove(content.path)
+        content.data = None
+        content.path = None
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _write_file(path: str, data: bytes) -> None:
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+_services: "weakref.WeakSet[SpillingArtifactService]" = weakref.WeakSet()
+
+
+def _observe_memory(options: CallbackOptions) -> list[Observation]:
+    return [Observation(sum(s.usage()["memory_bytes"] for s in list(_services)))]
+
+
+def _observe_disk(options: CallbackOptions) -> list[Observation]:
+    return [Observation(sum(s.usage()["disk_bytes"] for s in list(_services)))]
+
+
+_meter.create_observable_gauge(
+    "pipeline.artifacts.memory_bytes",
+    callbacks=[_observe_memory],
+    unit="By",
+    description="Bytes of artifacts held in memory by local artifact services.",
+)
+_meter.create_observable_gauge(
+    "pipeline.artifacts.disk_bytes",
+    callbacks=[_observe_disk],
+    unit="By",
+    description="Bytes of artifacts spilled to disk by local artifact services.",
+)
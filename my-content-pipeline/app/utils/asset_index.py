@@ -0,0 +1,218 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Per-job index of local media files: content hash, size and metadata.
+
+Every image and voiceover a job writes is recorded in its workspace's index
+(`asset_index.json`, see app/utils/workspace.py) with its SHA-256, size and
+header-probed duration or dimensions (app/utils/media_probe.py). Render and
+packaging stages look assets up here rather than re-reading and re-decoding
+them: segment cache keys use the stored hashes, frame sizes the stored
+dimensions, and renders the pre-sized frames recorded for an image (see
+app/utils/images.py). An entry is recomputed when its file's size or
+modification time changes, and the index is reloaded from disk when a
+workspace is reopened, e.g. after a restart, so re-renders and approvals
+reuse it too.
+"""
+
+import dataclasses
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from dataclasses import dataclass, field
+
+from app.utils.media_probe import probe_audio, probe_image
+from app.utils.metrics import meter_provider
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILENAME = "asset_index.json"
+
+_IMAGE_SUFFIXES = {".png", ".jpg", ".jpeg", ".webp", ".gif", ".bmp"}
+_AUDIO_SUFFIXES = {".mp3", ".wav", ".m4a", ".aac", ".ogg", ".flac"}
+
+_meter = meter_provider.get_meter(__name__)
+_lookups = _meter.create_counter(
+    "pipeline.asset_index.lookups",
+    description="Asset index lookups, by whether the entry was current (hit) or recomputed.",
+)
+
+
+@dataclass
+class AssetRecord:
+    """What the pipeline knows about one local media file."""
+
+    path: str
+    kind: str  # "image", "audio" or "other"
+    sha256: str
+    size_bytes: int
+    mtime_ns: int
+    duration_s: float | None = None
+    sample_rate: int | None = None
+    channels: int | None = None
+    codec: str | None = None
+    width: int | None = None
+    height: int | None = None
+    # Render-ready copies of an image by frame size ("WIDTHxHEIGHT").
+    frames: dict[str, str] = field(default_factory=dict)
+
+    @property
+    def image_size(self) -> tuple[int, int]:
+        """Width and height of an image.
+
+        Raises:
+            ValueError: If the asset is not an image.
+        """
+        if self.width is None or self.height is None:
+            raise ValueError(f"{self.path} is not an image")
+        return self.width, self.height
+
+
+def frame_key(size: tuple[int, int]) -> str:
+    """Key of a frame size in AssetRecord.frames."""
+    return f"{size[0]}x{size[1]}"
+
+
+def asset_kind(path: str) -> str:
+    """Kind of media a file holds, from its extension."""
+    suffix = os.path.splitext(path)[1].lower()
+    if suffix in _IMAGE_SUFFIXES:
+        return "image"
+    if suffix in _AUDIO_SUFFIXES:
+        return "audio"
+    return "other"
+
+
+def _sha256_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(1 << 20):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def describe(path: str, data: bytes | None = None) -> AssetRecord:
+    """Hashes and probes a media file.
+
+    Args:
+        path: The file.
+        data: Its contents, if already in memory; saves reading it back.
+
+    Returns:
+        The file's record.
+    """
+    stat = os.stat(path)
+    sha256 = (
+        hashlib.sha256(data).hexdigest() if data is not None else _sha256_file(path)
+    )
+    record = AssetRecord(path, asset_kind(path), sha256, stat.st_size, stat.st_mtime_ns)
+    if record.kind == "image":
+        record.width, record.height, record.codec = probe_image(path)
+    elif record.kind == "audio":
+        info = probe_audio(path)
+        record.duration_s = info.duration_s
+        record.sample_rate = info.sample_rate
+        record.channels = info.channels
+        record.codec = info.codec
+    return record
+
+
+class AssetIndex:
+    """Records of a job's media files, persisted as JSON next to them."""
+
+    def __init__(self, path: str) -> None:
+        """
+        Initialize the index, loading it from disk if it exists.
+
+        Args:
+            path: The index file.
+        """
+        self.path = path
+        self._records: dict[str, AssetRecord] = {}
+        self._lock = threading.Lock()
+        try:
+            with open(path) as f:
+                self._records = {r["path"]: AssetRecord(**r) for r in json.load(f)}
+        except FileNotFoundError:
+            pass
+        except (ValueError, TypeError, KeyError) as e:
+            logger.warning("Ignoring unreadable asset index %s: %s", path, e)
+
+    def add(self, asset_path: str, data: bytes | None = None) -> AssetRecord:
+        """Records a file that was written or changed.
+
+        Args:
+            asset_path: The file.
+            data: Its contents, if already in memory.
+
+        Returns:
+            The file's record.
+        """
+        record = describe(asset_path, data)
+        with self._lock:
+            self._records[asset_path] = record
+            self._save()
+        return record
+
+    def add_frame(
+        self, image_path: str, size: tuple[int, int], frame_path: str
+    ) -> None:
+        """Records a copy of an image pre-sized for rendering at the given size."""
+        record = self.get(image_path)
+        with self._lock:
+            record.frames[frame_key(size)] = frame_path
+            self._save()
+
+    def frame(self, image_path: str, size: tuple[int, int]) -> str:
+        """The image to render at the given size: a pre-sized copy if recorded, else the image."""
+        frame_path = self.get(image_path).frames.get(frame_key(size))
+        if frame_path is not None and os.path.exists(frame_path):
+            return frame_path
+        return image_path
+
+    def get(self, asset_path: str) -> AssetRecord:
+        """Returns a file's record, recomputing it if the file changed.
+
+        Raises:
+            FileNotFoundError: If the file does not exist.
+        """
+        record = self._records.get(asset_path)
+        if record is not None:
+            stat = os.stat(asset_path)
+            if (stat.st_size, stat.st_mtime_ns) == (record.size_bytes, record.mtime_ns):
+                _lookups.add(1, {"hit": True})
+                return record
+        _lookups.add(1, {"hit": False})
+        return self.add(asset_path)
+
+    def records(self) -> list[AssetRecord]:
+        """Every recorded file, in the order they were added."""
+        with self._lock:
+            return list(self._records.values())
+
+    def _save(self) -> None:
+        # Written to a temporary file and moved into place, so a crash never
+        # leaves a truncated index.
+        directory = os.path.dirname(self.path) or "."
+        fd, tmp_path = tempfile.mkstemp(suffix=".json", dir=directory)
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump([dataclasses.asdict(r) for r in self._records.values()], f)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
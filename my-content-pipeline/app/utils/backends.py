@@ -0,0 +1,61 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Shared clients for the model backends called directly by the tools.
+
+Clients are created on first use and reused for the life of the process.
+The benchmark and load-test harnesses replace them with local fakes through
+`set_backends` (see app/utils/fake_backends.py).
+"""
+
+from typing import Any
+
+IMAGE_MODEL_NAME = "imagen-3.0-fast-generate-001"
+
+_image_model: Any = None
+_tts_client: Any = None
+
+
+def get_image_model() -> Any:
+    """Returns the Imagen model used by generate_image."""
+    global _image_model
+    if _image_model is None:
+        from vertexai.vision_models import ImageGenerationModel
+
+        _image_model = ImageGenerationModel.from_pretrained(IMAGE_MODEL_NAME)
+    return _image_model
+
+
+def get_tts_client() -> Any:
+    """Returns the Text-to-Speech client used by synthesize_voiceover."""
+    global _tts_client
+    if _tts_client is None:
+        from google.cloud import texttospeech
+
+        _tts_client = texttospeech.TextToSpeechClient()
+    return _tts_client
+
+
+def set_backends(image_model: Any = None, tts_client: Any = None) -> None:
+    """Replaces the backend clients, e.g. with local fakes.
+
+    Args:
+        image_model: Object with an Imagen-compatible `generate_images` method.
+        tts_client: Object with a TTS-compatible `synthesize_speech` method.
+    """
+    global _image_model, _tts_client
+    if image_model is not None:
+        _image_model = image_model
+    if tts_client is not None:
+        _tts_client = tts_client
@@ -0,0 +1,271 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Streaming ZIP export of a job's complete asset package.
+
+A package holds everything Content Studio delivers for a job:
+
+    article.md                  the article in Markdown, embedding the scene images
+    manifest.json               job, sections and the files of each
+    scenes/NN/image.<ext>       each scene's image (delivery copy)
+    scenes/NN/voiceover.mp3     its narration
+    scenes/NN/transcript.txt    the narrated text
+    scenes/NN/prompt.txt        the image prompt
+    images/...                  other images of the job
+    video/...                   every video: draft, final and renditions
+
+stream_zip writes the archive while the artifacts are read, and yields it
+chunk by chunk to the HTTP response: each artifact is read CHUNK_SIZE bytes
+at a time (ranged reads from GCS, slices of the loaded artifact from other
+stores), so memory stays bounded whatever the package size. Entries use
+data descriptors, as the output is never seeked, and media (already
+compressed) is stored rather than deflated; only text is compressed.
+
+Configuration (environment variables):
+    BUNDLE_CHUNK_SIZE: bytes read from an artifact at a time (default 1 MiB).
+"""
+
+import asyncio
+import io
+import json
+import os
+import time
+import zipfile
+from collections.abc import AsyncIterator, Callable, Iterable
+from dataclasses import dataclass
+from typing import Any
+
+from google.adk.artifacts import BaseArtifactService, GcsArtifactService
+
+from app.tools.markdown import convert_to_markdown
+from app.utils.artifact_store import SpillingArtifactService
+from app.utils.gcs import latest_artifact_blob
+
+CHUNK_SIZE = int(os.getenv("BUNDLE_CHUNK_SIZE", str(1 << 20)))
+
+_VIDEO_SUFFIXES = (".mp4",)
+_IMAGE_SUFFIXES = (".webp", ".jpg", ".jpeg", ".png")
+
+
+@dataclass
+class BundleEntry:
+    """One file of a package: its name in the archive and where its bytes come from."""
+
+    name: str
+    chunks: Callable[[], AsyncIterator[bytes]]
+    # Deflate the entry; media is stored as is.
+    compress: bool = False
+
+
+def text_entry(name: str, text: str) -> BundleEntry:
+    """An entry holding text, compressed."""
+
+    async def chunks() -> AsyncIterator[bytes]:
+        yield text.encode()
+
+    return BundleEntry(name, chunks, compress=True)
+
+
+async def artifact_chunks(
+    service: BaseArtifactService,
+    *,
+    app_name: str,
+    user_id: str,
+    session_id: str,
+    filename: str,
+    chunk_size: int = CHUNK_SIZE,
+) -> AsyncIterator[bytes]:
+    """Reads the latest version of an artifact in chunks.
+
+    GCS artifacts are read with ranged requests and spilled local artifacts
+    from their file, so only one chunk is held at a time; other stores
+    return whole artifacts, which are sliced.
+
+    Raises:
+        FileNotFoundError: If the artifact does not exist.
+    """
+    if isinstance(service, GcsArtifactService):
+        blob = await latest_artifact_blob(
+            service,
+            app_name=app_name,
+            user_id=user_id,
+            session_id=session_id,
+            filename=filename,
+        )
+        reader = await asyncio.to_thread(blob.open, "rb", chunk_size=chunk_size)
+        try:
+            while chunk := await asyncio.to_thread(reader.read, chunk_size):
+                yield chunk
+        finally:
+            reader.close()
+        return
+
+    if isinstance(service, SpillingArtifactService):
+        path = service.spilled_path(
+            app_name=app_name, user_id=user_id, session_id=session_id, filename=filename
+        )
+        if path is not None:
+            with open(path, "rb") as f:
+                while chunk := await asyncio.to_thread(f.read, chunk_size):
+                    yield chunk
+            return
+
+    part = await service.load_artifact(
+        app_name=app_name, user_id=user_id, session_id=session_id, filename=filename
+    )
+    if part is None or part.inline_data is None or part.inline_data.data is None:
+        raise FileNotFoundError(filename)
+    data = memoryview(part.inline_data.data)
+    for start in range(0, len(data), chunk_size):
+        yield data[start : start + chunk_size]
+
+
+class _Sink(io.RawIOBase):
+    """Unseekable output of a ZipFile that buffers what was written until drained."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._chunks: list[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: Any) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(self._chunks[-1])
+        return len(self._chunks[-1])
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+async def stream_zip(entries: Iterable[BundleEntry]) -> AsyncIterator[bytes]:
+    """Writes entries into a ZIP archive, yielding the archive as it is produced.
+
+    Args:
+        entries: The files to archive, read one after the other.
+
+    Yields:
+        Consecutive pieces of the archive, each about one source chunk long.
+    """
+    sink = _Sink()
+    date_time = time.localtime()[:6]
+    with zipfile.ZipFile(sink, "w") as archive:
+        for entry in entries:
+            info = zipfile.ZipInfo(entry.name, date_time=date_time)
+            info.compress_type = (
+                zipfile.ZIP_DEFLATED if entry.compress else zipfile.ZIP_STORED
+            )
+            info.external_attr = 0o644 << 16
+            # Sizes are unknown up front, so every entry may need ZIP64 sizes.
+            with archive.open(info, "w", force_zip64=True) as output:
+                async for chunk in entry.chunks():
+                    output.write(chunk)
+                    if data := sink.drain():
+                        yield data
+            if data := sink.drain():
+                yield data
+    if data := sink.drain():
+        yield data
+
+
+def package_entries(
+    state: dict[str, Any],
+    artifacts: list[str],
+    open_artifact: Callable[[str], AsyncIterator[bytes]],
+    job: dict[str, Any] | None = None,
+) -> list[BundleEntry]:
+    """Lays out a job's package.
+
+    Args:
+        state: The job's session state (draft article, media plan and assets).
+        artifacts: Names of the job's artifacts.
+        open_artifact: Returns the chunks of an artifact by name.
+        job: Job details to record in the manifest.
+
+    Returns:
+        The entries of the package, in archive order.
+    """
+    available = set(artifacts)
+
+    def media(name: str, artifact: str) -> BundleEntry:
+        return BundleEntry(name, lambda: open_artifact(artifact))
+
+    plan = state.get("media_plan") or {}
+    assets = state.get("multimedia_assets") or {}
+    sections = assets.get("sections") or plan.get("sections") or []
+    entries: list[BundleEntry] = []
+    manifest_sections = []
+    image_names = []
+    used: set[str] = set()
+    for number, section in enumerate(sections, start=1):
+        directory = f"scenes/{number:02d}"
+        files = {}
+        image_stem = os.path.splitext(os.path.basename(section.get("image_path", "")))[
+            0
+        ]
+        # The image artifact is the delivery copy of the local source image.
+        image = next(
+            (
+                a
+                for a in artifacts
+                if image_stem and os.path.splitext(a)[0] == image_stem
+            ),
+            None,
+        )
+        if image is not None:
+            files["image"] = f"{directory}/image{os.path.splitext(image)[1]}"
+            entries.append(media(files["image"], image))
+            image_names.append(files["image"])
+            used.add(image)
+        audio = os.path.basename(section.get("audio_path", ""))
+        if audio in available:
+            files["voiceover"] = f"{directory}/voiceover.mp3"
+            entries.append(media(files["voiceover"], audio))
+            used.add(audio)
+        for key, filename in (
+            ("transcript", "transcript.txt"),
+            ("image_prompt", "prompt.txt"),
+        ):
+            if section.get(key):
+                files[key] = f"{directory}/{filename}"
+                entries.append(text_entry(files[key], section[key] + "\n"))
+        manifest_sections.append({"heading": section.get("heading"), "files": files})
+
+    videos = []
+    for artifact in artifacts:
+        if artifact in used or os.path.splitext(artifact)[0].endswith("_thumb"):
+            continue
+        if artifact.endswith(_VIDEO_SUFFIXES):
+            videos.append(f"video/{artifact}")
+            entries.append(media(videos[-1], artifact))
+        elif artifact.endswith(_IMAGE_SUFFIXES):
+            entries.append(media(f"images/{artifact}", artifact))
+
+    manifest = {**(job or {}), "sections": manifest_sections, "videos": videos}
+    head = [text_entry("manifest.json", json.dumps(manifest, indent=2) + "\n")]
+    if state.get("draft_article"):
+        head.insert(
+            0,
+            text_entry(
+                "article.md", convert_to_markdown(state["draft_article"], image_names)
+            ),
+        )
+    return head + entries
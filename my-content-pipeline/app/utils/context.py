@@ -0,0 +1,240 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Context compaction and per-stage token budgets for the content pipeline.
+
+Each stage of `content_creation_pipeline` sees the output of every earlier
+stage, which ADK replays as "[agent] said: ..." / "... tool returned result:
+..." text parts: raw search results, full extracted page text, LDA output.
+Before every model call, those parts from earlier stages are compacted:
+
+1. Whitespace runs (extracted HTML text is full of them) are collapsed.
+2. If the request is still above the stage's token budget, the oldest bulky
+   parts are replaced with a short head plus a reference to an artifact that
+   keeps the original text, until the request fits. The output of the most
+   recent earlier stage, which the current stage builds on, is kept whole.
+
+The stage's own turns are never touched, and the session keeps the original
+events; only the prompt sent to the model is compacted. Tokens saved are
+reported per stage as the `tokens_saved` usage counter.
+
+Configuration (environment variables):
+    CONTEXT_TOKEN_BUDGET: budget for stages not listed in STAGE_TOKEN_BUDGETS.
+"""
+
+import hashlib
+import logging
+import os
+import re
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+
+from google.adk.agents import BaseAgent, LlmAgent
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest
+from google.genai import types
+
+from app.utils.metrics import append_callback, record_stage_usage
+
+logger = logging.getLogger(__name__)
+
+# Per-stage prompt budgets in (estimated) tokens; None only collapses
+# whitespace. analysis_agent passes the extracted text on to analyze_themes,
+# so it is not budgeted.
+STAGE_TOKEN_BUDGETS: dict[str, int | None] = {
+    "analysis_agent": None,
+    "outline_generator_agent": 12000,
+    "writer_agent": 6000,
+    "video_producer_agent": 4000,
+}
+DEFAULT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "8000"))
+
+# Parts shorter than this are left alone, and compacted parts keep this much.
+MIN_COMPACT_CHARS = 2000
+SUMMARY_CHARS = 600
+
+# Text parts ADK builds from other agents' events (see
+# google.adk.flows.llm_flows.contents._convert_foreign_event).
+_FOREIGN_PART = re.compile(
+    r"^\[([\w-]+)\] (?:said:|called tool `[^`]+` with parameters:|`[^`]+` tool returned result:)"
+)
+# Real whitespace plus escaped newlines/tabs inside repr()'d tool results.
+_WHITESPACE = re.compile(r"(?:\s|\\[nrt])+")
+
+# Session state key recording which originals were already saved.
+_SAVED_KEY = "context_artifacts"
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token)."""
+    return len(text) // 4
+
+
+@dataclass
+class Compaction:
+    """Outcome of compacting one model request."""
+
+    tokens_before: int = 0
+    tokens_saved: int = 0
+    # Artifact filename -> original text of each part that was summarised.
+    originals: dict[str, str] = field(default_factory=dict)
+
+
+def _artifact_name(text: str) -> str:
+    return f"context_{hashlib.sha256(text.encode()).hexdigest()[:16]}.txt"
+
+
+def compact_contents(
+    contents: list[types.Content],
+    budget_tokens: int | None,
+    base_tokens: int = 0,
+) -> Compaction:
+    """Compacts other stages' parts of a request in place.
+
+    Args:
+        contents: The request contents; earlier stages' parts are edited.
+        budget_tokens: Token budget for the whole request, or None.
+        base_tokens: Tokens outside contents (e.g. the system instruction).
+
+    Returns:
+        Tokens saved and the originals of every summarised part.
+    """
+    # Each foreign part with the stage that produced it.
+    parts = [
+        (part, match.group(1))
+        for content in contents
+        if content.role == "user"
+        for part in content.parts or []
+        if part.text and (match := _FOREIGN_PART.match(part.text))
+    ]
+    total = base_tokens + sum(
+        estimate_tokens(part.text or "")
+        for content in contents
+        for part in content.parts or []
+    )
+    result = Compaction(tokens_before=total)
+
+    for part, _ in parts:
+        text = part.text or ""
+        compact = _WHITESPACE.sub(" ", text)
+        result.tokens_saved += estimate_tokens(text) - estimate_tokens(compact)
+        part.text = compact
+    total = result.tokens_before - result.tokens_saved
+
+    if budget_tokens is not None and parts:
+        # Oldest first, sparing the previous stage's output entirely.
+        previous_stage = parts[-1][1]
+        for part, stage in parts:
+            if total <= budget_tokens:
+                break
+            original = part.text or ""
+            if stage == previous_stage or len(original) < MIN_COMPACT_CHARS:
+                continue
+            match = _FOREIGN_PART.match(original)
+            prefix = match.group(0) if match else ""
+            filename = _artifact_name(original)
+            head = original[len(prefix) : len(prefix) + SUMMARY_CHARS].strip()
+            compacted = (
+                f"{prefix} [compacted from ~{estimate_tokens(original)} tokens; "
+                f"full text in artifact {filename}] {head} ..."
+            )
+            part.text = compacted
+            saved = estimate_tokens(original) - estimate_tokens(compacted)
+            result.tokens_saved += saved
+            result.originals[filename] = original
+            total -= saved
+    return result
+
+
+def context_budget_callback(
+    budget_tokens: int | None,
+) -> Callable[[CallbackContext, LlmRequest], Awaitable[None]]:
+    """Builds a before_model_callback enforcing the given token budget.
+
+    Args:
+        budget_tokens: Token budget for each model request, or None to only
+            collapse whitespace.
+
+    Returns:
+        The callback.
+    """
+
+    async def compact_context(
+        callback_context: CallbackContext, llm_request: LlmRequest
+    ) -> None:
+        instruction = str(llm_request.config.system_instruction or "")
+        result = compact_contents(
+            llm_request.contents,
+            budget_tokens,
+            base_tokens=estimate_tokens(instruction),
+        )
+        saved_names = list(callback_context.state.get(_SAVED_KEY) or [])
+        for filename, original in result.originals.items():
+            if filename in saved_names:
+                continue
+            try:
+                await callback_context.save_artifact(
+                    filename,
+                    types.Part.from_bytes(
+                        data=original.encode(), mime_type="text/plain"
+                    ),
+                )
+            except ValueError:
+                # No artifact service configured; the summary still applies.
+                logger.warning("Could not keep compacted context %s", filename)
+                continue
+            saved_names.append(filename)
+        if len(saved_names) != len(callback_context.state.get(_SAVED_KEY) or []):
+            callback_context.state[_SAVED_KEY] = saved_names
+
+        if result.tokens_saved:
+            record_stage_usage(callback_context, tokens_saved=result.tokens_saved)
+            logger.debug(
+                "Compacted %s context: %d -> %d tokens",
+                callback_context.agent_name,
+                result.tokens_before,
+                result.tokens_before - result.tokens_saved,
+            )
+
+    return compact_context
+
+
+def apply_context_budgets(
+    pipeline: BaseAgent,
+    budgets: dict[str, int | None] | None = None,
+    default_budget: int | None = DEFAULT_TOKEN_BUDGET,
+) -> BaseAgent:
+    """Attaches context compaction to every LLM agent below a pipeline.
+
+    Args:
+        pipeline: The root agent of the pipeline.
+        budgets: Token budget per agent name (default: STAGE_TOKEN_BUDGETS).
+        default_budget: Budget for agents not listed in budgets.
+
+    Returns:
+        The same agent, for chaining.
+    """
+    budgets = STAGE_TOKEN_BUDGETS if budgets is None else budgets
+
+    def visit(agent: BaseAgent) -> None:
+        for sub_agent in agent.sub_agents:
+            if isinstance(sub_agent, LlmAgent):
+                budget = budgets.get(sub_agent.name, default_budget)
+                append_callback(
+                    sub_agent, "before_model_callback", context_budget_callback(budget)
+                )
+            visit(sub_agent)
+
+    visit(pipeline)
+    return pipeline
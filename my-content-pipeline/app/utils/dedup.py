@@ -0,0 +1,197 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Near-duplicate and boilerplate filtering of extracted source texts.
+
+Search results often include syndicated copies of one article, and pages
+from the same site share navigation, cookie banners and footers. Before the
+sources reach the analysis and outline stages:
+
+1. Each page gets a MinHash signature over the word shingles of its text
+   without boilerplate, i.e. without short lines (up to
+   BOILERPLATE_MAX_WORDS words) that occur more than once across the pages.
+   A page whose estimated Jaccard similarity to an earlier kept page
+   reaches the threshold is dropped as a near-duplicate of it. Comparing
+   without boilerplate keeps two different articles of one site apart
+   however much navigation and footer text they share, while syndicated
+   copies still match on their paragraphs.
+2. Lines repeated across the remaining pages (or within one) are kept only
+   where they first appear, which strips shared boilerplate.
+3. Pages with little text left afterwards are dropped as boilerplate-heavy.
+
+Shingle hashing and MinHash are vectorized with numpy.
+"""
+
+import zlib
+from collections import Counter
+from dataclasses import dataclass, field
+
+import numpy as np
+
+SHINGLE_WORDS = 5
+NUM_PERMUTATIONS = 128
+DUPLICATE_THRESHOLD = 0.8
+MIN_CONTENT_CHARS = 200
+# Repeated lines up to this long are boilerplate; longer ones are content
+# (e.g. paragraphs of a syndicated article).
+BOILERPLATE_MAX_WORDS = 40
+
+_rng = np.random.default_rng(0x5EED)
+# One random permutation of the 64-bit hash space per signature value:
+# x -> a * x + b (mod 2**64) is a bijection for odd a.
+_PERM_A = _rng.integers(0, 1 << 63, NUM_PERMUTATIONS, dtype=np.uint64) * np.uint64(
+    2
+) + np.uint64(1)
+_PERM_B = _rng.integers(0, 1 << 63, NUM_PERMUTATIONS, dtype=np.uint64)
+
+
+@dataclass
+class DedupResult:
+    """Sources kept after filtering and what was dropped."""
+
+    kept: dict[str, str]
+    # Dropped source -> the kept source it duplicates, or None if it was
+    # dropped for being (almost) all boilerplate.
+    dropped: dict[str, str | None] = field(default_factory=dict)
+    bytes_before: int = 0
+    bytes_after: int = 0
+
+    @property
+    def bytes_dropped(self) -> int:
+        return self.bytes_before - self.bytes_after
+
+    @property
+    def tokens_dropped(self) -> int:
+        # Same four-characters-per-token estimate as app/utils/context.py.
+        return self.bytes_dropped // 4
+
+
+def shingle_hashes(text: str, size: int = SHINGLE_WORDS) -> np.ndarray:
+    """Hashes of the text's word shingles (lower-cased, `size` words each)."""
+    words = text.lower().split()
+    if not words:
+        return np.zeros(0, dtype=np.uint64)
+    word_hashes = np.fromiter(
+        (zlib.crc32(w.encode()) for w in words), dtype=np.uint64, count=len(words)
+    )
+    if len(words) < size:
+        size = len(words)
+    # Polynomial combination of consecutive word hashes, modulo 2**64.
+    windows = np.lib.stride_tricks.sliding_window_view(word_hashes, size)
+    powers = np.uint64(1_000_003) ** np.arange(size, dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        return np.unique((windows * powers).sum(axis=1, dtype=np.uint64))
+
+
+def minhash(shingles: np.ndarray) -> np.ndarray:
+    """MinHash signature (NUM_PERMUTATIONS values) of a set of shingle hashes."""
+    if shingles.size == 0:
+        return np.full(NUM_PERMUTATIONS, np.iinfo(np.uint64).max, dtype=np.uint64)
+    # (shingles x permutations) in one pass; uint64 arithmetic wraps.
+    with np.errstate(over="ignore"):
+        return (shingles[:, None] * _PERM_A + _PERM_B).min(axis=0)
+
+
+def similarity_matrix(signatures: np.ndarray) -> np.ndarray:
+    """Estimated pairwise Jaccard similarity of stacked MinHash signatures."""
+    return (signatures[:, None, :] == signatures[None, :, :]).mean(axis=2)
+
+
+def _line_key(line: str) -> str:
+    return " ".join(line.lower().split())
+
+
+def boilerplate_lines(
+    texts: list[str], max_words: int = BOILERPLATE_MAX_WORDS
+) -> set[str]:
+    """Short lines (normalized) occurring more than once across all texts."""
+    counts = Counter(
+        key for text in texts for key in map(_line_key, text.splitlines()) if key
+    )
+    return {key for key, n in counts.items() if n > 1 and len(key.split()) <= max_words}
+
+
+def strip_repeated_lines(texts: list[str]) -> list[str]:
+    """Keeps each distinct line only where it first occurs across all texts."""
+    seen: set[str] = set()
+    stripped = []
+    for text in texts:
+        lines = []
+        for line in text.splitlines():
+            key = _line_key(line)
+            if not key or key in seen:
+                continue
+            seen.add(key)
+            lines.append(line.strip())
+        stripped.append("\n".join(lines))
+    return stripped
+
+
+def deduplicate_sources(
+    sources: dict[str, str],
+    threshold: float = DUPLICATE_THRESHOLD,
+    min_content_chars: int = MIN_CONTENT_CHARS,
+) -> DedupResult:
+    """Strips boilerplate and drops near-duplicate sources.
+
+    Args:
+        sources: Extracted text keyed by source (e.g. URL), in priority order;
+            of two duplicates, the earlier one is kept.
+        threshold: Estimated Jaccard similarity at which a page counts as a
+            duplicate.
+        min_content_chars: Pages with less text after stripping boilerplate
+            are dropped.
+
+    Returns:
+        The kept sources, in their original order, and what was dropped.
+    """
+    names = list(sources)
+    result = DedupResult(
+        kept={}, bytes_before=sum(len(text.encode()) for text in sources.values())
+    )
+    if not names:
+        return result
+
+    boilerplate = boilerplate_lines(list(sources.values()))
+    content = [
+        "\n".join(
+            line
+            for line in sources[name].splitlines()
+            if _line_key(line) not in boilerplate
+        )
+        for name in names
+    ]
+    signatures = np.stack([minhash(shingle_hashes(text)) for text in content])
+    similarity = similarity_matrix(signatures)
+    kept_indices: list[int] = []
+    for i, name in enumerate(names):
+        duplicate_of = next(
+            (j for j in kept_indices if similarity[i, j] >= threshold), None
+        )
+        if duplicate_of is None:
+            kept_indices.append(i)
+        else:
+            result.dropped[name] = names[duplicate_of]
+
+    unique = [names[i] for i in kept_indices]
+    for name, text in zip(
+        unique, strip_repeated_lines([sources[n] for n in unique]), strict=True
+    ):
+        if len(text) < min_content_chars:
+            result.dropped[name] = None
+        else:
+            result.kept[name] = text
+
+    result.bytes_after = sum(len(text.encode()) for text in result.kept.values())
+    return result
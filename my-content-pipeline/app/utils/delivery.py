@@ -0,0 +1,318 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Delivery of media artifacts through short-lived URLs instead of the API.
+
+By default `/jobs/{job_id}/artifacts/{filename}` loads an artifact and sends
+its bytes from the API process, which ties up a worker for as long as a
+video download lasts. With a delivery mode set, media artifacts (images,
+audio and video, see DELIVERED_SUFFIXES) are answered with a redirect to a
+URL that expires after ARTIFACT_URL_TTL_S instead:
+
+- "signed": a V4 signed URL of the artifact's blob in the GCS bucket, so
+  downloads go to Cloud Storage directly. Credentials without a private key
+  (e.g. on Cloud Run) sign through the IAM signBlob API, which needs the
+  Service Account Token Creator role on the app's own service account.
+  User credentials (e.g. `gcloud auth application-default login` in local
+  development) cannot sign at all; artifacts are then proxied, with a
+  warning logged once.
+- "local": a stand-in for development without GCS, with the same URL
+  contract. The artifact is copied once into LOCAL_DELIVERY_DIR and served
+  under `/delivery` as a static file, checked against an HMAC signature and
+  expiry; behind a static file server that path would bypass the API too.
+  Copies whose last URL has expired are deleted, at most every
+  ARTIFACT_URL_TTL_S, when a URL is handed out.
+
+Text artifacts, e.g. the preview playlist whose segment references resolve
+against the API path, are always proxied.
+
+Configuration (environment variables):
+    ARTIFACT_DELIVERY: "proxy" (default), "signed" or "local".
+    ARTIFACT_URL_TTL_S: lifetime of delivery URLs in seconds (default 900).
+    LOCAL_DELIVERY_DIR: directory local delivery serves from.
+    LOCAL_DELIVERY_SECRET: key signing local delivery URLs (default: random
+        per process, so URLs do not survive a restart).
+"""
+
+import asyncio
+import datetime
+import hashlib
+import hmac
+import logging
+import os
+import secrets
+import shutil
+import tempfile
+import time
+from collections.abc import AsyncIterator
+from dataclasses import dataclass
+from urllib.parse import quote, urlencode
+
+import google.auth.credentials
+import google.cloud.storage as storage
+from google.adk.artifacts import BaseArtifactService, GcsArtifactService
+from google.auth.transport import requests as google_requests
+
+from app.utils.bundle import artifact_chunks
+from app.utils.gcs import latest_artifact_blob
+
+logger = logging.getLogger(__name__)
+
+DELIVERY_MODE = os.getenv("ARTIFACT_DELIVERY", "proxy")
+URL_TTL_S = int(os.getenv("ARTIFACT_URL_TTL_S", "900"))
+LOCAL_DELIVERY_DIR = os.getenv(
+    "LOCAL_DELIVERY_DIR",
+    os.path.join(tempfile.gettempdir(), "content-pipeline-delivery"),
+)
+LOCAL_DELIVERY_PATH = "/delivery"
+
+DELIVERED_SUFFIXES = (".mp4", ".ts", ".mp3", ".wav", ".webp", ".jpg", ".jpeg", ".png")
+
+# A cached URL is handed out while it has at least this share of its lifetime left.
+_MIN_REMAINING = 0.5
+
+
+@dataclass
+class DeliveryUrl:
+    """A URL an artifact can be downloaded from until it expires."""
+
+    url: str
+    expires_at: float
+
+
+class DeliveryUnavailable(RuntimeError):
+    """Raised when no delivery URL can be made; the artifact is proxied instead."""
+
+
+def delivered(filename: str) -> bool:
+    """Whether an artifact is handed out by URL rather than proxied."""
+    return filename.lower().endswith(DELIVERED_SUFFIXES)
+
+
+class SignedUrlDelivery:
+    """Hands out V4 signed URLs of artifacts in a GCS artifact service's bucket."""
+
+    def __init__(
+        self, artifact_service: GcsArtifactService, ttl_s: int = URL_TTL_S
+    ) -> None:
+        """
+        Initialize the delivery.
+
+        Args:
+            artifact_service: The service whose bucket holds the artifacts.
+            ttl_s: Lifetime of the URLs in seconds.
+        """
+        self.artifact_service = artifact_service
+        self.ttl_s = ttl_s
+        self._urls: dict[str, DeliveryUrl] = {}
+        # Why the credentials cannot sign, once found out.
+        self._unavailable: str | None = None
+
+    async def url(
+        self, *, app_name: str, user_id: str, session_id: str, filename: str
+    ) -> DeliveryUrl:
+        """Returns a signed URL of the latest version of an artifact.
+
+        Raises:
+            FileNotFoundError: If the artifact does not exist.
+            DeliveryUnavailable: If the credentials cannot sign URLs.
+        """
+        if self._unavailable is not None:
+            raise DeliveryUnavailable(self._unavailable)
+        blob = await latest_artifact_blob(
+            self.artifact_service,
+            app_name=app_name,
+            user_id=user_id,
+            session_id=session_id,
+            filename=filename,
+        )
+        # Versions are immutable, so a URL is reused while it is fresh enough;
+        # signing through IAM costs a round trip.
+        cached = self._urls.get(blob.name)
+        if (
+            cached is not None
+            and cached.expires_at - time.time() > self.ttl_s * _MIN_REMAINING
+        ):
+            return cached
+        expires_at = time.time() + self.ttl_s
+        url = await asyncio.to_thread(self._sign, blob)
+        self._urls = {k: v for k, v in self._urls.items() if v.expires_at > time.time()}
+        self._urls[blob.name] = DeliveryUrl(url, expires_at)
+        return self._urls[blob.name]
+
+    def _sign(self, blob: storage.Blob) -> str:
+        options = {}
+        credentials = self.artifact_service.storage_client._credentials
+        if not isinstance(credentials, google.auth.credentials.Signing):
+            if not hasattr(credentials, "service_account_email"):
+                self._unavailable = (
+                    f"{type(credentials).__name__} credentials cannot sign URLs; signed "
+                    "delivery needs a service account (ARTIFACT_DELIVERY=local works "
+                    "with user credentials)"
+                )
+                logger.warning("Proxying artifacts: %s", self._unavailable)
+                raise DeliveryUnavailable(self._unavailable)
+            # Token-only credentials sign through IAM as their service account.
+            if not credentials.valid:
+                credentials.refresh(google_requests.Request())
+            options = {
+                "service_account_email": credentials.service_account_email,
+                "access_token": credentials.token,
+            }
+        return blob.generate_signed_url(
+            version="v4",
+            expiration=datetime.timedelta(seconds=self.ttl_s),
+            method="GET",
+            **options,
+        )
+
+
+class LocalDelivery:
+    """Serves artifacts from a local directory under HMAC-signed, expiring URLs."""
+
+    def __init__(
+        self,
+        artifact_service: BaseArtifactService,
+        directory: str = LOCAL_DELIVERY_DIR,
+        ttl_s: int = URL_TTL_S,
+        secret: bytes | None = None,
+    ) -> None:
+        """
+        Initialize the delivery.
+
+        Args:
+            artifact_service: Where the artifacts are loaded from.
+            directory: Where artifacts are copied to be served.
+            ttl_s: Lifetime of the URLs in seconds.
+            secret: Key signing the URLs.
+        """
+        self.artifact_service = artifact_service
+        self.directory = directory
+        self.ttl_s = ttl_s
+        configured = os.getenv("LOCAL_DELIVERY_SECRET")
+        self._secret = secret or (
+            configured.encode() if configured else secrets.token_bytes(32)
+        )
+        self._last_prune = 0.0
+        os.makedirs(directory, exist_ok=True)
+
+    async def url(
+        self, *, app_name: str, user_id: str, session_id: str, filename: str
+    ) -> DeliveryUrl:
+        """Copies the latest version of an artifact out, if not done yet, and returns its URL.
+
+        Raises:
+            FileNotFoundError: If the artifact does not exist.
+        """
+        versions = await self.artifact_service.list_versions(
+            app_name=app_name, user_id=user_id, session_id=session_id, filename=filename
+        )
+        if not versions:
+            raise FileNotFoundError(filename)
+        key = hashlib.sha256(
+            "/".join(
+                [app_name, user_id, session_id, filename, str(max(versions))]
+            ).encode()
+        ).hexdigest()[:32]
+        if time.time() - self._last_prune >= self.ttl_s:
+            self._last_prune = time.time()
+            await asyncio.to_thread(self.prune)
+        # The copy's directory is touched on every hand-out; its mtime is
+        # when the newest URL to it was made.
+        os.makedirs(os.path.join(self.directory, key), exist_ok=True)
+        os.utime(os.path.join(self.directory, key))
+        path = os.path.join(self.directory, key, filename)
+        if not os.path.exists(path):
+            chunks = artifact_chunks(
+                self.artifact_service,
+                app_name=app_name,
+                user_id=user_id,
+                session_id=session_id,
+                filename=filename,
+            )
+            await _write_atomically(path, chunks)
+        expires_at = time.time() + self.ttl_s
+        expires = str(int(expires_at))
+        query = urlencode(
+            {"expires": expires, "signature": self._signature(key, filename, expires)}
+        )
+        return DeliveryUrl(
+            f"{LOCAL_DELIVERY_PATH}/{key}/{quote(filename)}?{query}", expires_at
+        )
+
+    def resolve(self, key: str, filename: str, expires: str, signature: str) -> str:
+        """The file a delivery URL points to.
+
+        Raises:
+            PermissionError: If the signature is wrong or the URL expired.
+            FileNotFoundError: If the file is gone.
+        """
+        if not hmac.compare_digest(signature, self._signature(key, filename, expires)):
+            raise PermissionError("Invalid signature")
+        if not expires.isdigit() or int(expires) < time.time():
+            raise PermissionError("URL expired")
+        path = os.path.join(self.directory, key, filename)
+        if not os.path.isfile(path):
+            raise FileNotFoundError(filename)
+        return path
+
+    def prune(self) -> int:
+        """Deletes the copies whose URLs have all expired.
+
+        Returns:
+            The number of copies deleted.
+        """
+        expired = time.time() - self.ttl_s
+        removed = 0
+        for entry in os.scandir(self.directory):
+            if entry.is_dir() and entry.stat().st_mtime < expired:
+                shutil.rmtree(entry.path, ignore_errors=True)
+                removed += 1
+        return removed
+
+    def _signature(self, key: str, filename: str, expires: str) -> str:
+        message = f"{key}/{filename}:{expires}".encode()
+        return hmac.new(self._secret, message, hashlib.sha256).hexdigest()
+
+
+async def _write_atomically(path: str, chunks: AsyncIterator[bytes]) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            async for chunk in chunks:
+                f.write(chunk)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def create_delivery(
+    artifact_service: BaseArtifactService, mode: str = DELIVERY_MODE
+) -> SignedUrlDelivery | LocalDelivery | None:
+    """Creates the delivery for a mode, or None to proxy artifacts.
+
+    Raises:
+        ValueError: If the mode is unknown, or "signed" without a GCS artifact service.
+    """
+    if mode == "proxy":
+        return None
+    if mode == "local":
+        return LocalDelivery(artifact_service)
+    if mode == "signed":
+        if not isinstance(artifact_service, GcsArtifactService):
+            raise ValueError("Signed URL delivery needs a GCS artifact service")
+        return SignedUrlDelivery(artifact_service)
+    raise ValueError(f"Unknown artifact delivery mode {mode!r}")
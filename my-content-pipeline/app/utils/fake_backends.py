@@ -0,0 +1,469 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Deterministic local stand-ins for Gemini, Imagen, TTS and web search.
+
+`install_fake_backends` swaps every remote model backend for a fake with
+configurable latency and payload sizes so the full pipeline (including the
+real moviepy/ffmpeg render) can be benchmarked and load tested without
+Vertex AI. It is used by tests/benchmark and, when FAKE_MODEL_BACKENDS is
+set, by the server for load tests. Container images leave this module out
+unless built with `--build-arg FAKE_MODEL_BACKENDS=1`.
+
+- Gemini: `FakeLlm` is registered for every `gemini-*` model name and
+  scripts each agent's turns (tool calls, then a final answer).
+- google_search: the research agent's answer lists pages served by a local
+  HTTP server, which `extract_content_from_url` then fetches for real.
+- Imagen / TTS: `FakeImageModel` and `FakeTtsClient` return generated PNG
+  and MP3 payloads of the configured size and duration.
+"""
+
+import asyncio
+import hashlib
+import io
+import json
+import logging
+import os
+import random
+import re
+import subprocess
+import threading
+import time
+from collections.abc import AsyncGenerator
+from dataclasses import asdict, dataclass, fields
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, ClassVar
+
+from google.adk.models import BaseLlm, LlmRequest, LlmResponse
+from google.adk.models.registry import LLMRegistry
+from google.genai import types
+
+from app.utils.backends import set_backends
+
+logger = logging.getLogger(__name__)
+
+WORDS = (
+    "system design signal network latency model video frame audio research "
+    "history future energy market policy culture science data learning story "
+    "insight pattern growth value craft process quality motion light sound"
+).split()
+
+
+@dataclass
+class FakeBackendConfig:
+    """Latency and payload knobs for the fake backends."""
+
+    sections: int = 8
+    article_words: int = 1200
+    llm_latency_s: float = 0.0
+    image_latency_s: float = 0.0
+    tts_latency_s: float = 0.0
+    search_results: int = 3
+    page_kb: int = 40
+    # Pages per story: /article/<i> is a lightly edited copy of story
+    # i // syndication, like syndicated news.
+    syndication: int = 1
+    image_width: int = 1408
+    image_height: int = 768
+    image_noise: int = 24
+    words_per_second: float = 2.5
+    seed: int = 0
+
+    @classmethod
+    def from_env(cls, prefix: str = "FAKE_") -> "FakeBackendConfig":
+        """Builds a config from environment variables such as FAKE_SECTIONS."""
+        values: dict[str, Any] = {}
+        for f in fields(cls):
+            raw = os.getenv(f"{prefix}{f.name.upper()}")
+            if raw is not None:
+                values[f.name] = type(f.default)(raw)
+        return cls(**values)
+
+
+def _rng(*parts: Any) -> random.Random:
+    digest = hashlib.sha256("|".join(map(str, parts)).encode()).digest()
+    return random.Random(int.from_bytes(digest[:8], "big"))
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    text = " ".join(rng.choice(WORDS) for _ in range(words))
+    return text.capitalize() + "."
+
+
+def _paragraph(rng: random.Random, words: int) -> str:
+    sentences = []
+    while words > 0:
+        n = min(words, rng.randint(8, 16))
+        sentences.append(_sentence(rng, n))
+        words -= n
+    return " ".join(sentences)
+
+
+class _FakeImage:
+    def __init__(self, image_bytes: bytes) -> None:
+        self._image_bytes = image_bytes
+
+
+class FakeImageModel:
+    """Imagen stand-in returning a deterministic PNG per prompt."""
+
+    def __init__(self, config: FakeBackendConfig) -> None:
+        self.config = config
+
+    def generate_images(
+        self,
+        prompt: str,
+        number_of_images: int = 1,
+        aspect_ratio: str = "16:9",
+        **options: Any,
+    ) -> list[_FakeImage]:
+        import numpy as np
+        from PIL import Image
+
+        time.sleep(self.config.image_latency_s)
+        width, height = self.config.image_width, self.config.image_height
+        if aspect_ratio == "9:16":
+            width, height = height, width
+        elif aspect_ratio == "1:1":
+            width = height
+        seed = _rng(self.config.seed, prompt).getrandbits(32)
+        generator = np.random.default_rng(seed)
+        base = generator.integers(0, 256, size=3)
+        ramp = np.linspace(0, 1, width, dtype=np.float32)[None, :, None]
+        pixels = base * (0.5 + 0.5 * ramp) * np.ones((height, 1, 1), np.float32)
+        # Noise amplitude controls how well the PNG compresses, i.e. its size.
+        noise = generator.integers(
+            -self.config.image_noise,
+            self.config.image_noise + 1,
+            size=(height, width, 3),
+        )
+        pixels = np.clip(pixels + noise, 0, 255).astype(np.uint8)
+        images = []
+        for _ in range(number_of_images):
+            buffer = io.BytesIO()
+            Image.fromarray(pixels).save(buffer, format="PNG")
+            images.append(_FakeImage(buffer.getvalue()))
+        return images
+
+
+@lru_cache(maxsize=64)
+def _tone_mp3(tenths_of_second: int) -> bytes:
+    """Encodes a quiet tone of the given length as 24 kHz mono MP3."""
+    import imageio_ffmpeg
+
+    duration = max(tenths_of_second, 1) / 10
+    return subprocess.run(
+        [
+            imageio_ffmpeg.get_ffmpeg_exe(),
+            "-loglevel",
+            "error",
+            "-f",
+            "lavfi",
+            "-i",
+            f"sine=frequency=220:sample_rate=24000:duration={duration}",
+            "-ac",
+            "1",
+            "-c:a",
+            "libmp3lame",
+            "-b:a",
+            "32k",
+            "-f",
+            "mp3",
+            "pipe:1",
+        ],
+        check=True,
+        capture_output=True,
+    ).stdout
+
+
+class _FakeSynthesisResponse:
+    def __init__(self, audio_content: bytes) -> None:
+        self.audio_content = audio_content
+
+
+class FakeTtsClient:
+    """TextToSpeechClient stand-in; clip length follows the word count."""
+
+    def __init__(self, config: FakeBackendConfig) -> None:
+        self.config = config
+
+    def synthesize_speech(
+        self, input: Any, voice: Any, audio_config: Any, **_: Any
+    ) -> _FakeSynthesisResponse:
+        time.sleep(self.config.tts_latency_s)
+        words = len(input.text.split())
+        seconds = words / self.config.words_per_second
+        return _FakeSynthesisResponse(_tone_mp3(round(seconds * 10)))
+
+
+class _PageHandler(BaseHTTPRequestHandler):
+    config: ClassVar[FakeBackendConfig]
+
+    def do_GET(self) -> None:
+        match = re.search(r"(\d+)$", self.path)
+        index = int(match.group(1)) if match else 0
+        story = index // max(self.config.syndication, 1)
+        rng = _rng(self.config.seed, re.sub(r"\d+$", str(story), self.path))
+        words = self.config.page_kb * 1024 // 7
+        paragraphs = [_paragraph(rng, 80) for _ in range(max(words // 80, 1))]
+        if index != story * max(self.config.syndication, 1):
+            # Syndicated copies rewrite one paragraph.
+            paragraphs[index % len(paragraphs)] = _paragraph(_rng(self.path), 80)
+        body = "\n".join(f"<p>{p}</p>" for p in paragraphs)
+        html = (
+            f"<html><head><title>{self.path}</title>"
+            "<script>var tracking = true;</script><style>p { margin: 0 }</style>"
+            "</head><body>\n<nav>Home | News | Science | About us</nav>\n"
+            f"<article>\n<p>Published by outlet {index}</p>\n{body}\n</article>\n"
+            "<footer>We use cookies to improve your experience. Subscribe to our newsletter.</footer>"
+            "\n</body></html>"
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(html)))
+        self.end_headers()
+        self.wfile.write(html)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+_AGENT_NAME = re.compile(r'Your internal name is "([^"]+)"')
+
+
+def _history_text(llm_request: LlmRequest) -> str:
+    chunks = []
+    for content in llm_request.contents:
+        for part in content.parts or []:
+            if part.text:
+                chunks.append(part.text)
+            elif part.function_response:
+                chunks.append(json.dumps(part.function_response.response, default=str))
+    return "\n".join(chunks)
+
+
+def _unique(items: list[str]) -> list[str]:
+    return list(dict.fromkeys(items))
+
+
+class FakeLlm(BaseLlm):
+    """Scripted Gemini stand-in that drives each pipeline agent's tools."""
+
+    config: ClassVar[FakeBackendConfig] = FakeBackendConfig()
+    search_base_url: ClassVar[str] = "http://127.0.0.1"
+
+    @classmethod
+    def supported_models(cls) -> list[str]:
+        return [r"gemini-.*"]
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        await asyncio.sleep(self.config.llm_latency_s)
+        instruction = str(llm_request.config.system_instruction or "")
+        match = _AGENT_NAME.search(instruction)
+        agent_name = match.group(1) if match else ""
+        history = _history_text(llm_request)
+        last = llm_request.contents[-1] if llm_request.contents else None
+        tools_done = bool(
+            last and any(part.function_response for part in last.parts or [])
+        )
+
+        # Agents with include_contents="none" get their inputs templated into
+        # the instruction, so handlers see it along with the history.
+        handler = getattr(self, f"_{re.sub(r'_[0-9]+$', '', agent_name)}", None)
+        parts = handler(f"{instruction}\n{history}", tools_done) if handler else None
+        if parts is None:
+            parts = [types.Part.from_text(text=f"Done: {agent_name or 'request'}.")]
+
+        response_chars = sum(len(p.text or str(p.function_call)) for p in parts)
+        yield LlmResponse(
+            content=types.Content(role="model", parts=parts),
+            usage_metadata=types.GenerateContentResponseUsageMetadata(
+                prompt_token_count=(len(instruction) + len(history)) // 4,
+                candidates_token_count=response_chars // 4,
+            ),
+        )
+
+    @staticmethod
+    def _calls(name: str, arg_list: list[dict[str, Any]]) -> list[types.Part]:
+        return [
+            types.Part.from_function_call(name=name, args=args) for args in arg_list
+        ]
+
+    def _sections(self, history: str) -> list[tuple[str, str]]:
+        """Splits the fake article from the history into (heading, text)."""
+        found = re.findall(r"## (Section \d+[^\n]*)\n\n([^#\[]+)", history)
+        if found:
+            return [(h.strip(), t.strip()) for h, t in found][: self.config.sections]
+        rng = _rng(self.config.seed, "sections")
+        return [
+            (f"Section {i + 1}", _paragraph(rng, 40))
+            for i in range(self.config.sections)
+        ]
+
+    def _interactive_coordinator_agent(
+        self, history: str, tools_done: bool
+    ) -> list[types.Part] | None:
+        if tools_done:
+            return [types.Part.from_text(text="Your video is ready.")]
+        topic = history.strip().splitlines()[-1] if history.strip() else "a topic"
+        return self._calls("content_creation_pipeline", [{"request": topic}])
+
+    def _query_planner_agent(self, history: str, tools_done: bool) -> list[types.Part]:
+        rng = _rng(self.config.seed, "queries")
+        queries = [_sentence(rng, 5) for _ in range(3)]
+        return [types.Part.from_text(text=json.dumps({"queries": queries}))]
+
+    def _search_agent(self, history: str, tools_done: bool) -> list[types.Part]:
+        # Each query finds search_results pages out of a pool twice that size,
+        # so concurrent searches overlap like real ones do.
+        query = re.search(r"Search the web for: ([^\n]*)", history)
+        rng = _rng(self.config.seed, query.group(1) if query else "search")
+        pool = self.config.search_results * 2
+        picks = sorted(rng.sample(range(pool), min(self.config.search_results, pool)))
+        lines = ["Search results:"]
+        for i in picks:
+            url = f"{self.search_base_url}/article/{i}"
+            lines.append(f"- {_sentence(rng, 6)} {url}")
+        return [types.Part.from_text(text="\n".join(lines))]
+
+    def _analysis_agent(self, history: str, tools_done: bool) -> list[types.Part]:
+        if tools_done:
+            return [types.Part.from_text(text="Key themes identified.")]
+        return self._calls("analyze_themes", [{"text": history[-20000:]}])
+
+    def _outline_generator_agent(
+        self, history: str, tools_done: bool
+    ) -> list[types.Part]:
+        rng = _rng(self.config.seed, "outline")
+        lines = [
+            "Title: A Benchmark Story",
+            "Tone: professional and informative",
+            "Sections:",
+        ]
+        for i in range(self.config.sections):
+            lines.append(
+                f"{i + 1}. Section {i + 1}: {_sentence(rng, 4)} - {_sentence(rng, 10)}"
+            )
+        return [types.Part.from_text(text="\n".join(lines))]
+
+    def _writer_agent(self, history: str, tools_done: bool) -> list[types.Part]:
+        rng = _rng(self.config.seed, "article")
+        per_section = max(self.config.article_words // self.config.sections, 10)
+        body = ["# A Benchmark Story"]
+        for i in range(self.config.sections):
+            body.append(f"## Section {i + 1}\n\n{_paragraph(rng, per_section)}")
+        return [types.Part.from_text(text="\n\n".join(body))]
+
+    def _outline_image_planner_agent(
+        self, history: str, tools_done: bool
+    ) -> list[types.Part]:
+        # The outline can appear both in the instruction and in the history.
+        headings = list(
+            dict.fromkeys(re.findall(r"\d+\. (Section \d+):", history))
+        ) or [f"Section {i + 1}" for i in range(self.config.sections)]
+        plan = {
+            "sections": [
+                {"heading": h, "image_prompt": f"An illustration of {h}"}
+                for h in headings
+            ]
+        }
+        return [types.Part.from_text(text=json.dumps(plan))]
+
+    def _media_planner_agent(self, history: str, tools_done: bool) -> list[types.Part]:
+        plan = {
+            "sections": [
+                {
+                    "heading": h,
+                    "transcript": t,
+                    "image_prompt": f"An illustration of {h}",
+                }
+                for h, t in self._sections(history)
+            ]
+        }
+        return [types.Part.from_text(text=json.dumps(plan))]
+
+    def _source_summarizer(self, history: str, tools_done: bool) -> list[types.Part]:
+        # Extractive: the excerpt's first words plus any citations it carries.
+        limit = re.search(r"at most (\d+) words", history)
+        excerpt = (
+            history.split("\n\n", 1)[-1] if limit is None else history[limit.end() :]
+        )
+        citations = re.findall(r"\[\d+:\d+-\d+\]", excerpt)
+        words = re.sub(r"\[\d+:\d+-\d+\]", "", excerpt).split()
+        count = int(limit.group(1)) if limit else 100
+        return [types.Part.from_text(text=" ".join(words[:count] + citations))]
+
+    def _video_producer_agent(self, history: str, tools_done: bool) -> list[types.Part]:
+        if tools_done:
+            return [types.Part.from_text(text="The video has been created.")]
+        return self._calls(
+            "create_video_from_assets",
+            [
+                {
+                    "image_paths": _unique(
+                        re.findall(r"[\w./-]*images/image_[\w-]+\.png", history)
+                    ),
+                    "audio_paths": _unique(
+                        re.findall(r"[\w./-]*audio/audio_[\w-]+\.mp3", history)
+                    ),
+                }
+            ],
+        )
+
+
+@dataclass
+class FakeBackends:
+    """Handle to installed fakes; `close()` stops the local web server."""
+
+    config: FakeBackendConfig
+    server: ThreadingHTTPServer
+
+    @property
+    def search_base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host!s}:{port}"
+
+    def close(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def describe(self) -> dict[str, Any]:
+        return {**asdict(self.config), "search_base_url": self.search_base_url}
+
+
+def install_fake_backends(config: FakeBackendConfig | None = None) -> FakeBackends:
+    """Routes Gemini, Imagen, TTS and web search to deterministic local fakes.
+
+    Args:
+        config: Latency and payload settings; defaults to FakeBackendConfig().
+
+    Returns:
+        A FakeBackends handle describing what was installed.
+    """
+    config = config or FakeBackendConfig()
+    _PageHandler.config = config
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _PageHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    backends = FakeBackends(config=config, server=server)
+
+    FakeLlm.config = config
+    FakeLlm.search_base_url = backends.search_base_url
+    LLMRegistry.register(FakeLlm)
+    LLMRegistry.resolve.cache_clear()
+    set_backends(image_model=FakeImageModel(config), tts_client=FakeTtsClient(config))
+    logger.info("Installed fake model backends: %s", backends.describe())
+    return backends
@@ -12,10 +12,28 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import asyncio
+import contextlib
+import hashlib
 import logging
+import time
+from collections.abc import Callable
+from typing import Any
 
 import google.cloud.storage as storage
+from google.adk.artifacts import GcsArtifactService
 from google.api_core import exceptions
+from google.genai import types
+
+logger = logging.getLogger(__name__)
+
+# Where ContentAddressedGcsArtifactService stores contents, by SHA-256, and
+# the references to each content, under `<content>/refs/`.
+CONTENT_PREFIX = "_content/"
+# Metadata key of the content hash on an artifact version's blob.
+CONTENT_HASH_KEY = "content-sha256"
+# Metadata key marking an artifact version saved from a text part.
+TEXT_PART_KEY = "text-part"
 
 
 def create_bucket_if_not_exists(bucket_name: str, project: str, location: str) -> None:
@@ -40,3 +58,240 @@ def create_bucket_if_not_exists(bucket_name: str, project: str, location: str) -
             project=project,
         )
         logging.info(f"Created bucket {bucket.name} in {bucket.location}")
+
+
+class ContentAddressedGcsArtifactService(GcsArtifactService):
+    """GcsArtifactService that stores each distinct artifact content once.
+
+    The bytes of an artifact are uploaded once per content, to
+    `_content/<sha256>` in the bucket. An artifact version is an empty blob
+    at the name GcsArtifactService gives it, referencing its content by the
+    hash in its metadata, so retries and re-runs that save the same bytes
+    under new names, sessions or users only write a reference. Versions
+    without a reference, e.g. saved by a plain GcsArtifactService, are read
+    as before.
+
+    Each version also has a marker blob, `_content/<sha256>/refs/<version
+    blob name>`, so the references of a content are listed by prefix.
+    Deleting an artifact deletes its versions and markers, and then each
+    content whose last marker went with them. A save that crashes between
+    writing its marker and its version leaves the content in place until
+    the marker is removed.
+
+    Only the public methods of GcsArtifactService are overridden. Its blob
+    naming and version listing are reused, so that both services read the
+    same artifacts; tests/unit/test_gcs.py checks their signatures.
+    """
+
+    def __init__(self, bucket_name: str | Callable[[], str], **kwargs: Any) -> None:
+        """
+        Initialize the service without connecting to Cloud Storage.
+
+        Args:
+            bucket_name: The bucket, or a function returning it, called when
+                the bucket is first used.
+            **kwargs: Keyword arguments of the Cloud Storage client.
+        """
+        # Creating the client resolves credentials, which can take a metadata
+        # server round trip, so GcsArtifactService is initialized on first
+        # use of its attributes, not at import.
+        self._bucket_name = bucket_name
+        self._client_kwargs = kwargs
+
+    def __getattr__(self, name: str) -> Any:
+        if name not in ("bucket_name", "storage_client", "bucket"):
+            raise AttributeError(name)
+        bucket_name = self._bucket_name
+        super().__init__(
+            bucket_name if isinstance(bucket_name, str) else bucket_name(),
+            **self._client_kwargs,
+        )
+        return getattr(self, name)
+
+    def _content_blob(self, sha256: str) -> storage.Blob:
+        return self.bucket.blob(CONTENT_PREFIX + sha256)
+
+    def _marker_blob(self, sha256: str, reference_name: str) -> storage.Blob:
+        return self.bucket.blob(f"{CONTENT_PREFIX}{sha256}/refs/{reference_name}")
+
+    def resolve(self, blob: storage.Blob) -> storage.Blob:
+        """The blob holding the bytes of an artifact version's blob (with its metadata loaded)."""
+        sha256 = (blob.metadata or {}).get(CONTENT_HASH_KEY)
+        return self._content_blob(sha256) if sha256 else blob
+
+    async def save_artifact(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        filename: str,
+        artifact: types.Part,
+    ) -> int:
+        return await asyncio.to_thread(
+            self._save_reference, app_name, user_id, session_id, filename, artifact
+        )
+
+    async def load_artifact(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        filename: str,
+        version: int | None = None,
+    ) -> types.Part | None:
+        return await asyncio.to_thread(
+            self._load_reference, app_name, user_id, session_id, filename, version
+        )
+
+    async def delete_artifact(
+        self, *, app_name: str, user_id: str, session_id: str, filename: str
+    ) -> None:
+        await asyncio.to_thread(
+            self._delete_references, app_name, user_id, session_id, filename
+        )
+
+    def _save_reference(
+        self,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        filename: str,
+        artifact: types.Part,
+    ) -> int:
+        metadata = {}
+        if artifact.inline_data is not None and artifact.inline_data.data is not None:
+            data = artifact.inline_data.data
+            mime_type = artifact.inline_data.mime_type
+        elif artifact.text is not None:
+            data = artifact.text.encode()
+            mime_type = "text/plain"
+            metadata[TEXT_PART_KEY] = "true"
+        else:
+            raise ValueError(f"Artifact {filename} has neither inline data nor text")
+        sha256 = hashlib.sha256(data).hexdigest()
+        metadata[CONTENT_HASH_KEY] = sha256
+
+        versions = self._list_versions(app_name, user_id, session_id, filename)
+        version = max(versions) + 1 if versions else 0
+        name = self._get_blob_name(app_name, user_id, session_id, filename, version)
+        # The marker goes first, so that a concurrent delete of the last
+        # other reference sees it and keeps the content (see _release).
+        self._marker_blob(sha256, name).upload_from_string(b"")
+        self._store_content(sha256, data, mime_type)
+
+        reference = self.bucket.blob(name)
+        reference.metadata = metadata
+        reference.upload_from_string(b"", content_type=mime_type)
+        return version
+
+    def _store_content(self, sha256: str, data: bytes, mime_type: str | None) -> None:
+        content = self._content_blob(sha256)
+        while True:
+            try:
+                content.upload_from_string(
+                    data, content_type=mime_type, if_generation_match=0
+                )
+                return
+            except exceptions.PreconditionFailed:
+                pass
+            # Already stored: updating its metadata fails a delete that
+            # counted the references before our marker was written.
+            content.metadata = {"referenced-at": str(int(time.time()))}
+            try:
+                content.patch()
+                logger.debug(
+                    "Artifact content %s deduplicated (%d bytes)", sha256, len(data)
+                )
+                return
+            except exceptions.NotFound:
+                continue  # Deleted in between: upload it again.
+
+    def _load_reference(
+        self,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        filename: str,
+        version: int | None = None,
+    ) -> types.Part | None:
+        if version is None:
+            versions = self._list_versions(app_name, user_id, session_id, filename)
+            if not versions:
+                return None
+            version = max(versions)
+        reference = self.bucket.get_blob(
+            self._get_blob_name(app_name, user_id, session_id, filename, version)
+        )
+        if reference is None:
+            return None
+        data = self.resolve(reference).download_as_bytes()
+        if not data:
+            return None
+        if (reference.metadata or {}).get(TEXT_PART_KEY):
+            return types.Part(text=data.decode())
+        return types.Part.from_bytes(data=data, mime_type=reference.content_type)
+
+    def _delete_references(
+        self, app_name: str, user_id: str, session_id: str, filename: str
+    ) -> None:
+        for version in self._list_versions(app_name, user_id, session_id, filename):
+            name = self._get_blob_name(app_name, user_id, session_id, filename, version)
+            reference = self.bucket.get_blob(name)
+            if reference is None:
+                continue
+            reference.delete()
+            if sha256 := (reference.metadata or {}).get(CONTENT_HASH_KEY):
+                with contextlib.suppress(exceptions.NotFound):
+                    self._marker_blob(sha256, name).delete()
+                self._release(sha256)
+
+    def _release(self, sha256: str) -> None:
+        """Deletes a content if no reference to it is left."""
+        content = self.bucket.get_blob(CONTENT_PREFIX + sha256)
+        if content is None:
+            return
+        # The metageneration is read before the markers are listed: a save
+        # whose marker the listing misses updates the metadata afterwards,
+        # which fails the conditional delete.
+        markers = self.storage_client.list_blobs(
+            self.bucket, prefix=f"{CONTENT_PREFIX}{sha256}/refs/", max_results=1
+        )
+        if any(True for _ in markers):
+            return
+        try:
+            content.delete(if_metageneration_match=content.metageneration)
+            logger.debug("Deleted unreferenced artifact content %s", sha256)
+        except (exceptions.NotFound, exceptions.PreconditionFailed):
+            pass
+
+
+async def latest_artifact_blob(
+    artifact_service: GcsArtifactService,
+    *,
+    app_name: str,
+    user_id: str,
+    session_id: str,
+    filename: str,
+) -> storage.Blob:
+    """The blob holding the bytes of the latest version of an artifact.
+
+    Raises:
+        FileNotFoundError: If the artifact does not exist.
+    """
+    versions = await artifact_service.list_versions(
+        app_name=app_name, user_id=user_id, session_id=session_id, filename=filename
+    )
+    if not versions:
+        raise FileNotFoundError(filename)
+    # GcsArtifactService does not expose its naming scheme publicly.
+    name = artifact_service._get_blob_name(
+        app_name, user_id, session_id, filename, max(versions)
+    )
+    if not isinstance(artifact_service, ContentAddressedGcsArtifactService):
+        return artifact_service.bucket.blob(name)
+    blob = await asyncio.to_thread(artifact_service.bucket.get_blob, name)
+    if blob is None:
+        raise FileNotFoundError(filename)
+    return artifact_service.resolve(blob)
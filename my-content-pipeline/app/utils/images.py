@@ -0,0 +1,104 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Render, delivery and thumbnail variants of a generated image, from one decode.
+
+Image models return large lossless PNGs. The source stays in the job
+workspace, as renders at other profiles and the cropped renditions start
+from it, but nothing else needs it at full size. normalize_image decodes it
+once and derives:
+
+- the render-ready frame: the image at the job's output frame size, when
+  that is smaller than the source, so renders load it without resizing.
+  It is resampled exactly as app.utils.video.load_frame would, so segments
+  rendered from it are the ones cached for the source;
+- the delivery copy, saved as the image artifact and embedded in the
+  article: WebP (JPEG if Pillow lacks WebP support) instead of PNG;
+- a thumbnail THUMBNAIL_WIDTH pixels wide, for listings of a job's images.
+
+Configuration (environment variables):
+    IMAGE_DELIVERY_QUALITY: WebP/JPEG quality of delivery copies and
+        thumbnails (default 82).
+    THUMBNAIL_WIDTH: thumbnail width in pixels (default 320).
+"""
+
+import io
+import os
+from dataclasses import dataclass
+from typing import Any
+
+from PIL import Image, features
+
+from app.utils.video import EncodingProfile
+
+DELIVERY_QUALITY = int(os.getenv("IMAGE_DELIVERY_QUALITY", "82"))
+THUMBNAIL_WIDTH = int(os.getenv("THUMBNAIL_WIDTH", "320"))
+
+# Pillow builds without libwebp fall back to JPEG.
+DELIVERY_FORMAT, DELIVERY_MIME_TYPE, DELIVERY_EXTENSION = (
+    ("WEBP", "image/webp", "webp")
+    if features.check("webp")
+    else ("JPEG", "image/jpeg", "jpg")
+)
+
+
+@dataclass
+class NormalizedImage:
+    """The variants of one image."""
+
+    size: tuple[int, int]
+    # PNG at frame_size, or None if the source already has that size.
+    frame: bytes | None
+    frame_size: tuple[int, int]
+    delivery: bytes
+    thumbnail: bytes
+
+
+def _encode(image: Image.Image, image_format: str, **params: Any) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, format=image_format, **params)
+    return buffer.getvalue()
+
+
+def normalize_image(
+    data: bytes, profile: EncodingProfile | None = None
+) -> NormalizedImage:
+    """Derives an image's render frame, delivery copy and thumbnail.
+
+    Args:
+        data: The encoded source image.
+        profile: The encoding profile the image will be rendered with, or
+            None to skip the render frame.
+
+    Returns:
+        The encoded variants.
+    """
+    with Image.open(io.BytesIO(data)) as source:
+        image = source.convert("RGB")
+    frame_size = profile.frame_size(image.size) if profile else image.size
+    frame = None
+    if frame_size != image.size:
+        resized = image.resize(frame_size, Image.Resampling.LANCZOS, reducing_gap=3.0)
+        # Frames are read back once per render; favour encode speed over size.
+        frame = _encode(resized, "PNG", compress_level=1)
+    delivery = _encode(image, DELIVERY_FORMAT, quality=DELIVERY_QUALITY)
+    thumbnail = image.copy()
+    thumbnail.thumbnail((THUMBNAIL_WIDTH, image.height), Image.Resampling.LANCZOS)
+    return NormalizedImage(
+        size=image.size,
+        frame=frame,
+        frame_size=frame_size,
+        delivery=delivery,
+        thumbnail=_encode(thumbnail, DELIVERY_FORMAT, quality=DELIVERY_QUALITY),
+    )
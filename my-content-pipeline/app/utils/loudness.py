@@ -0,0 +1,394 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Loudness normalization of narration on raw PCM with NumPy.
+
+Each section is narrated by a randomly chosen TTS voice, and voices differ
+in level by several dB, so adjacent sections sound louder or quieter than
+each other. Every voiceover is normalized to the same integrated loudness
+before it is saved, which evens out all sections of a video without waiting
+for all of them (segments are rendered as soon as a section's narration
+exists).
+
+normalize_loudness works on a batch of buffers (e.g. the TTS chunks of one
+voiceover, or every section of a video) in one vectorized pass over a
+zero-padded matrix:
+
+1. integrated loudness per buffer after ITU-R BS.1770: K-weighted mean
+   square over 400 ms blocks with 75% overlap, the weighting applied as a
+   magnitude response to the spectrum of every 100 ms step (one batched
+   FFT), then the absolute (-70 LUFS) and relative (-10 LU) gates;
+2. a gain per buffer towards the target, clamped to +/-MAX_GAIN_DB (silence
+   is left alone);
+3. a lookahead limiter that keeps the true peaks (estimated on the signal
+   oversampled 4x, as BS.1770 does) at or below the ceiling: the gain each
+   sample needs is held over a window reaching LIMITER_LOOKAHEAD_S ahead
+   and LIMITER_HOLD_S behind, and ramped over the lookahead, so it is
+   reached before the peak and released after it instead of clipping the
+   waveform.
+
+Decoding to and encoding from PCM is done by ffmpeg through pipes. A
+voiceover synthesized in one chunk that is already within GAIN_TOLERANCE_DB
+of the target, with its peaks under the ceiling, is copied as synthesized
+instead of being encoded again. See tests/benchmark/run_loudness_benchmark.py
+for the cost per minute of audio.
+
+Configuration (environment variables):
+    LOUDNESS_NORMALIZATION: set to 0 to save voiceovers as synthesized
+        (default on).
+    LOUDNESS_TARGET_LUFS: integrated loudness target (default -16, the
+        usual level for spoken content online).
+"""
+
+import os
+import shutil
+import subprocess
+
+import numpy as np
+from moviepy.config import FFMPEG_BINARY
+
+LOUDNESS_NORMALIZATION = os.getenv("LOUDNESS_NORMALIZATION", "1").lower() not in (
+    "0",
+    "false",
+    "no",
+)
+TARGET_LUFS = float(os.getenv("LOUDNESS_TARGET_LUFS", "-16"))
+
+# Narration is processed as mono at the TTS output rate.
+SAMPLE_RATE = 24000
+MAX_GAIN_DB = 20.0
+# Smallest gain worth encoding a single-chunk voiceover again for; below it
+# the difference is inaudible and the re-encode would only lose quality.
+GAIN_TOLERANCE_DB = 0.5
+# True-peak ceiling of the limiter (-1 dBTP).
+CEILING = 10 ** (-1 / 20)
+# The limiter's gain ramps down over the lookahead before a peak and is held
+# for the hold time after it before ramping back up.
+LIMITER_LOOKAHEAD_S = 0.005
+LIMITER_HOLD_S = 0.05
+_OVERSAMPLING = 4
+_INTERPOLATION_TAPS = 16
+
+_BLOCK_S = 0.4
+_STEP_S = 0.1
+_ABSOLUTE_GATE_LUFS = -70.0
+_RELATIVE_GATE_LU = -10.0
+
+
+def _biquad_response(
+    b: tuple[float, ...], a: tuple[float, ...], w: np.ndarray
+) -> np.ndarray:
+    z = np.exp(-1j * w)
+    return (b[0] + b[1] * z + b[2] * z**2) / (a[0] + a[1] * z + a[2] * z**2)
+
+
+def k_weighting(frequencies: np.ndarray, sample_rate: int) -> np.ndarray:
+    """Magnitude response of the BS.1770 K-weighting filter.
+
+    Both stages are RBJ cookbook biquads designed from their analogue
+    parameters (as in pyloudnorm), so any sample rate works, not just the
+    48 kHz the standard's coefficients are given for.
+    """
+    w = 2 * np.pi * frequencies / sample_rate
+
+    # Stage 1: +4 dB high shelf modelling the head.
+    gain = 10 ** (4.0 / 40)
+    w0 = 2 * np.pi * 1500.0 / sample_rate
+    alpha = np.sin(w0) / np.sqrt(2)  # Q = 1/sqrt(2)
+    cos, root = np.cos(w0), 2 * np.sqrt(gain) * alpha
+    shelf = _biquad_response(
+        (
+            gain * ((gain + 1) + (gain - 1) * cos + root),
+            -2 * gain * ((gain - 1) + (gain + 1) * cos),
+            gain * ((gain + 1) + (gain - 1) * cos - root),
+        ),
+        (
+            (gain + 1) - (gain - 1) * cos + root,
+            2 * ((gain - 1) - (gain + 1) * cos),
+            (gain + 1) - (gain - 1) * cos - root,
+        ),
+        w,
+    )
+
+    # Stage 2: RLB high pass.
+    w0 = 2 * np.pi * 38.0 / sample_rate
+    alpha = np.sin(w0)  # Q = 0.5
+    cos = np.cos(w0)
+    high_pass = _biquad_response(
+        ((1 + cos) / 2, -(1 + cos), (1 + cos) / 2),
+        (1 + alpha, -2 * cos, 1 - alpha),
+        w,
+    )
+    return np.abs(shelf * high_pass)
+
+
+def _padded(
+    buffers: list[np.ndarray], multiple: int = 1, min_width: int = 1
+) -> tuple[np.ndarray, np.ndarray]:
+    """Stacks buffers into a zero-padded matrix whose width is a multiple of `multiple`."""
+    lengths = np.array([len(b) for b in buffers])
+    width = -(-max(lengths.max(initial=0), min_width) // multiple) * multiple
+    batch = np.zeros((len(buffers), width), dtype=np.float32)
+    for row, buffer in zip(batch, buffers, strict=True):
+        row[: len(buffer)] = buffer
+    return batch, lengths
+
+
+def integrated_loudness(
+    buffers: list[np.ndarray], sample_rate: int = SAMPLE_RATE
+) -> np.ndarray:
+    """Integrated loudness of each mono buffer in LUFS.
+
+    Args:
+        buffers: Float samples in [-1, 1].
+        sample_rate: Their sample rate.
+
+    Returns:
+        One loudness per buffer; -inf for silence.
+    """
+    # 400 ms blocks overlapping by 75% are made of 100 ms steps, so the
+    # K-weighted energy is computed once per step (Parseval's theorem on the
+    # step's spectrum) and summed over each block's four steps.
+    step = round(_STEP_S * sample_rate)
+    steps_per_block = round(_BLOCK_S / _STEP_S)
+    block = step * steps_per_block
+    batch, lengths = _padded(buffers, multiple=step, min_width=block)
+    spectrum = np.fft.rfft(batch.reshape(len(buffers), -1, step), axis=2)
+    weights = k_weighting(np.fft.rfftfreq(step, 1 / sample_rate), sample_rate) ** 2
+    # The one-sided spectrum counts every bin but DC (and Nyquist) twice.
+    weights[1 : (step + 1) // 2] *= 2
+    step_energy = (spectrum.real**2 + spectrum.imag**2) @ weights / step
+
+    energy = np.lib.stride_tricks.sliding_window_view(
+        step_energy, steps_per_block, axis=1
+    )
+    power = energy.sum(axis=2) / block
+    starts = np.arange(power.shape[1]) * step
+    # Blocks past a buffer's end do not count; a buffer shorter than one
+    # block is measured as a whole.
+    valid = (starts + block)[None, :] <= lengths[:, None]
+    short = ~valid.any(axis=1)
+    valid[short, 0] = True
+    power[short, 0] = step_energy[short].sum(axis=1) / np.maximum(lengths[short], 1)
+
+    with np.errstate(divide="ignore"):
+        block_loudness = -0.691 + 10 * np.log10(power)
+    gated = valid & (block_loudness > _ABSOLUTE_GATE_LUFS)
+    mean = _masked_mean(power, gated)
+    with np.errstate(divide="ignore"):
+        relative_gate = -0.691 + 10 * np.log10(mean) + _RELATIVE_GATE_LU
+    gated &= block_loudness > relative_gate[:, None]
+    with np.errstate(divide="ignore"):
+        return -0.691 + 10 * np.log10(_masked_mean(power, gated))
+
+
+def _masked_mean(values: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    counts = mask.sum(axis=1)
+    return np.where(
+        counts > 0, np.where(mask, values, 0).sum(axis=1) / np.maximum(counts, 1), 0.0
+    )
+
+
+def true_peaks(batch: np.ndarray) -> np.ndarray:
+    """Peak magnitude around each sample of a (buffers, samples) matrix.
+
+    Each value is the largest magnitude at the sample and at the points
+    interpolated between it and the next one when oversampling 4x, with a
+    Hann-windowed sinc of _INTERPOLATION_TAPS taps.
+    """
+    half = _INTERPOLATION_TAPS // 2
+    width = batch.shape[1]
+    padded = np.pad(batch, ((0, 0), (half - 1, half)))
+    offsets = np.arange(-(half - 1), half + 1)
+    peaks = np.abs(batch)
+    for phase in range(1, _OVERSAMPLING):
+        distance = offsets - phase / _OVERSAMPLING
+        taps = np.sinc(distance) * np.cos(np.pi * distance / (2 * half)) ** 2
+        taps = (taps / taps.sum()).astype(np.float32)
+        interpolated = sum(tap * padded[:, i : i + width] for i, tap in enumerate(taps))
+        np.maximum(peaks, np.abs(interpolated), out=peaks)
+    return peaks
+
+
+def _sliding_min(values: np.ndarray, before: int, after: int) -> np.ndarray:
+    """Minimum of values[:, n - before : n + after + 1] for every n, in O(n).
+
+    Uses the van Herk/Gil-Werman prefix and suffix minima over blocks of the
+    window size; values outside the matrix count as 1.
+    """
+    rows, width = values.shape
+    window = before + after + 1
+    blocks = -(-(width + window - 1) // window)
+    padded = np.ones((rows, blocks * window), dtype=values.dtype)
+    padded[:, before : before + width] = values
+    shaped = padded.reshape(rows, blocks, window)
+    prefix = np.minimum.accumulate(shaped, axis=2).reshape(rows, -1)
+    suffix = np.minimum.accumulate(shaped[:, :, ::-1], axis=2)[:, :, ::-1].reshape(
+        rows, -1
+    )
+    return np.minimum(suffix[:, :width], prefix[:, window - 1 : window - 1 + width])
+
+
+def limit(
+    batch: np.ndarray, sample_rate: int = SAMPLE_RATE, ceiling: float = CEILING
+) -> np.ndarray:
+    """Lookahead true-peak limiter of a (buffers, samples) matrix.
+
+    The gain needed to keep each sample's true peak under the ceiling is
+    taken as the minimum over LIMITER_HOLD_S before to LIMITER_LOOKAHEAD_S
+    after it, then averaged over the lookahead; every sample of the average
+    includes the peak, so the gain at a peak is never above what it needs.
+    Only the loud passages are turned down, without the distortion of
+    clipping them. The interpolation may miss a true peak by a fraction of a
+    dB, within the 1 dB headroom of the default ceiling.
+
+    Modifies batch in place and returns it.
+    """
+    lookahead = max(round(LIMITER_LOOKAHEAD_S * sample_rate), 1)
+    hold = round(LIMITER_HOLD_S * sample_rate)
+    peaks = true_peaks(batch)
+    with np.errstate(divide="ignore"):
+        required = np.minimum(ceiling / peaks, 1.0)
+    held = _sliding_min(required, hold, lookahead - 1)
+    # The ramp before the first sample is taken as already done.
+    start = np.repeat(held[:, :1], lookahead, axis=1)
+    totals = np.cumsum(np.concatenate([start, held], axis=1), axis=1, dtype=np.float64)
+    gain = (totals[:, lookahead:] - totals[:, :-lookahead]) / lookahead
+    # Guards against rounding in the running sums.
+    batch *= np.minimum(gain, required).astype(np.float32)
+    return batch
+
+
+def normalize_loudness(
+    buffers: list[np.ndarray],
+    sample_rate: int = SAMPLE_RATE,
+    target_lufs: float = TARGET_LUFS,
+) -> tuple[list[np.ndarray], np.ndarray]:
+    """Brings mono buffers to the target integrated loudness.
+
+    Args:
+        buffers: Float samples in [-1, 1].
+        sample_rate: Their sample rate.
+        target_lufs: Loudness to normalize to.
+
+    Returns:
+        The normalized buffers, and the gain applied to each in dB.
+    """
+    loudness = integrated_loudness(buffers, sample_rate)
+    gain_db = np.where(
+        np.isfinite(loudness) & (loudness > _ABSOLUTE_GATE_LUFS),
+        np.clip(target_lufs - loudness, -MAX_GAIN_DB, MAX_GAIN_DB),
+        0.0,
+    )
+    batch, lengths = _padded(buffers)
+    batch *= (10 ** (gain_db / 20)).astype(np.float32)[:, None]
+    batch = limit(batch, sample_rate)
+    return [row[:length] for row, length in zip(batch, lengths, strict=True)], gain_db
+
+
+def decode_pcm(paths: list[str], sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """Decodes and joins audio files into mono float samples with one ffmpeg process."""
+    inputs = [arg for path in paths for arg in ("-i", path)]
+    labels = "".join(f"[{i}:a]" for i in range(len(paths)))
+    result = subprocess.run(
+        [
+            FFMPEG_BINARY,
+            "-loglevel",
+            "error",
+            *inputs,
+            "-filter_complex",
+            f"{labels}concat=n={len(paths)}:v=0:a=1[a]",
+            "-map",
+            "[a]",
+            "-ac",
+            "1",
+            "-ar",
+            str(sample_rate),
+            "-f",
+            "f32le",
+            "pipe:1",
+        ],
+        check=True,
+        capture_output=True,
+    )
+    return np.frombuffer(result.stdout, dtype=np.float32)
+
+
+def encode_mp3(
+    samples: np.ndarray, path: str, sample_rate: int = SAMPLE_RATE, bitrate: str = "64k"
+) -> None:
+    """Encodes mono float samples into an MP3 file."""
+    subprocess.run(
+        [
+            FFMPEG_BINARY,
+            "-y",
+            "-loglevel",
+            "error",
+            "-f",
+            "f32le",
+            "-ar",
+            str(sample_rate),
+            "-ac",
+            "1",
+            "-i",
+            "pipe:0",
+            "-c:a",
+            "libmp3lame",
+            "-b:a",
+            bitrate,
+            "-f",
+            "mp3",
+            path,
+        ],
+        input=np.ascontiguousarray(samples, dtype=np.float32).tobytes(),
+        check=True,
+        capture_output=True,
+    )
+
+
+def join_voiceover(
+    chunk_paths: list[str],
+    output_path: str,
+    normalize: bool = LOUDNESS_NORMALIZATION,
+    target_lufs: float = TARGET_LUFS,
+) -> float:
+    """Joins the TTS chunks of one voiceover into an MP3 at the target loudness.
+
+    Args:
+        chunk_paths: The synthesized chunks, in order.
+        output_path: Where to write the voiceover.
+        normalize: Whether to normalize its loudness.
+        target_lufs: Loudness to normalize to.
+
+    Returns:
+        The gain applied in dB.
+
+    Raises:
+        subprocess.CalledProcessError: If ffmpeg fails.
+    """
+    samples = decode_pcm(chunk_paths)
+    gain_db = 0.0
+    if normalize:
+        if len(chunk_paths) == 1:
+            loudness = integrated_loudness([samples])[0]
+            if (
+                abs(target_lufs - loudness) <= GAIN_TOLERANCE_DB
+                and true_peaks(samples[None, :]).max(initial=0.0) <= CEILING
+            ):
+                shutil.copyfile(chunk_paths[0], output_path)
+                return gain_db
+        (samples,), gains = normalize_loudness([samples], target_lufs=target_lufs)
+        gain_db = float(gains[0])
+    encode_mp3(samples, output_path)
+    return gain_db
@@ -0,0 +1,186 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Media metadata read from file headers, without decoding.
+
+Opening a moviepy AudioFileClip (or calling ffmpeg_parse_infos) to learn a
+clip's duration starts an ffmpeg process per file. WAV durations follow from
+the fmt and data chunk sizes, and MP3 durations from the first frame header
+plus the Xing/Info or VBRI header when present (else the constant bitrate),
+so both are read here in microseconds. Other formats fall back to ffmpeg.
+Image dimensions come from Pillow, which only reads the header on open.
+
+This module is imported by render workers; keep its imports light.
+"""
+
+import os
+import struct
+from dataclasses import dataclass
+from typing import BinaryIO
+
+from PIL import Image
+
+
+@dataclass(frozen=True)
+class AudioInfo:
+    """Stream parameters of an audio file."""
+
+    duration_s: float
+    sample_rate: int
+    channels: int
+    codec: str
+
+
+_MP3_BITRATES_KBPS = {
+    # MPEG-1 Layer III, then MPEG-2/2.5 Layer III; index 0 is "free format".
+    1: (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    2: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+_MP3_SAMPLE_RATES = {
+    3: (44100, 48000, 32000),  # MPEG-1
+    2: (22050, 24000, 16000),  # MPEG-2
+    0: (11025, 12000, 8000),  # MPEG-2.5
+}
+
+
+def _id3_size(header: bytes) -> int:
+    """Length of a leading ID3v2 tag, or 0."""
+    if len(header) < 10 or header[:3] != b"ID3":
+        return 0
+    size = 0
+    for byte in header[6:10]:
+        size = (size << 7) | (byte & 0x7F)
+    footer = 10 if header[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def _probe_mp3(f: BinaryIO, file_size: int) -> AudioInfo:
+    start = _id3_size(f.read(10))
+    f.seek(start)
+    data = f.read(4096)
+    # Find the first frame sync (11 set bits) with a valid header.
+    for offset in range(len(data) - 4):
+        if data[offset] != 0xFF or data[offset + 1] & 0xE0 != 0xE0:
+            continue
+        header = struct.unpack(">I", data[offset : offset + 4])[0]
+        version = (header >> 19) & 0b11
+        layer = (header >> 17) & 0b11
+        bitrate_index = (header >> 12) & 0b1111
+        rate_index = (header >> 10) & 0b11
+        if version == 1 or layer != 1 or bitrate_index in (0, 15) or rate_index == 3:
+            continue  # reserved values, or not Layer III
+        break
+    else:
+        raise ValueError("No MPEG audio Layer III frame header found")
+
+    mpeg1 = version == 3
+    sample_rate = _MP3_SAMPLE_RATES[version][rate_index]
+    bitrate = _MP3_BITRATES_KBPS[1 if mpeg1 else 2][bitrate_index] * 1000
+    channels = 1 if (header >> 6) & 0b11 == 0b11 else 2
+    samples_per_frame = 1152 if mpeg1 else 576
+
+    # A Xing/Info header follows the side information of the first frame.
+    side_info = (32 if channels == 2 else 17) if mpeg1 else (17 if channels == 2 else 9)
+    xing = offset + 4 + side_info
+    frames = None
+    if data[xing : xing + 4] in (b"Xing", b"Info"):
+        flags = struct.unpack(">I", data[xing + 4 : xing + 8])[0]
+        if flags & 0x1:
+            frames = struct.unpack(">I", data[xing + 8 : xing + 12])[0]
+    elif data[offset + 36 : offset + 40] == b"VBRI":
+        frames = struct.unpack(">I", data[offset + 50 : offset + 54])[0]
+
+    if frames is not None:
+        duration = frames * samples_per_frame / sample_rate
+    else:
+        # Constant bitrate: every byte after the tag is audio.
+        duration = (file_size - start - offset) * 8 / bitrate
+    return AudioInfo(duration, sample_rate, channels, "mp3")
+
+
+def _probe_wav(f: BinaryIO, file_size: int) -> AudioInfo:
+    riff = f.read(12)
+    if len(riff) < 12 or riff[:4] != b"RIFF" or riff[8:12] != b"WAVE":
+        raise ValueError("Not a RIFF/WAVE file")
+    fmt = None
+    while True:
+        chunk = f.read(8)
+        if len(chunk) < 8:
+            raise ValueError("WAV file has no data chunk")
+        chunk_id, size = chunk[:4], struct.unpack("<I", chunk[4:])[0]
+        if chunk_id == b"fmt ":
+            fmt = struct.unpack("<HHIIHH", f.read(16))
+            f.seek(size - 16 + (size & 1), os.SEEK_CUR)
+        elif chunk_id == b"data":
+            if fmt is None:
+                raise ValueError("WAV data chunk precedes its fmt chunk")
+            audio_format, channels, sample_rate, byte_rate, _, _ = fmt
+            # Streamed WAVs may leave the size unset; the data then runs to
+            # the end of the file.
+            size = min(size, file_size - f.tell())
+            codec = "pcm" if audio_format in (1, 0xFFFE) else f"wav/{audio_format}"
+            return AudioInfo(size / byte_rate, sample_rate, channels, codec)
+        else:
+            f.seek(size + (size & 1), os.SEEK_CUR)
+
+
+def _probe_ffmpeg(path: str) -> AudioInfo:
+    from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
+
+    infos = ffmpeg_parse_infos(path)
+    return AudioInfo(
+        float(infos["duration"]),
+        int(infos.get("audio_fps") or 0),
+        0,
+        "unknown",
+    )
+
+
+def probe_audio(path: str) -> AudioInfo:
+    """Reads an audio file's duration and stream parameters from its headers.
+
+    WAV and MP3 (Layer III) files are parsed directly; anything else is
+    probed with ffmpeg.
+
+    Args:
+        path: The audio file.
+
+    Returns:
+        Its duration, sample rate, channel count and codec.
+    """
+    file_size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        magic = f.read(12)
+        f.seek(0)
+        try:
+            if magic[:4] == b"RIFF" and magic[8:12] == b"WAVE":
+                return _probe_wav(f, file_size)
+            if magic[:3] == b"ID3" or (
+                magic[:1] == b"\xff" and magic[1] & 0xE0 == 0xE0
+            ):
+                return _probe_mp3(f, file_size)
+        except (ValueError, struct.error):
+            pass
+    return _probe_ffmpeg(path)
+
+
+def audio_duration(path: str) -> float:
+    """Duration of an audio file in seconds, read from its headers."""
+    return probe_audio(path).duration_s
+
+
+def probe_image(path: str) -> tuple[int, int, str]:
+    """Reads an image's width, height and format from its header."""
+    with Image.open(path) as image:
+        return image.width, image.height, (image.format or "").lower()
@@ -0,0 +1,510 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Per-stage latency and cost instrumentation for the content pipeline.
+
+Every pipeline stage (agent), tool call and video render is wrapped in an
+OpenTelemetry span and recorded into histograms and counters. Usage counters
+(bytes, tokens, images, audio seconds, cache hits) are attached to whichever
+stage is active when they are reported, and all stages of one
+`content_creation_pipeline` run are collected into a per-job summary that is
+written out when the job finishes.
+"""
+
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import os
+import time
+import uuid
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Any, TypeVar
+
+from google.adk.agents import BaseAgent, LlmAgent
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmResponse
+from opentelemetry import trace
+from opentelemetry.sdk.metrics import MeterProvider
+from opentelemetry.sdk.metrics.export import (
+    Gauge,
+    Histogram,
+    InMemoryMetricReader,
+    Sum,
+)
+
+from app.utils.resources import cpu_seconds, peak_rss_bytes
+
+logger = logging.getLogger(__name__)
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+USAGE_COUNTERS = (
+    "bytes_in",
+    "bytes_out",
+    "tokens_in",
+    "tokens_out",
+    "images",
+    "audio_seconds",
+    "cache_hits",
+    "segments",
+    "tokens_saved",
+    "speculation_hits",
+    "speculation_misses",
+)
+
+# Stages range from sub-second tool calls to multi-minute renders.
+DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+RSS_BUCKETS = tuple(
+    mib << 20 for mib in (64, 128, 256, 384, 512, 768, 1024, 1536, 2048, 4096)
+)
+
+# The reader backs the /metrics endpoint; it is owned here rather than by the
+# server so that benchmarks and tests can read metrics without starting it.
+metric_reader = InMemoryMetricReader()
+meter_provider = MeterProvider(metric_readers=[metric_reader])
+
+_meter = meter_provider.get_meter(__name__)
+_tracer = trace.get_tracer(__name__)
+
+_stage_duration = _meter.create_histogram(
+    "pipeline.stage.duration",
+    unit="s",
+    description="Wall time of pipeline stages, tool calls and renders.",
+    explicit_bucket_boundaries_advisory=DURATION_BUCKETS,
+)
+_stage_cpu = _meter.create_counter(
+    "pipeline.stage.cpu",
+    unit="s",
+    description="CPU time (including child processes) spent in each stage.",
+)
+_stage_errors = _meter.create_counter(
+    "pipeline.stage.errors",
+    description="Stages, tool calls and renders that failed.",
+)
+_usage_counters = {
+    name: _meter.create_counter(
+        f"pipeline.stage.{name}", description=f"{name} reported by each stage."
+    )
+    for name in USAGE_COUNTERS
+}
+_render_rss = _meter.create_histogram(
+    "pipeline.render.peak_rss",
+    unit="By",
+    description="Peak memory of each render, worker and ffmpeg processes included.",
+    explicit_bucket_boundaries_advisory=RSS_BUCKETS,
+)
+_job_duration = _meter.create_histogram(
+    "pipeline.job.duration",
+    unit="s",
+    description="Wall time of complete content_creation_pipeline runs.",
+    explicit_bucket_boundaries_advisory=DURATION_BUCKETS,
+)
+
+
+@dataclass
+class StageRecord:
+    """Measurements for one stage, tool call or render."""
+
+    name: str
+    kind: str
+    started_at: float
+    duration_s: float = 0.0
+    cpu_s: float = 0.0
+    peak_rss_bytes: int = 0
+    # Peak memory of the render itself: its worker process plus the ffmpeg
+    # processes it ran, measured from the start of the render (renders only).
+    render_rss_bytes: int = 0
+    usage: dict[str, float] = field(default_factory=dict)
+    error: str | None = None
+
+    def add(self, **usage: float) -> None:
+        """Accumulates usage counters (see USAGE_COUNTERS) on this record."""
+        for name, value in usage.items():
+            self.usage[name] = self.usage.get(name, 0) + value
+
+
+@dataclass
+class JobMetrics:
+    """All stage records collected during one pipeline run."""
+
+    job_id: str
+    started_at: float = field(default_factory=time.time)
+    finished_at: float | None = None
+    stages: list[StageRecord] = field(default_factory=list)
+
+    def summary(self) -> dict[str, Any]:
+        """Builds the per-job summary record.
+
+        Returns:
+            A JSON-serialisable dict with totals and every stage record.
+        """
+        # Agent stages only carry model tokens and tools/renders carry the
+        # rest, so summing every record does not double count.
+        totals: dict[str, float] = {}
+        for record in self.stages:
+            for name, value in record.usage.items():
+                totals[name] = totals.get(name, 0) + value
+        end = self.finished_at or time.time()
+        return {
+            "job_id": self.job_id,
+            "started_at": self.started_at,
+            "duration_s": round(end - self.started_at, 3),
+            "peak_rss_bytes": max((r.peak_rss_bytes for r in self.stages), default=0),
+            "render_rss_bytes": max(
+                (r.render_rss_bytes for r in self.stages), default=0
+            ),
+            "totals": totals,
+            "stages": [asdict(record) for record in self.stages],
+        }
+
+
+_current_job: contextvars.ContextVar[JobMetrics | None] = contextvars.ContextVar(
+    "current_job", default=None
+)
+_current_stage: contextvars.ContextVar[StageRecord | None] = contextvars.ContextVar(
+    "current_stage", default=None
+)
+_current_invocation: contextvars.ContextVar[str | None] = contextvars.ContextVar(
+    "current_invocation", default=None
+)
+
+
+class _ActiveStage:
+    """A started stage that records its span and metrics when finished."""
+
+    def __init__(self, name: str, kind: str, attributes: dict[str, Any]) -> None:
+        self.record = StageRecord(name=name, kind=kind, started_at=time.time())
+        self.attributes = {"stage": name, "kind": kind, **attributes}
+        self.span = _tracer.start_span(f"{kind} {name}", attributes=self.attributes)
+        self.job = _current_job.get()
+        self._wall_start = time.perf_counter()
+        self._cpu_start = cpu_seconds()
+
+    def finish(self, error: str | None = None) -> StageRecord:
+        record = self.record
+        record.duration_s = round(time.perf_counter() - self._wall_start, 4)
+        # Work done in pool worker processes is not visible in this process's
+        # rusage, so callers may pre-populate cpu_s with it (and report the
+        # workers' memory as render_rss_bytes).
+        record.cpu_s = round(record.cpu_s + cpu_seconds() - self._cpu_start, 4)
+        record.peak_rss_bytes = max(record.peak_rss_bytes, peak_rss_bytes())
+        record.error = error or record.error
+
+        attributes = {"stage": record.name, "kind": record.kind}
+        _stage_duration.record(record.duration_s, attributes)
+        _stage_cpu.add(record.cpu_s, attributes)
+        if record.render_rss_bytes:
+            _render_rss.record(record.render_rss_bytes, attributes)
+        for name, value in record.usage.items():
+            if name in _usage_counters:
+                _usage_counters[name].add(value, attributes)
+        if record.error:
+            _stage_errors.add(1, attributes)
+            self.span.set_status(trace.Status(trace.StatusCode.ERROR, record.error))
+
+        self.span.set_attributes(
+            {
+                "duration_s": record.duration_s,
+                "cpu_s": record.cpu_s,
+                "peak_rss_bytes": record.peak_rss_bytes,
+                "render_rss_bytes": record.render_rss_bytes,
+                **{f"usage.{k}": v for k, v in record.usage.items()},
+            }
+        )
+        self.span.end()
+        if self.job is not None:
+            self.job.stages.append(record)
+        return record
+
+
+@contextmanager
+def stage_span(
+    name: str, kind: str = "stage", **attributes: Any
+) -> Iterator[StageRecord]:
+    """Measures the enclosed block as one stage.
+
+    Usage reported with `record_usage` inside the block is attached to the
+    yielded record.
+
+    Args:
+        name: Stage, tool or render name.
+        kind: One of "stage", "tool" or "render".
+        **attributes: Extra span attributes.
+
+    Yields:
+        The StageRecord being filled in.
+    """
+    active = _ActiveStage(name, kind, attributes)
+    token = _current_stage.set(active.record)
+    try:
+        with trace.use_span(active.span, end_on_exit=False):
+            yield active.record
+    except Exception as e:
+        active.span.record_exception(e)
+        active.record.error = repr(e)
+        raise
+    finally:
+        _current_stage.reset(token)
+        active.finish()
+
+
+def record_usage(**usage: float) -> None:
+    """Attaches usage counters to the currently active stage, if any.
+
+    Args:
+        **usage: Counter values keyed by names from USAGE_COUNTERS.
+    """
+    record = _current_stage.get()
+    if record is not None:
+        record.add(**usage)
+
+
+def _tool_error(result: Any) -> str | None:
+    if isinstance(result, dict) and result.get("status") == "error":
+        return str(result.get("message", "error"))
+    if isinstance(result, str) and result.startswith("Error"):
+        return result
+    return None
+
+
+def instrumented_tool(func: F) -> F:
+    """Decorates a tool so each call is measured as a "tool" stage.
+
+    The wrapper keeps the tool's signature and docstring, which ADK uses to
+    build the function declaration and to inject `tool_context`. Tools in this
+    repo report failures as return values, so those are recorded as errors too.
+    """
+    if inspect.iscoroutinefunction(func):
+
+        @functools.wraps(func)
+        async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+            with stage_span(func.__name__, kind="tool") as record:
+                result = await func(*args, **kwargs)
+                record.error = _tool_error(result)
+                return result
+
+        return async_wrapper  # type: ignore[return-value]
+
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        with stage_span(func.__name__, kind="tool") as record:
+            result = func(*args, **kwargs)
+            record.error = _tool_error(result)
+            return result
+
+    return wrapper  # type: ignore[return-value]
+
+
+# Agent stages are bracketed by before/after callbacks rather than a context
+# manager, so the open stage is looked up by invocation and agent name. ADK
+# skips the after callback when an agent raises or ends the invocation, so
+# the stages an invocation leaves open are closed with close_stages.
+_open_stages: dict[tuple[str, str], _ActiveStage] = {}
+
+
+def start_stage_callback(callback_context: CallbackContext) -> None:
+    """before_agent_callback that opens a stage for the agent."""
+    key = (callback_context.invocation_id, callback_context.agent_name)
+    _open_stages[key] = _ActiveStage(callback_context.agent_name, "stage", {})
+
+
+def end_stage_callback(callback_context: CallbackContext) -> None:
+    """after_agent_callback that closes the stage opened for the agent."""
+    key = (callback_context.invocation_id, callback_context.agent_name)
+    active = _open_stages.pop(key, None)
+    if active is not None:
+        active.finish()
+
+
+def close_stages(invocation_id: str, error: str | None = None) -> None:
+    """Closes every stage of an invocation that is still open.
+
+    Args:
+        invocation_id: The invocation whose stages are closed.
+        error: Why the invocation ended early, recorded on each stage.
+    """
+    for key in [k for k in _open_stages if k[0] == invocation_id]:
+        _open_stages.pop(key).finish(error)
+
+
+def abort_job(error: str) -> None:
+    """Closes the stages left open by a failed run of the current job.
+
+    Must be called from the context that ran the pipeline.
+
+    Args:
+        error: Why the run failed.
+    """
+    invocation_id = _current_invocation.get()
+    if invocation_id is not None:
+        close_stages(invocation_id, error)
+
+
+def record_stage_usage(callback_context: CallbackContext, **usage: float) -> None:
+    """Attaches usage counters to the stage opened for the callback's agent.
+
+    Args:
+        callback_context: Context of an agent or model callback.
+        **usage: Counter values keyed by names from USAGE_COUNTERS.
+    """
+    key = (callback_context.invocation_id, callback_context.agent_name)
+    active = _open_stages.get(key)
+    if active is not None:
+        active.record.add(**usage)
+
+
+def record_model_usage(
+    callback_context: CallbackContext, llm_response: LlmResponse
+) -> None:
+    """after_model_callback that attributes token usage to the agent's stage."""
+    usage = llm_response.usage_metadata
+    if usage is None:
+        return
+    record_stage_usage(
+        callback_context,
+        tokens_in=usage.prompt_token_count or 0,
+        tokens_out=usage.candidates_token_count or 0,
+    )
+
+
+def start_job_callback(callback_context: CallbackContext) -> None:
+    """before_agent_callback for the pipeline root that starts a job record."""
+    job_id = callback_context.state.get("job_id") or callback_context.invocation_id
+    _current_job.set(JobMetrics(job_id=job_id or str(uuid.uuid4())))
+    _current_invocation.set(callback_context.invocation_id)
+    start_stage_callback(callback_context)
+
+
+def finish_job_callback(callback_context: CallbackContext) -> None:
+    """after_agent_callback for the pipeline root that writes the job summary.
+
+    The summary is logged, stored in session state under "job_metrics" and,
+    when JOB_METRICS_DIR is set, written to `<JOB_METRICS_DIR>/<job_id>.json`.
+    """
+    end_stage_callback(callback_context)
+    # Sub-agents that ended the invocation never ran their after callback.
+    close_stages(callback_context.invocation_id)
+    job = _current_job.get()
+    if job is None:
+        return
+    job.finished_at = time.time()
+    _job_duration.record(job.finished_at - job.started_at)
+    summary = job.summary()
+    callback_context.state["job_metrics"] = summary
+    logger.info("Job summary: %s", json.dumps(summary))
+
+    metrics_dir = os.getenv("JOB_METRICS_DIR")
+    if metrics_dir:
+        os.makedirs(metrics_dir, exist_ok=True)
+        with open(os.path.join(metrics_dir, f"{job.job_id}.json"), "w") as f:
+            json.dump(summary, f, indent=2)
+
+
+def append_callback(agent: BaseAgent, attribute: str, callback: Callable) -> None:
+    existing = getattr(agent, attribute)
+    if existing is None:
+        setattr(agent, attribute, callback)
+    elif isinstance(existing, list):
+        existing.append(callback)
+    else:
+        setattr(agent, attribute, [existing, callback])
+
+
+def instrument_pipeline(pipeline: BaseAgent) -> BaseAgent:
+    """Attaches job, stage and token callbacks to a pipeline and its sub-agents.
+
+    Args:
+        pipeline: The root agent of the pipeline; it becomes the job boundary.
+
+    Returns:
+        The same agent, for chaining.
+    """
+    append_callback(pipeline, "before_agent_callback", start_job_callback)
+    append_callback(pipeline, "after_agent_callback", finish_job_callback)
+
+    def visit(agent: BaseAgent) -> None:
+        for sub_agent in agent.sub_agents:
+            append_callback(sub_agent, "before_agent_callback", start_stage_callback)
+            append_callback(sub_agent, "after_agent_callback", end_stage_callback)
+            if isinstance(sub_agent, LlmAgent):
+                append_callback(sub_agent, "after_model_callback", record_model_usage)
+            visit(sub_agent)
+
+    visit(pipeline)
+    return pipeline
+
+
+def _prometheus_name(name: str, unit: str) -> str:
+    name = name.replace(".", "_")
+    return f"{name}_seconds" if unit == "s" else name
+
+
+def _prometheus_labels(attributes: Any, **extra: Any) -> str:
+    labels = {**dict(attributes or {}), **extra}
+    if not labels:
+        return ""
+    body = ",".join(
+        f'{key}="{_escape_label(value)}"' for key, value in sorted(labels.items())
+    )
+    return "{" + body + "}"
+
+
+def _escape_label(value: Any) -> str:
+    """Escapes a label value as the Prometheus text format requires."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render_prometheus() -> str:
+    """Renders all collected metrics in the Prometheus text exposition format."""
+    lines: list[str] = []
+    data = metric_reader.get_metrics_data()
+    for resource_metrics in data.resource_metrics if data else []:
+        for scope_metrics in resource_metrics.scope_metrics:
+            for metric in scope_metrics.metrics:
+                name = _prometheus_name(metric.name, metric.unit or "")
+                if isinstance(metric.data, Histogram):
+                    lines.append(f"# HELP {name} {metric.description}")
+                    lines.append(f"# TYPE {name} histogram")
+                    for point in metric.data.data_points:
+                        cumulative = 0
+                        for bound, count in zip(
+                            point.explicit_bounds, point.bucket_counts, strict=False
+                        ):
+                            cumulative += count
+                            labels = _prometheus_labels(point.attributes, le=bound)
+                            lines.append(f"{name}_bucket{labels} {cumulative}")
+                        labels = _prometheus_labels(point.attributes, le="+Inf")
+                        lines.append(f"{name}_bucket{labels} {point.count}")
+                        labels = _prometheus_labels(point.attributes)
+                        lines.append(f"{name}_sum{labels} {point.sum}")
+                        lines.append(f"{name}_count{labels} {point.count}")
+                elif isinstance(metric.data, Sum):
+                    kind = "counter" if metric.data.is_monotonic else "gauge"
+                    suffix = "_total" if metric.data.is_monotonic else ""
+                    lines.append(f"# HELP {name}{suffix} {metric.description}")
+                    lines.append(f"# TYPE {name}{suffix} {kind}")
+                    for number in metric.data.data_points:
+                        labels = _prometheus_labels(number.attributes)
+                        lines.append(f"{name}{suffix}{labels} {number.value}")
+                elif isinstance(metric.data, Gauge):
+                    lines.append(f"# HELP {name} {metric.description}")
+                    lines.append(f"# TYPE {name} gauge")
+                    for number in metric.data.data_points:
+                        labels = _prometheus_labels(number.attributes)
+                        lines.append(f"{name}{labels} {number.value}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,227 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Progressive HLS preview of a video while its sections are being rendered.
+
+As sections finish rendering (see AssetProducerAgent), each segment is
+remuxed into an MPEG-TS file without re-encoding and saved as an artifact,
+and the HLS playlist artifact PREVIEW_PLAYLIST is rewritten to list every
+segment published so far. Segments are published strictly in section order,
+so the preview always plays the beginning of the final video; the playlist
+is closed with #EXT-X-ENDLIST once every section is in. A section reported
+without a segment, because it was dropped or its prerender failed (the video
+producer then renders it), is left out of the preview.
+
+Remuxing copies the streams and takes little CPU, so it runs in a thread
+rather than waiting for a render worker.
+
+The playlist's #EXT-X-TARGETDURATION must not change while it grows (RFC
+8216, section 6.2.1), so it is fixed up front from the longest section
+narration at NARRATION_MIN_WORDS_PER_S. A segment that turns out longer than
+that stops the preview rather than change it.
+
+Playlist entries are relative names, so a player loading the playlist from
+`/jobs/{job_id}/artifacts/preview.m3u8` fetches the segments from the same
+path.
+
+Configuration (environment variables):
+    PROGRESSIVE_PREVIEW: set to 0 to disable the preview (default on).
+"""
+
+import asyncio
+import logging
+import math
+import os
+import shutil
+from collections.abc import AsyncGenerator
+
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.agents.readonly_context import ReadonlyContext
+from google.adk.events import Event, EventActions
+from google.adk.tools import ToolContext
+from google.genai import types
+
+from app.utils.video import remux_to_ts
+from app.utils.workspace import get_workspace
+
+logger = logging.getLogger(__name__)
+
+PROGRESSIVE_PREVIEW = os.getenv("PROGRESSIVE_PREVIEW", "1").lower() not in (
+    "0",
+    "false",
+    "no",
+)
+
+PREVIEW_PLAYLIST = "preview.m3u8"
+PLAYLIST_MIME_TYPE = "application/vnd.apple.mpegurl"
+SEGMENT_MIME_TYPE = "video/mp2t"
+
+# Slowest narration assumed when bounding the length of a section's segment.
+NARRATION_MIN_WORDS_PER_S = 2.0
+
+
+def segment_name(index: int) -> str:
+    return f"preview_{index:03d}.ts"
+
+
+def target_duration(transcripts: list[str]) -> int:
+    """Upper bound, in whole seconds, of the segments of sections narrating transcripts."""
+    words = max((len(t.split()) for t in transcripts), default=0)
+    return max(math.ceil(words / NARRATION_MIN_WORDS_PER_S), 1)
+
+
+def hls_playlist(durations: list[float], target: int, complete: bool) -> str:
+    """Builds an HLS event playlist of the preview segments published so far.
+
+    Args:
+        durations: Duration of each published segment, in order.
+        target: The playlist's target duration, the same for every update.
+        complete: Whether every segment is published (adds #EXT-X-ENDLIST).
+
+    Returns:
+        The playlist text.
+    """
+    lines = [
+        "#EXTM3U",
+        "#EXT-X-VERSION:3",
+        "#EXT-X-PLAYLIST-TYPE:EVENT",
+        f"#EXT-X-TARGETDURATION:{target}",
+        "#EXT-X-MEDIA-SEQUENCE:0",
+    ]
+    for i, duration in enumerate(durations):
+        lines += [f"#EXTINF:{duration:.3f},", segment_name(i)]
+    if complete:
+        lines.append("#EXT-X-ENDLIST")
+    return "\n".join(lines) + "\n"
+
+
+class PreviewPublisher:
+    """Publishes finished sections of a video as a growing HLS playlist.
+
+    Each update is also put on `events` as an event carrying the new
+    artifacts, for the owning agent to yield, so that job status reflects
+    the preview while the stage is still running.
+    """
+
+    def __init__(
+        self,
+        ctx: InvocationContext,
+        author: str,
+        sections: int,
+        target: int,
+    ) -> None:
+        """
+        Initialize the publisher.
+
+        Args:
+            ctx: The invocation whose artifacts the preview is saved to.
+            author: Author of the update events (the owning agent).
+            sections: Number of sections in the video.
+            target: The playlist's target duration (see target_duration);
+                no segment may be longer.
+        """
+        self.ctx = ctx
+        self.author = author
+        self.sections = sections
+        self.target = target
+        self.events: asyncio.Queue[Event] = asyncio.Queue()
+        self.durations: list[float] = []
+        # Section index -> finished segment, or None if it has none.
+        self._ready: dict[int, str | None] = {}
+        self._next = 0
+        self._failed = False
+        self._lock = asyncio.Lock()
+        self._directory = get_workspace(ReadonlyContext(ctx)).subdirectory("preview")
+
+    async def section_ready(self, index: int, segment_path: str | None) -> None:
+        """Records a finished section and publishes any newly playable prefix.
+
+        Args:
+            index: The section's position in the video.
+            segment_path: The section's rendered segment, or None if the
+                section was dropped from the video or not prerendered.
+        """
+        self._ready[index] = segment_path
+        async with self._lock:
+            if self._failed:
+                return
+            actions = EventActions()
+            tool_context = ToolContext(self.ctx, event_actions=actions)
+            start = self._next
+            try:
+                while self._next in self._ready:
+                    segment = self._ready.pop(self._next)
+                    self._next += 1
+                    if segment is not None:
+                        await self._publish_segment(segment, tool_context)
+                if self._next == start:
+                    return
+                complete = self._next == self.sections
+                playlist = hls_playlist(self.durations, self.target, complete)
+                await tool_context.save_artifact(
+                    PREVIEW_PLAYLIST,
+                    types.Part.from_bytes(
+                        data=playlist.encode(), mime_type=PLAYLIST_MIME_TYPE
+                    ),
+                )
+            except Exception as e:
+                logger.warning("Stopping the progressive preview: %s", e)
+                self._failed = True
+                return
+            actions.state_delta["preview_sections"] = len(self.durations)
+            self.events.put_nowait(
+                Event(
+                    author=self.author,
+                    invocation_id=self.ctx.invocation_id,
+                    branch=self.ctx.branch,
+                    actions=actions,
+                )
+            )
+
+    async def stream_until(self, task: asyncio.Future) -> AsyncGenerator[Event, None]:
+        """Yields preview update events as they are published, until task is done."""
+        while not task.done():
+            update = asyncio.ensure_future(self.events.get())
+            await asyncio.wait({task, update}, return_when=asyncio.FIRST_COMPLETED)
+            if update.done():
+                yield update.result()
+            else:
+                update.cancel()
+        while not self.events.empty():
+            yield self.events.get_nowait()
+
+    def close(self) -> None:
+        shutil.rmtree(self._directory, ignore_errors=True)
+
+    async def _publish_segment(
+        self, segment_path: str, tool_context: ToolContext
+    ) -> None:
+        index = len(self.durations)
+        ts_path = os.path.join(self._directory, segment_name(index))
+        duration = await asyncio.to_thread(
+            remux_to_ts, segment_path, ts_path, sum(self.durations)
+        )
+        with open(ts_path, "rb") as f:
+            data = f.read()
+        os.remove(ts_path)
+        # Players round EXTINF to the nearest second against the target.
+        if round(duration) > self.target:
+            raise ValueError(
+                f"Section {index} runs {duration:.1f}s, beyond the target duration of {self.target}s"
+            )
+        await tool_context.save_artifact(
+            segment_name(index),
+            types.Part.from_bytes(data=data, mime_type=SEGMENT_MIME_TYPE),
+        )
+        self.durations.append(duration)
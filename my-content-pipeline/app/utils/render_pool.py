@@ -0,0 +1,199 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Per-instance process pool for video renders, with admission control.
+
+Renders run in worker processes rather than on the API event loop, with a
+fixed number of workers and ffmpeg threads sized to the CPUs available to the
+instance. One CPU is left for the API when more than one is available, and
+workers run at a lower scheduling priority. Once every worker is busy and
+the admission queue is full, new renders are rejected with
+RenderPoolSaturated so callers can signal backpressure (HTTP 503) instead of
+thrashing the instance.
+
+Configuration (environment variables):
+    RENDER_WORKERS: number of worker processes.
+    RENDER_THREADS: ffmpeg threads per render.
+    RENDER_MAX_QUEUED: renders allowed to wait for a free worker.
+    RENDER_NICE: niceness added to worker processes (default 10).
+"""
+
+import asyncio
+import contextlib
+import logging
+import math
+import multiprocessing
+import os
+from collections.abc import AsyncIterator, Callable
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, TypeVar
+
+from app.utils.metrics import meter_provider
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_meter = meter_provider.get_meter(__name__)
+_in_flight = _meter.create_up_down_counter(
+    "render_pool.in_flight", description="Renders running or waiting for a worker."
+)
+_rejected = _meter.create_counter(
+    "render_pool.rejected", description="Renders rejected because the pool was full."
+)
+
+
+class RenderPoolSaturated(Exception):
+    """Raised when every render worker is busy and the queue is full."""
+
+
+def available_cpus() -> int:
+    """CPUs this process may use, honouring affinity and cgroup CPU quotas."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            cpus = min(cpus, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+
+class RenderPool:
+    """Bounded process pool with an admission queue."""
+
+    def __init__(
+        self,
+        workers: int | None = None,
+        threads_per_render: int | None = None,
+        max_queued: int | None = None,
+        nice: int = 10,
+    ) -> None:
+        """
+        Initialize the pool; worker processes start on first use.
+
+        Args:
+            workers: Worker processes (default: half the render CPUs, min 1).
+            threads_per_render: ffmpeg threads per render (default: the
+                render CPUs divided evenly between workers).
+            max_queued: Renders that may wait for a worker (default: workers).
+            nice: Niceness added to worker processes.
+        """
+        cpus = available_cpus()
+        render_cpus = max(1, cpus - 1) if cpus > 1 else 1
+        self.workers = workers or max(1, render_cpus // 2)
+        self.threads_per_render = threads_per_render or max(
+            1, render_cpus // self.workers
+        )
+        self.max_queued = self.workers if max_queued is None else max_queued
+        self.nice = nice
+        self.in_flight = 0
+        self._executor: ProcessPoolExecutor | None = None
+
+    @classmethod
+    def from_env(cls) -> "RenderPool":
+        def env_int(name: str) -> int | None:
+            value = os.getenv(name)
+            return int(value) if value else None
+
+        nice = env_int("RENDER_NICE")
+        return cls(
+            workers=env_int("RENDER_WORKERS"),
+            threads_per_render=env_int("RENDER_THREADS"),
+            max_queued=env_int("RENDER_MAX_QUEUED"),
+            nice=10 if nice is None else nice,
+        )
+
+    @property
+    def capacity(self) -> int:
+        """Renders that can be admitted at once (running plus queued)."""
+        return self.workers + self.max_queued
+
+    @property
+    def saturated(self) -> bool:
+        return self.in_flight >= self.capacity
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # Spawned workers avoid inheriting the server's gRPC/thread state.
+            # They only import the modules of the functions they run (see
+            # app/utils/video.py), so the initializer must not pull in this
+            # module and, through it, ADK.
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=os.nice,
+                initargs=(self.nice,),
+            )
+            logger.info(
+                "Started render pool: %d workers x %d threads, %d queued",
+                self.workers,
+                self.threads_per_render,
+                self.max_queued,
+            )
+        return self._executor
+
+    @contextlib.asynccontextmanager
+    async def admit(self) -> AsyncIterator[None]:
+        """Admits one render, which may then submit any number of tasks.
+
+        Raises:
+            RenderPoolSaturated: If the pool is already at capacity.
+        """
+        if self.saturated:
+            _rejected.add(1)
+            raise RenderPoolSaturated(
+                f"Render capacity exhausted ({self.in_flight} renders in flight)"
+            )
+        self.in_flight += 1
+        _in_flight.add(1)
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            _in_flight.add(-1)
+
+    async def submit(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Runs func(*args, **kwargs) on a worker, on behalf of an admitted render."""
+        future = self._get_executor().submit(func, *args, **kwargs)
+        return await asyncio.wrap_future(future, loop=asyncio.get_running_loop())
+
+    async def run(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Admits a single-task render and runs it on a worker.
+
+        Raises:
+            RenderPoolSaturated: If the pool is already at capacity.
+        """
+        async with self.admit():
+            return await self.submit(func, *args, **kwargs)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+_render_pool: RenderPool | None = None
+
+
+def get_render_pool() -> RenderPool:
+    """Returns the process-wide render pool, configured from the environment."""
+    global _render_pool
+    if _render_pool is None:
+        _render_pool = RenderPool.from_env()
+    return _render_pool
@@ -0,0 +1,244 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Landscape, vertical and square renditions of a video from one decode.
+
+A section's image and narration are decoded once by a single ffmpeg process
+whose filter graph splits the image into one branch per rendition; each
+branch is cropped to its aspect ratio and scaled once, then looped and
+encoded to its own output. Crops are placed by a simple "smart crop": the window of the
+target aspect ratio covering the most image detail (gradient energy), so a
+vertical cut of a 16:9 image keeps its subject rather than its centre.
+
+render_renditions runs in the render worker pool (see app/utils/video.py).
+"""
+
+import math
+import os
+import subprocess
+import tempfile
+import uuid
+from typing import Any
+
+import numpy as np
+from moviepy.config import FFMPEG_BINARY
+from PIL import Image
+
+from app.utils.media_probe import audio_duration
+from app.utils.resources import PeakRssTracker, cpu_seconds
+from app.utils.video import EncodingProfile
+
+# Rendition name -> aspect ratio (width, height).
+RENDITIONS: dict[str, tuple[int, int]] = {
+    "16:9": (16, 9),
+    "9:16": (9, 16),
+    "1:1": (1, 1),
+}
+PRIMARY_RENDITION = "16:9"
+
+# Width of the downscaled copy the crop position is computed on.
+_ANALYSIS_WIDTH = 256
+
+
+def rendition_slug(name: str) -> str:
+    """File-name-safe form of a rendition name, e.g. "9x16"."""
+    return name.replace(":", "x")
+
+
+def primary_rendition(renditions: list[str] | None) -> str:
+    """The rendition that is the job's main video."""
+    if not renditions or PRIMARY_RENDITION in renditions:
+        return PRIMARY_RENDITION
+    return renditions[0]
+
+
+def video_artifact_name(rendition: str, renditions: list[str] | None) -> str:
+    """Artifact name of a rendition's video; only extra renditions are tagged."""
+    if rendition == primary_rendition(renditions):
+        return f"video_{uuid.uuid4()}.mp4"
+    return f"video_{rendition_slug(rendition)}_{uuid.uuid4()}.mp4"
+
+
+def crop_size(image_size: tuple[int, int], aspect: tuple[int, int]) -> tuple[int, int]:
+    """Largest crop of the given aspect ratio that fits the image, with even sides."""
+    width, height = image_size
+    aspect_w, aspect_h = aspect
+    crop_w = min(width, height * aspect_w // aspect_h)
+    crop_h = min(height, width * aspect_h // aspect_w)
+    return (crop_w // 2 * 2, crop_h // 2 * 2)
+
+
+def rendition_frame_size(
+    image_size: tuple[int, int], aspect: tuple[int, int], profile: EncodingProfile
+) -> tuple[int, int]:
+    """Output frame size of a rendition.
+
+    The profile's height limits the shorter side, so a draft is 640x360
+    landscape, 360x640 vertical or 360x360 square. Crops are never upscaled.
+    """
+    crop_w, crop_h = crop_size(image_size, aspect)
+    short = min(crop_w, crop_h)
+    if profile.height is None or profile.height >= short:
+        return (crop_w, crop_h)
+    scale = profile.height / short
+    return (round(crop_w * scale) // 2 * 2, round(crop_h * scale) // 2 * 2)
+
+
+def _best_offset(energy: np.ndarray, window: int) -> int:
+    """Start of the window with the most energy; ties go to the centre."""
+    sums = np.convolve(energy, np.ones(window), mode="valid")
+    centre = (len(sums) - 1) / 2
+    # A tiny pull towards the centre settles flat images.
+    scores = sums - 1e-6 * (sums.max(initial=0) + 1) * np.abs(
+        np.arange(len(sums)) - centre
+    )
+    return int(np.argmax(scores))
+
+
+def smart_crop(
+    image: Image.Image, aspect: tuple[int, int]
+) -> tuple[int, int, int, int]:
+    """Places a crop of the given aspect ratio over the most detailed region.
+
+    Args:
+        image: The source image.
+        aspect: Aspect ratio (width, height) of the crop.
+
+    Returns:
+        The crop box as (left, top, width, height) in image pixels.
+    """
+    width, height = image.size
+    crop_w, crop_h = crop_size(image.size, aspect)
+    scale = min(1.0, _ANALYSIS_WIDTH / width)
+    small = image.convert("L").resize(
+        (max(1, round(width * scale)), max(1, round(height * scale)))
+    )
+    gray = np.asarray(small, dtype=np.float32)
+    energy = np.zeros_like(gray)
+    energy[:, 1:] += np.abs(np.diff(gray, axis=1))
+    energy[1:, :] += np.abs(np.diff(gray, axis=0))
+
+    left = top = 0
+    if crop_w < width:
+        window = max(1, round(crop_w * scale))
+        left = round(_best_offset(energy.sum(axis=0), window) / scale)
+    if crop_h < height:
+        window = max(1, round(crop_h * scale))
+        top = round(_best_offset(energy.sum(axis=1), window) / scale)
+    left = min(left, width - crop_w)
+    top = min(top, height - crop_h)
+    return (left, top, crop_w, crop_h)
+
+
+def render_renditions(
+    image_path: str,
+    audio_path: str,
+    outputs: dict[str, str],
+    profile: EncodingProfile,
+    threads: int | None = None,
+) -> dict[str, Any]:
+    """Renders one section into several renditions in a single ffmpeg pass.
+
+    Each output is written to a temporary file next to it and moved into
+    place once complete, so a cached segment is never half-written.
+
+    Args:
+        image_path: The section's image.
+        audio_path: The section's narration.
+        outputs: Output path per rendition name (keys of RENDITIONS).
+        profile: Frame rate, resolution limit and encoder settings.
+        threads: ffmpeg threads; None lets ffmpeg decide.
+
+    Returns:
+        The segment duration plus the CPU time and peak RSS of the render.
+
+    Raises:
+        subprocess.CalledProcessError: If ffmpeg fails.
+    """
+    cpu_start = cpu_seconds()
+    with Image.open(image_path) as image:
+        image_size = image.size
+        boxes = {name: smart_crop(image, RENDITIONS[name]) for name in outputs}
+    duration = audio_duration(audio_path)
+    frames = max(1, math.ceil(duration * profile.fps))
+
+    # The image is decoded once, and each branch crops and scales it once
+    # before the loop filter repeats the finished frame.
+    labels = [f"[s{i}]" for i in range(len(outputs))]
+    graph = [f"[0:v]split={len(outputs)}{''.join(labels)}"]
+    command = [
+        FFMPEG_BINARY,
+        "-y",
+        "-loglevel",
+        "error",
+        "-i",
+        image_path,
+        "-i",
+        audio_path,
+    ]
+    tmp_paths = {}
+    output_args: list[str] = []
+    for i, (name, path) in enumerate(outputs.items()):
+        left, top, crop_w, crop_h = boxes[name]
+        out_w, out_h = rendition_frame_size(image_size, RENDITIONS[name], profile)
+        graph.append(
+            f"{labels[i]}crop={crop_w}:{crop_h}:{left}:{top},scale={out_w}:{out_h},"
+            f"setsar=1,format=yuv420p,loop=loop={frames - 1}:size=1:start=0,"
+            f"setpts=N/{profile.fps}/TB[v{i}]"
+        )
+        fd, tmp_paths[name] = tempfile.mkstemp(
+            suffix=".mp4", dir=os.path.dirname(path) or "."
+        )
+        os.close(fd)
+        output_args += [
+            "-map",
+            f"[v{i}]",
+            "-map",
+            "1:a",
+            "-r",
+            str(profile.fps),
+            "-c:v",
+            "libx264",
+            "-preset",
+            profile.preset,
+            "-crf",
+            str(profile.crf),
+            "-c:a",
+            "aac",
+            "-b:a",
+            profile.audio_bitrate,
+            "-ar",
+            "44100",
+            "-t",
+            f"{duration:.3f}",
+            *(["-threads", str(threads)] if threads else []),
+            "-f",
+            "mp4",
+            tmp_paths[name],
+        ]
+    command += ["-filter_complex", ";".join(graph), *output_args]
+    try:
+        with PeakRssTracker() as rss:
+            subprocess.run(command, check=True, capture_output=True)
+        for name, path in outputs.items():
+            os.replace(tmp_paths[name], path)
+    finally:
+        for tmp_path in tmp_paths.values():
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    return {
+        "duration_s": duration,
+        "cpu_s": cpu_seconds() - cpu_start,
+        "peak_rss_bytes": rss.peak_bytes,
+    }
@@ -0,0 +1,114 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""CPU time and memory measurements of this process and its children.
+
+Kept apart from app.utils.metrics, which pulls in ADK and OpenTelemetry, so
+that render worker processes can measure themselves without loading them.
+"""
+
+import contextlib
+import os
+import resource
+import threading
+from typing import Any
+
+
+def cpu_seconds() -> float:
+    """CPU time of this process and its reaped children (e.g. ffmpeg)."""
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+
+def peak_rss_bytes() -> int:
+    """Peak resident set size of this process, in bytes."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def _rss_of(pid: int | str) -> int:
+    with open(f"/proc/{pid}/statm") as f:
+        return int(f.read().split()[1]) * _PAGE_SIZE
+
+
+def _children_rss(pid: int) -> int:
+    total = 0
+    for entry in os.scandir("/proc"):
+        if not entry.name.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry.name}/stat") as f:
+                # The command name may contain spaces; fields follow its ")".
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+            if ppid == pid:
+                total += _rss_of(entry.name)
+        except (OSError, IndexError, ValueError):
+            continue
+    return total
+
+
+class PeakRssTracker:
+    """Samples the memory of this process and its children during a block.
+
+    ru_maxrss is the peak over the whole life of a process, so in a reused
+    render worker it reports the largest render so far rather than the
+    current one, and it never includes the ffmpeg processes doing the
+    encoding. The tracker instead resets the kernel's high-water mark of this
+    process (Linux) and samples the resident memory of the process plus its
+    direct children until the block ends. Elsewhere it falls back to
+    ru_maxrss.
+    """
+
+    def __init__(self, interval_s: float = 0.05) -> None:
+        self.interval_s = interval_s
+        self.peak_bytes = 0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def __enter__(self) -> "PeakRssTracker":
+        if not os.path.exists("/proc/self/statm"):
+            return self
+        with contextlib.suppress(OSError):
+            with open("/proc/self/clear_refs", "w") as f:
+                f.write("5")  # reset VmHWM
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        if self._thread is None:
+            self.peak_bytes = peak_rss_bytes()
+            return
+        self._stop.set()
+        self._thread.join()
+        with contextlib.suppress(OSError, ValueError):
+            with open("/proc/self/status") as f:
+                for line in f:
+                    if line.startswith("VmHWM:"):
+                        self.peak_bytes = max(
+                            self.peak_bytes, int(line.split()[1]) * 1024
+                        )
+
+    def _sample(self) -> None:
+        pid = os.getpid()
+        while True:
+            with contextlib.suppress(OSError):
+                self.peak_bytes = max(
+                    self.peak_bytes, _rss_of(pid) + _children_rss(pid)
+                )
+            if self._stop.wait(self.interval_s):
+                return
@@ -0,0 +1,138 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""On-disk cache of rendered video segments, keyed by their inputs.
+
+A segment is one section of a video (an image plus its narration) rendered
+by app.utils.video.render_segment. Its key hashes the image and audio bytes,
+the frame size and the encoding profile, so re-rendering a video
+only encodes the sections whose assets changed. The least recently used
+segments are evicted once the cache grows beyond its size limit.
+
+The cache is not part of any job workspace quota (app/utils/workspace.py);
+on Cloud Run, where /tmp is held in memory, its size limit counts against
+the instance's memory and is set by the deployment (Makefile).
+
+Configuration (environment variables):
+    SEGMENT_CACHE_DIR: cache directory (default /tmp/segment_cache).
+    SEGMENT_CACHE_MAX_BYTES: size limit in bytes (default 1 GiB).
+"""
+
+import dataclasses
+import hashlib
+import json
+import logging
+import os
+
+from app.utils.video import EncodingProfile
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = "/tmp/segment_cache"
+DEFAULT_MAX_BYTES = 1 << 30
+
+
+class SegmentCache:
+    """Content-addressed directory of rendered segments with LRU eviction."""
+
+    def __init__(
+        self, directory: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES
+    ) -> None:
+        """
+        Initialize the cache.
+
+        Args:
+            directory: Where segments are stored; created if missing.
+            max_bytes: Total size above which the oldest segments are evicted.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    @classmethod
+    def from_env(cls) -> "SegmentCache":
+        max_bytes = os.getenv("SEGMENT_CACHE_MAX_BYTES")
+        return cls(
+            directory=os.getenv("SEGMENT_CACHE_DIR", DEFAULT_CACHE_DIR),
+            max_bytes=int(max_bytes) if max_bytes else DEFAULT_MAX_BYTES,
+        )
+
+    def key(
+        self,
+        image_path: str,
+        audio_path: str,
+        size: tuple[int, int] | None,
+        profile: EncodingProfile,
+        variant: str = "",
+        digests: tuple[str, str] | None = None,
+    ) -> str:
+        """Returns the cache key of the segment rendered from these inputs.
+
+        variant tells apart segments rendered differently from the same
+        inputs, e.g. the renditions of app/utils/renditions.py. digests are
+        the hex SHA-256 of the image and audio if already known (see
+        app/utils/asset_index.py); otherwise both files are read and hashed.
+        """
+        digest = hashlib.sha256()
+        params = {"size": size, "variant": variant, **dataclasses.asdict(profile)}
+        digest.update(json.dumps(params, sort_keys=True).encode())
+        if digests is not None:
+            for file_digest in digests:
+                digest.update(bytes.fromhex(file_digest))
+            return digest.hexdigest()
+        for path in (image_path, audio_path):
+            with open(path, "rb") as f:
+                digest.update(hashlib.sha256(f.read()).digest())
+        return digest.hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.mp4")
+
+    def get(self, key: str) -> str | None:
+        """Returns the path of a cached segment, marking it recently used."""
+        path = self.path(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def prune(self) -> None:
+        """Evicts the least recently used segments beyond max_bytes."""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".mp4") and entry.is_file():
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            total -= size
+            logger.debug("Evicted cached segment %s", path)
+
+
+_segment_cache: SegmentCache | None = None
+
+
+def get_segment_cache() -> SegmentCache:
+    """Returns the process-wide segment cache, configured from the environment."""
+    global _segment_cache
+    if _segment_cache is None:
+        _segment_cache = SegmentCache.from_env()
+    return _segment_cache
@@ -0,0 +1,207 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Server startup work that runs once the server accepts connections.
+
+Creating the artifact bucket, connecting to Cloud Logging and building the
+trace exporter take network round trips. Done at import time, they delay
+the moment uvicorn starts listening on every cold start. The server's
+lifespan instead runs them as startup checks, concurrently in worker
+threads, and `/readyz` answers 503 until the required ones have succeeded
+(optional ones, e.g. tracing, only show up in the report). A required check
+that fails is retried with exponential backoff, from STARTUP_RETRY_INITIAL_S
+up to STARTUP_RETRY_MAX_S between attempts, until it succeeds or the server
+shuts down, so a transient error does not leave the instance unready.
+
+The duration of each check and the time from the start of the server
+process to readiness are recorded. Readiness later than STARTUP_BUDGET_S
+logs a warning; see tests/benchmark/run_cold_start_benchmark.py for the
+cold start measured from outside the process.
+
+Configuration (environment variables):
+    STARTUP_BUDGET_S: cold start budget in seconds (default 10).
+    STARTUP_RETRY_INITIAL_S: delay before the first retry (default 1).
+    STARTUP_RETRY_MAX_S: longest delay between retries (default 30).
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any, Literal
+
+from app.utils.metrics import meter_provider
+
+logger = logging.getLogger(__name__)
+
+STARTUP_BUDGET_S = float(os.getenv("STARTUP_BUDGET_S", "10"))
+STARTUP_RETRY_INITIAL_S = float(os.getenv("STARTUP_RETRY_INITIAL_S", "1"))
+STARTUP_RETRY_MAX_S = float(os.getenv("STARTUP_RETRY_MAX_S", "30"))
+
+_meter = meter_provider.get_meter(__name__)
+_check_duration = _meter.create_histogram(
+    "pipeline.startup.check_duration",
+    unit="s",
+    description="Duration of server startup check attempts, by check and outcome.",
+)
+_ready_after = _meter.create_histogram(
+    "pipeline.startup.ready_after",
+    unit="s",
+    description="Time from the start of the server process to readiness.",
+)
+
+
+# Fallback start time where the process start time cannot be read.
+_imported_at = time.time()
+
+
+def process_started_at() -> float:
+    """When the current process started, as a Unix timestamp.
+
+    Read from /proc on Linux, so that the interpreter's start and every
+    import count; elsewhere, when this module was imported.
+    """
+    try:
+        with open("/proc/self/stat") as f:
+            # Fields after the command name, which may contain spaces; the
+            # start time, in clock ticks after boot, is field 22.
+            start_ticks = int(f.read().rpartition(")")[2].split()[19])
+        with open("/proc/uptime") as f:
+            uptime_s = float(f.read().split()[0])
+    except (OSError, ValueError, IndexError):
+        return _imported_at
+    return time.time() - (uptime_s - start_ticks / os.sysconf("SC_CLK_TCK"))
+
+
+@dataclass
+class StartupCheck:
+    """One piece of startup work and its outcome."""
+
+    name: str
+    run: Callable[[], Any]
+    # Whether the server is ready only once it succeeded.
+    required: bool = True
+    status: Literal["pending", "running", "ok", "failed"] = "pending"
+    attempts: int = 0
+    # From the first attempt to success, or to the failure of an optional check.
+    duration_s: float | None = None
+    # Of the last failed attempt.
+    error: str | None = None
+
+
+class Startup:
+    """Runs startup checks concurrently and reports readiness."""
+
+    def __init__(
+        self,
+        started_at: float,
+        budget_s: float = STARTUP_BUDGET_S,
+        retry_initial_s: float = STARTUP_RETRY_INITIAL_S,
+        retry_max_s: float = STARTUP_RETRY_MAX_S,
+    ) -> None:
+        """
+        Initialize with no checks.
+
+        Args:
+            started_at: When the server process started (time.time()).
+            budget_s: Time to readiness above which a warning is logged.
+            retry_initial_s: Delay before retrying a failed required check.
+            retry_max_s: Longest delay between retries, which double.
+        """
+        self.started_at = started_at
+        self.budget_s = budget_s
+        self.retry_initial_s = retry_initial_s
+        self.retry_max_s = retry_max_s
+        self.checks: dict[str, StartupCheck] = {}
+        self.ready_after_s: float | None = None
+
+    def add(self, name: str, run: Callable[[], Any], required: bool = True) -> None:
+        """Registers a blocking function to run at startup."""
+        self.checks[name] = StartupCheck(name, run, required)
+
+    @property
+    def ready(self) -> bool:
+        """Whether every required check succeeded."""
+        return all(c.status == "ok" for c in self.checks.values() if c.required)
+
+    async def run(self) -> None:
+        """Runs the checks concurrently, each in a worker thread, until the required ones succeeded."""
+        await asyncio.gather(*(self._run(check) for check in self.checks.values()))
+        self.ready_after_s = time.time() - self.started_at
+        _ready_after.record(self.ready_after_s)
+        if self.ready_after_s > self.budget_s:
+            logger.warning(
+                "Server ready after %.2fs, over the %.1fs cold start budget: %s",
+                self.ready_after_s,
+                self.budget_s,
+                ", ".join(
+                    f"{c.name} {c.duration_s:.2f}s" for c in self.checks.values()
+                ),
+            )
+        else:
+            logger.info("Server ready after %.2fs", self.ready_after_s)
+
+    async def _run(self, check: StartupCheck) -> None:
+        start = time.perf_counter()
+        delay = self.retry_initial_s
+        while True:
+            check.status = "running"
+            check.attempts += 1
+            attempt_start = time.perf_counter()
+            try:
+                await asyncio.to_thread(check.run)
+                check.status = "ok"
+            except Exception as e:
+                check.status = "failed"
+                check.error = repr(e)
+            _check_duration.record(
+                time.perf_counter() - attempt_start,
+                {"check": check.name, "status": check.status},
+            )
+            if check.status == "ok" or not check.required:
+                break
+            logger.warning(
+                "Startup check %s failed (attempt %d), retrying in %.1fs: %s",
+                check.name,
+                check.attempts,
+                delay,
+                check.error,
+            )
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.retry_max_s)
+        check.duration_s = time.perf_counter() - start
+        if check.status == "failed":
+            logger.error(
+                "Optional startup check %s failed: %s", check.name, check.error
+            )
+
+    def report(self) -> dict[str, Any]:
+        """Readiness, the outcome of every check and the cold start timing."""
+        return {
+            "ready": self.ready,
+            "ready_after_s": self.ready_after_s,
+            "budget_s": self.budget_s,
+            "checks": {
+                c.name: {
+                    "status": c.status,
+                    "required": c.required,
+                    "attempts": c.attempts,
+                    "duration_s": c.duration_s,
+                    "error": c.error,
+                }
+                for c in self.checks.values()
+            },
+        }
@@ -0,0 +1,190 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Hierarchical map-reduce summarization of long source documents.
+
+A source longer than SUMMARIZE_ABOVE_CHARS is split into chunks of about
+CHUNK_CHARS at paragraph or sentence boundaries. Every chunk is summarized
+concurrently by a fast model (map), each summary tagged with a citation of
+the chunk's character offsets, e.g. "[2:16000-24000]" for characters
+16000-24000 of source 2. Summaries are then merged group by group (reduce),
+keeping the citations, until the digest fits in DIGEST_CHARS. Downstream
+stages therefore see a bounded digest however long the source is.
+
+Configuration (environment variables):
+    SUMMARY_MODEL: model used for the map and reduce calls.
+"""
+
+import asyncio
+import logging
+import os
+import re
+from dataclasses import dataclass
+
+from google.adk.models import BaseLlm, LlmRequest
+from google.adk.models.registry import LLMRegistry
+from google.genai import types
+
+from app.utils.metrics import record_usage
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_MODEL = os.getenv("SUMMARY_MODEL", "gemini-2.5-flash-lite")
+SUMMARIZE_ABOVE_CHARS = 20000
+CHUNK_CHARS = 8000
+DIGEST_CHARS = 4000
+SUMMARY_WORDS = 120
+CONCURRENCY = 8
+MAX_REDUCE_ROUNDS = 4
+
+# Same identity format ADK uses for agents, so summaries are attributed to a
+# named caller in traces and by the fake model backends.
+_SYSTEM_INSTRUCTION = """You are an agent. Your internal name is "source_summarizer".
+You condense research sources into dense factual summaries. Keep names,
+numbers, dates and claims; drop boilerplate, navigation and repetition.
+Keep every citation tag like [2:16000-24000] that appears in the input
+next to the facts it supports."""
+
+_BOUNDARY = re.compile(r"\n\s*\n|\n|(?<=[.!?])\s+")
+_CITATION = re.compile(r"\[\d+:\d+-\d+\]")
+
+
+@dataclass
+class Chunk:
+    """A span of a source document."""
+
+    start: int
+    end: int
+    text: str
+
+
+def chunk_text(text: str, chunk_chars: int = CHUNK_CHARS) -> list[Chunk]:
+    """Splits text into chunks of at most about chunk_chars characters.
+
+    Chunks end at the last paragraph, line or sentence boundary before the
+    limit, or exactly at the limit if there is none.
+    """
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = min(start + chunk_chars, len(text))
+        if end < len(text):
+            boundaries = [
+                m.end() for m in _BOUNDARY.finditer(text, start + chunk_chars // 2, end)
+            ]
+            if boundaries:
+                end = boundaries[-1]
+        chunks.append(Chunk(start, end, text[start:end]))
+        start = end
+    return chunks
+
+
+async def _generate(llm: BaseLlm, prompt: str) -> str:
+    request = LlmRequest(
+        model=llm.model,
+        contents=[
+            types.Content(role="user", parts=[types.Part.from_text(text=prompt)])
+        ],
+        config=types.GenerateContentConfig(system_instruction=_SYSTEM_INSTRUCTION),
+    )
+    text = ""
+    async for response in llm.generate_content_async(request):
+        if response.content and response.content.parts:
+            text += "".join(part.text or "" for part in response.content.parts)
+        usage = response.usage_metadata
+        if usage is not None:
+            record_usage(
+                tokens_in=usage.prompt_token_count or 0,
+                tokens_out=usage.candidates_token_count or 0,
+            )
+    return text.strip()
+
+
+async def summarize_document(
+    text: str,
+    source_id: int,
+    model: str = SUMMARY_MODEL,
+    chunk_chars: int = CHUNK_CHARS,
+    digest_chars: int = DIGEST_CHARS,
+) -> str:
+    """Summarizes a long document into a digest of at most digest_chars.
+
+    Args:
+        text: The document.
+        source_id: Number used in citations, e.g. 2 in "[2:0-8000]".
+        model: Model used for the map and reduce calls.
+        chunk_chars: Size of the chunks summarized in each call.
+        digest_chars: Upper bound on the returned digest.
+
+    Returns:
+        The digest, with citations to character offsets of the document.
+    """
+    llm = LLMRegistry.new_llm(model)
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def summarize(prompt: str) -> str:
+        async with semaphore:
+            return await _generate(llm, prompt)
+
+    chunks = chunk_text(text, chunk_chars)
+    summaries = await asyncio.gather(
+        *(
+            summarize(
+                f"Summarize this excerpt in at most {SUMMARY_WORDS} words.\n\n{chunk.text}"
+            )
+            for chunk in chunks
+        )
+    )
+    parts = [
+        f"{summary} [{source_id}:{chunk.start}-{chunk.end}]"
+        for chunk, summary in zip(chunks, summaries, strict=True)
+    ]
+
+    for _ in range(MAX_REDUCE_ROUNDS):
+        digest = "\n".join(parts)
+        if len(digest) <= digest_chars or len(parts) == 1:
+            break
+        # Merge consecutive summaries in groups that fit in one call.
+        groups: list[list[str]] = [[]]
+        for part in parts:
+            if groups[-1] and sum(map(len, groups[-1])) + len(part) > chunk_chars:
+                groups.append([])
+            groups[-1].append(part)
+        if len(groups) == len(parts):
+            groups = [parts[i : i + 2] for i in range(0, len(parts), 2)]
+        words = max(SUMMARY_WORDS, digest_chars // 8 // len(groups))
+        parts = list(
+            await asyncio.gather(
+                *(
+                    summarize(
+                        f"Merge these summaries into one of at most {words} words, "
+                        "keeping the citation tags.\n\n" + "\n".join(group)
+                    )
+                    for group in groups
+                )
+            )
+        )
+
+    digest = "\n".join(parts)
+    if len(digest) > digest_chars:
+        logger.warning(
+            "Digest of source %d still %d chars; truncating", source_id, len(digest)
+        )
+        digest = digest[:digest_chars].rsplit(" ", 1)[0]
+    return digest
+
+
+def citations(text: str) -> list[str]:
+    """Citation tags in a digest, in order of appearance."""
+    return _CITATION.findall(text)
@@ -44,3 +44,88 @@ class Feedback(BaseModel):
     log_type: Literal["feedback"] = "feedback"
     service_name: Literal["my-content-pipeline"] = "my-content-pipeline"
     user_id: str = ""
+
+
+class JobRequest(BaseModel):
+    """Represents a request to run the content pipeline as a background job."""
+
+    topic: str
+    user_id: str = Field(default_factory=lambda: f"user_{uuid.uuid4()}")
+    # Encoding profile of the job's video (default: the server's). Draft
+    # renders are quick low-resolution cuts for review; approving the job
+    # renders the final video from the same assets.
+    profile: Literal["draft", "standard", "high"] | None = None
+    # Aspect ratios to render the video in, each cropped from the same
+    # images in one pass (default: the images' own, landscape).
+    renditions: list[Literal["16:9", "9:16", "1:1"]] | None = Field(
+        default=None, min_length=1
+    )
+
+
+class JobStatus(BaseModel):
+    """Represents the progress and outcome of a pipeline job."""
+
+    job_id: str
+    user_id: str
+    session_id: str
+    status: Literal["queued", "running", "succeeded", "failed"] = "queued"
+    stage: str | None = None
+    created_at: float
+    started_at: float | None = None
+    finished_at: float | None = None
+    error: str | None = None
+    artifacts: list[str] = Field(default_factory=list)
+    # HLS playlist artifact of the video rendered so far, playable before the
+    # job finishes.
+    preview: str | None = None
+    profile: str | None = None
+    renditions: list[str] | None = None
+    # Final render requested by approving the job, and its video artifact.
+    final_render: Literal["running", "succeeded", "failed"] | None = None
+    final_video: str | None = None
+    metrics: dict | None = None
+
+
+class ApprovalRequest(BaseModel):
+    """Represents approval of a job's draft, requesting its final render."""
+
+    profile: Literal["standard", "high"] = "standard"
+
+
+class SectionPlan(BaseModel):
+    """Represents the narration and image prompt planned for one video section."""
+
+    heading: str = Field(description="Short title of the section.")
+    transcript: str = Field(description="The exact text to narrate for this section.")
+    image_prompt: str = Field(
+        description="A unique, highly descriptive prompt for the section's image."
+    )
+
+
+class MediaPlan(BaseModel):
+    """Represents every section of a video, planned in a single model call."""
+
+    sections: list[SectionPlan]
+
+
+class OutlineImage(BaseModel):
+    """Represents an image planned from one outline section."""
+
+    heading: str = Field(description="The outline section's heading, verbatim.")
+    image_prompt: str = Field(
+        description="A unique, highly descriptive prompt for the section's image."
+    )
+
+
+class OutlineImagePlan(BaseModel):
+    """Represents images planned from the outline, before the article exists."""
+
+    sections: list[OutlineImage]
+
+
+class ResearchPlan(BaseModel):
+    """Represents the web searches planned for a topic."""
+
+    queries: list[str] = Field(
+        description="Distinct, specific web search queries that together cover the topic."
+    )
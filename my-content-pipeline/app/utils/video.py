@@ -0,0 +1,381 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Video render functions executed in the render worker pool.
+
+Functions here run in separate processes (see app/utils/render_pool.py), so
+they take and return only plain, picklable values and report their own CPU
+time and peak memory for the caller's metrics. Worker processes import only
+the modules of the functions they run; keep this module's imports light
+(no ADK, OpenTelemetry or agent code) so that each worker stays small.
+"""
+
+import bisect
+import itertools
+import os
+import subprocess
+import tempfile
+from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
+from moviepy import AudioFileClip, ImageClip, VideoClip
+from moviepy.config import FFMPEG_BINARY
+from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
+from PIL import Image
+
+from app.utils.media_probe import audio_duration
+from app.utils.resources import PeakRssTracker, cpu_seconds
+
+
+@dataclass(frozen=True)
+class EncodingProfile:
+    """Resolution, frame rate and encoder settings of a render.
+
+    All segments of a video are encoded with the same profile, so that they
+    can be joined with a stream copy instead of a re-encode.
+    """
+
+    name: str
+    # Output height in pixels, with the width following the images' aspect
+    # ratio; None keeps the images' own size. Images are never upscaled.
+    height: int | None
+    fps: int
+    preset: str
+    crf: int
+    audio_bitrate: str
+
+    def frame_size(self, image_size: tuple[int, int]) -> tuple[int, int]:
+        """Output frame size for images of the given size.
+
+        Dimensions are rounded down to even numbers, as yuv420p requires.
+        """
+        width, height = image_size
+        if self.height is not None and self.height < height:
+            width, height = round(width * self.height / height), self.height
+        return (width // 2 * 2, height // 2 * 2)
+
+    @property
+    def codec_params(self) -> dict[str, Any]:
+        """Encoder arguments for moviepy's write_videofile."""
+        return {
+            "codec": "libx264",
+            "preset": self.preset,
+            "pixel_format": "yuv420p",
+            "audio_codec": "aac",
+            "audio_fps": 44100,
+            "audio_bitrate": self.audio_bitrate,
+            "ffmpeg_params": ["-crf", str(self.crf)],
+        }
+
+
+ENCODING_PROFILES: dict[str, EncodingProfile] = {
+    # Review renders: a fraction of the pixels and frames, fastest preset.
+    "draft": EncodingProfile(
+        "draft", height=360, fps=12, preset="ultrafast", crf=30, audio_bitrate="64k"
+    ),
+    "standard": EncodingProfile(
+        "standard", height=None, fps=24, preset="medium", crf=23, audio_bitrate="128k"
+    ),
+    "high": EncodingProfile(
+        "high", height=None, fps=24, preset="slow", crf=18, audio_bitrate="192k"
+    ),
+}
+DEFAULT_ENCODING_PROFILE = os.getenv("ENCODING_PROFILE", "standard")
+
+
+def get_encoding_profile(name: str | None = None) -> EncodingProfile:
+    """Returns the named encoding profile, or the default one for None.
+
+    Raises:
+        ValueError: If there is no profile of that name.
+    """
+    name = name or DEFAULT_ENCODING_PROFILE
+    try:
+        return ENCODING_PROFILES[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown encoding profile {name!r}; expected one of {', '.join(ENCODING_PROFILES)}"
+        ) from None
+
+
+def load_frame(image_path: str, size: tuple[int, int] | None = None) -> np.ndarray:
+    """Decodes an image into an RGB frame of the given size.
+
+    Resizing in Pillow before the frame becomes an array keeps only the
+    output-sized frame in memory, rather than moviepy's full-resolution
+    array plus its resized copy.
+    """
+    with Image.open(image_path) as image:
+        if size is not None and image.size != tuple(size):
+            # JPEG draft mode decodes at a fraction of the resolution.
+            image.draft("RGB", tuple(size))
+        frame = image.convert("RGB")
+        if size is not None and frame.size != tuple(size):
+            frame = frame.resize(
+                tuple(size), Image.Resampling.LANCZOS, reducing_gap=3.0
+            )
+        return np.asarray(frame)
+
+
+class _SectionFrames:
+    """Frames of a video's sections, decoded on demand one section at a time."""
+
+    def __init__(
+        self, image_paths: list[str], durations: list[float], size: tuple[int, int]
+    ) -> None:
+        self.image_paths = image_paths
+        self.size = size
+        self.starts = list(itertools.accumulate(durations, initial=0.0))
+        self._index = -1
+        self._frame: np.ndarray | None = None
+
+    def frame_at(self, t: float) -> np.ndarray:
+        index = min(bisect.bisect_right(self.starts, t) - 1, len(self.image_paths) - 1)
+        if index == self._index and self._frame is not None:
+            return self._frame
+        self._frame = None  # drop the previous section's frame first
+        frame = load_frame(self.image_paths[max(index, 0)], self.size)
+        self._frame, self._index = frame, index
+        return frame
+
+
+def concat_audio(audio_paths: list[str], audio_path: str, bitrate: str) -> None:
+    """Joins narration clips into one AAC file with ffmpeg.
+
+    Clips may differ in sample rate or channels; the concat filter resamples
+    them to one format.
+
+    Raises:
+        subprocess.CalledProcessError: If ffmpeg fails.
+    """
+    inputs = [arg for path in audio_paths for arg in ("-i", path)]
+    labels = "".join(f"[{i}:a]" for i in range(len(audio_paths)))
+    subprocess.run(
+        [
+            FFMPEG_BINARY,
+            "-y",
+            "-loglevel",
+            "error",
+            *inputs,
+            "-filter_complex",
+            f"{labels}concat=n={len(audio_paths)}:v=0:a=1[a]",
+            "-map",
+            "[a]",
+            "-c:a",
+            "aac",
+            "-b:a",
+            bitrate,
+            "-ar",
+            "44100",
+            "-f",
+            "mp4",
+            audio_path,
+        ],
+        check=True,
+        capture_output=True,
+    )
+
+
+def render_video(
+    image_paths: list[str],
+    audio_paths: list[str],
+    video_path: str,
+    threads: int | None = None,
+    profile: EncodingProfile = ENCODING_PROFILES["standard"],
+) -> dict[str, Any]:
+    """Renders images and their narration into a single MP4.
+
+    Each image is shown for the duration of its corresponding audio clip.
+    Memory stays bounded by one output-sized frame however many sections the
+    video has: each image is decoded when its section starts and dropped when
+    it ends, and the narration is never decoded in Python (ffmpeg joins it
+    and the encoder muxes it in).
+
+    Args:
+        image_paths: One image per section.
+        audio_paths: One audio clip per section, in the same order.
+        video_path: Where to write the MP4.
+        threads: ffmpeg encoder threads; None lets ffmpeg decide.
+        profile: Output resolution, frame rate and encoder settings.
+
+    Returns:
+        The video duration plus the CPU time and peak RSS of the render.
+    """
+    cpu_start = cpu_seconds()
+    with PeakRssTracker() as rss:
+        durations = [audio_duration(path) for path in audio_paths]
+        with Image.open(image_paths[0]) as image:
+            size = profile.frame_size(image.size)
+        frames = _SectionFrames(image_paths, durations, size)
+        video = VideoClip(frames.frame_at, duration=sum(durations))
+
+        directory = os.path.dirname(video_path) or "."
+        fd, audio_path = tempfile.mkstemp(suffix=".m4a", dir=directory)
+        os.close(fd)
+        try:
+            concat_audio(audio_paths, audio_path, profile.audio_bitrate)
+            video.write_videofile(
+                video_path,
+                fps=profile.fps,
+                threads=threads,
+                logger=None,
+                # The joined narration is already AAC; mux it as is.
+                **{**profile.codec_params, "audio_codec": "copy"},
+                audio=audio_path,
+            )
+        finally:
+            os.remove(audio_path)
+    return {
+        "duration_s": sum(durations),
+        "cpu_s": cpu_seconds() - cpu_start,
+        "peak_rss_bytes": rss.peak_bytes,
+    }
+
+
+def render_segment(
+    image_path: str,
+    audio_path: str,
+    segment_path: str,
+    size: tuple[int, int] | None = None,
+    threads: int | None = None,
+    profile: EncodingProfile = ENCODING_PROFILES["standard"],
+) -> dict[str, Any]:
+    """Renders one section (an image shown for its narration) into an MP4.
+
+    The segment is written to a temporary file next to segment_path and moved
+    into place once complete, so a cached segment is never half-written.
+
+    Args:
+        image_path: The section's image.
+        audio_path: The section's narration.
+        segment_path: Where to write the segment.
+        size: Frame size (width, height); images of another size are resized
+            so that all segments of a video match.
+        threads: ffmpeg encoder threads; None lets ffmpeg decide.
+        profile: Frame rate and encoder settings; the frame size is given by
+            size (see EncodingProfile.frame_size).
+
+    Returns:
+        The segment duration plus the CPU time and peak RSS of the render.
+    """
+    cpu_start = cpu_seconds()
+    with PeakRssTracker() as rss:
+        audio = AudioFileClip(audio_path)
+        clip = ImageClip(load_frame(image_path, size), duration=audio.duration)
+        clip.audio = audio
+
+        directory = os.path.dirname(segment_path) or "."
+        fd, tmp_path = tempfile.mkstemp(suffix=".mp4", dir=directory)
+        os.close(fd)
+        try:
+            clip.write_videofile(
+                tmp_path,
+                fps=profile.fps,
+                threads=threads,
+                temp_audiofile_path=directory,
+                logger=None,
+                **profile.codec_params,
+            )
+            os.replace(tmp_path, segment_path)
+        finally:
+            audio.close()
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    return {
+        "duration_s": audio.duration,
+        "cpu_s": cpu_seconds() - cpu_start,
+        "peak_rss_bytes": rss.peak_bytes,
+    }
+
+
+def concat_segments(segment_paths: list[str], video_path: str) -> None:
+    """Joins segments rendered by render_segment into one MP4 without re-encoding.
+
+    Args:
+        segment_paths: Segments in playback order.
+        video_path: Where to write the joined video.
+
+    Raises:
+        subprocess.CalledProcessError: If ffmpeg fails.
+    """
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as f:
+        for path in segment_paths:
+            escaped = os.path.abspath(path).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+        list_path = f.name
+    try:
+        subprocess.run(
+            [
+                FFMPEG_BINARY,
+                "-y",
+                "-loglevel",
+                "error",
+                "-f",
+                "concat",
+                "-safe",
+                "0",
+                "-i",
+                list_path,
+                "-c",
+                "copy",
+                "-movflags",
+                "+faststart",
+                video_path,
+            ],
+            check=True,
+            capture_output=True,
+        )
+    finally:
+        os.remove(list_path)
+
+
+def remux_to_ts(segment_path: str, ts_path: str, offset_s: float = 0.0) -> float:
+    """Copies a segment's streams into an MPEG-TS file for HLS playback.
+
+    Args:
+        segment_path: A segment rendered by render_segment.
+        ts_path: Where to write the MPEG-TS segment.
+        offset_s: Start of the segment within the whole video; timestamps are
+            shifted by it so that consecutive segments play back seamlessly.
+
+    Returns:
+        The segment duration in seconds.
+
+    Raises:
+        subprocess.CalledProcessError: If ffmpeg fails.
+    """
+    duration = ffmpeg_parse_infos(segment_path)["duration"]
+    subprocess.run(
+        [
+            FFMPEG_BINARY,
+            "-y",
+            "-loglevel",
+            "error",
+            "-i",
+            segment_path,
+            "-c",
+            "copy",
+            "-bsf:v",
+            "h264_mp4toannexb",
+            "-output_ts_offset",
+            f"{offset_s:.3f}",
+            "-f",
+            "mpegts",
+            ts_path,
+        ],
+        check=True,
+        capture_output=True,
+    )
+    return duration
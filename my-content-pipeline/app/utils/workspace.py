@@ -0,0 +1,382 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Per-job scratch directories with a size quota and automatic cleanup.
+
+Every file a job writes to local disk (images, voiceovers, rendered videos,
+preview segments) goes into the job's workspace, `<root>/<workspace id>/`.
+On Cloud Run the filesystem is backed by the instance's memory, so files
+that are never deleted eventually take the instance down; workspaces bound
+that:
+
+- each workspace has a byte quota, checked before and after every write.
+  The bytes held are counted as files are written (write_bytes, check) and
+  removed (remove), so a check does not walk the directory;
+- JobManager releases a job's workspace when the job fails or is
+  forgotten, once its final video is rendered, and when a succeeded job
+  is not approved within JOB_APPROVAL_WINDOW_S (it keeps its images and
+  narration until then, as approving it renders from them);
+- workspaces of pipeline runs outside jobs (the chat flow) are released
+  when the run ends;
+- a sweep removes workspaces left behind by anything else, e.g. a process
+  that was restarted mid-job, once they have not been written to for
+  WORKSPACE_MAX_AGE_S. It runs at most every WORKSPACE_SWEEP_INTERVAL_S, in
+  a background thread started when a workspace is opened.
+
+The segment cache (app/utils/segment_cache.py) is shared by all jobs and
+bounded by its own SEGMENT_CACHE_MAX_BYTES, outside these quotas. On Cloud
+Run the local filesystem is held in the instance's memory, so the
+workspaces held at once (running jobs, and succeeded jobs awaiting approval)
+times WORKSPACE_QUOTA_BYTES plus SEGMENT_CACHE_MAX_BYTES is memory taken
+from the process; the deployment (Makefile) caps the cache at 512 MiB of the
+instance's 4 GiB.
+
+Each workspace also holds the job's asset index (app/utils/asset_index.py),
+which records the hash and media metadata of the files written to it.
+
+The bytes and workspaces held by the process are exported as gauges.
+
+Configuration (environment variables):
+    WORKSPACE_ROOT: parent directory of all workspaces (default
+        /tmp/content_pipeline_jobs).
+    WORKSPACE_QUOTA_BYTES: size limit of one workspace (default 1 GiB).
+    WORKSPACE_MAX_AGE_S: idle time after which an inactive workspace is
+        swept (default 6 hours).
+    WORKSPACE_SWEEP_INTERVAL_S: minimum time between sweeps (default 10
+        minutes).
+"""
+
+import contextlib
+import logging
+import os
+import shutil
+import threading
+import time
+from collections.abc import Iterator
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.agents.readonly_context import ReadonlyContext
+from opentelemetry.metrics import CallbackOptions, Observation
+
+from app.utils.asset_index import INDEX_FILENAME, AssetIndex
+from app.utils.metrics import meter_provider
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ROOT = "/tmp/content_pipeline_jobs"
+DEFAULT_QUOTA_BYTES = 1 << 30
+DEFAULT_MAX_AGE_S = 6 * 3600
+DEFAULT_SWEEP_INTERVAL_S = 600
+
+_meter = meter_provider.get_meter(__name__)
+_swept = _meter.create_counter(
+    "pipeline.workspace.swept",
+    description="Orphaned job workspaces removed by the sweeper.",
+)
+_quota_rejections = _meter.create_counter(
+    "pipeline.workspace.quota_exceeded",
+    description="Writes rejected because a job workspace was over its quota.",
+)
+
+
+class WorkspaceQuotaExceeded(Exception):
+    """Raised when a write would take a workspace beyond its quota."""
+
+
+def _tree_size(path: str) -> int:
+    total = 0
+    for directory, _, files in os.walk(path):
+        for name in files:
+            with contextlib.suppress(FileNotFoundError):
+                total += os.path.getsize(os.path.join(directory, name))
+    return total
+
+
+def _last_modified(path: str) -> float:
+    latest = os.path.getmtime(path)
+    for directory, _, files in os.walk(path):
+        for name in files:
+            with contextlib.suppress(FileNotFoundError):
+                latest = max(latest, os.path.getmtime(os.path.join(directory, name)))
+    return latest
+
+
+class Workspace:
+    """The scratch directory of one job."""
+
+    def __init__(self, workspace_id: str, directory: str, quota_bytes: int) -> None:
+        self.workspace_id = workspace_id
+        self.directory = directory
+        self.quota_bytes = quota_bytes
+        # Index of the media files in the workspace.
+        self.assets = AssetIndex(os.path.join(directory, INDEX_FILENAME))
+        self._users = 0
+        # Size of each file written through the workspace, and their total
+        # plus whatever the directory held when it was opened.
+        self._sizes: dict[str, int] = {}
+        self._bytes = _tree_size(directory)
+        self._lock = threading.Lock()
+
+    @property
+    def active(self) -> bool:
+        """Whether a job or render is currently using the workspace."""
+        return self._users > 0
+
+    @contextlib.contextmanager
+    def in_use(self) -> Iterator["Workspace"]:
+        """Marks the workspace as in use, so the sweeper leaves it alone."""
+        self._users += 1
+        try:
+            yield self
+        finally:
+            self._users -= 1
+
+    def subdirectory(self, name: str) -> str:
+        """Returns a subdirectory of the workspace, created if missing."""
+        path = os.path.join(self.directory, name)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def path(self, subdirectory: str, filename: str) -> str:
+        """Returns the path of a file in a subdirectory of the workspace."""
+        return os.path.join(self.subdirectory(subdirectory), filename)
+
+    def bytes_held(self) -> int:
+        """Total size of the files in the workspace."""
+        return self._bytes
+
+    def _record(self, path: str, size: int) -> None:
+        with self._lock:
+            self._bytes += size - self._sizes.get(path, 0)
+            self._sizes[path] = size
+
+    def ensure_room(self, nbytes: int = 0) -> None:
+        """Checks that nbytes more fit in the workspace.
+
+        Raises:
+            WorkspaceQuotaExceeded: If they do not.
+        """
+        held = self.bytes_held()
+        if held + nbytes > self.quota_bytes:
+            _quota_rejections.add(1)
+            raise WorkspaceQuotaExceeded(
+                f"Workspace {self.workspace_id} holds {held} bytes; writing {nbytes} more "
+                f"would exceed its quota of {self.quota_bytes}"
+            )
+
+    def write_bytes(self, subdirectory: str, filename: str, data: bytes) -> str:
+        """Writes a file into the workspace if it fits in the quota.
+
+        Returns:
+            The path of the written file.
+
+        Raises:
+            WorkspaceQuotaExceeded: If the file does not fit.
+        """
+        self.ensure_room(len(data))
+        path = self.path(subdirectory, filename)
+        with open(path, "wb") as f:
+            f.write(data)
+        self._record(path, len(data))
+        return path
+
+    def check(self, *paths: str) -> None:
+        """Counts files of unknown size that were written and checks the quota.
+
+        Raises:
+            WorkspaceQuotaExceeded: If the workspace is over its quota; the
+                given files are deleted first.
+        """
+        for path in paths:
+            with contextlib.suppress(FileNotFoundError):
+                self._record(path, os.path.getsize(path))
+        try:
+            self.ensure_room()
+        except WorkspaceQuotaExceeded:
+            self.remove(*paths)
+            raise
+
+    def remove(self, *paths: str) -> None:
+        """Deletes files from the workspace."""
+        for path in paths:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+            with self._lock:
+                self._bytes -= self._sizes.pop(path, 0)
+
+
+class WorkspaceManager:
+    """Creates, releases and sweeps the job workspaces under one root."""
+
+    def __init__(
+        self,
+        root: str = DEFAULT_ROOT,
+        quota_bytes: int = DEFAULT_QUOTA_BYTES,
+        max_age_s: float = DEFAULT_MAX_AGE_S,
+        sweep_interval_s: float = DEFAULT_SWEEP_INTERVAL_S,
+    ) -> None:
+        """
+        Initialize the manager.
+
+        Args:
+            root: Parent directory of the workspaces; created if missing.
+            quota_bytes: Size limit of each workspace.
+            max_age_s: Idle time after which an inactive workspace is swept.
+            sweep_interval_s: Minimum time between sweeps.
+        """
+        self.root = root
+        self.quota_bytes = quota_bytes
+        self.max_age_s = max_age_s
+        self.sweep_interval_s = sweep_interval_s
+        self._workspaces: dict[str, Workspace] = {}
+        self._lock = threading.Lock()
+        self._last_sweep = 0.0
+        self._sweeper: threading.Thread | None = None
+        os.makedirs(root, exist_ok=True)
+
+    @classmethod
+    def from_env(cls) -> "WorkspaceManager":
+        return cls(
+            root=os.getenv("WORKSPACE_ROOT", DEFAULT_ROOT),
+            quota_bytes=int(os.getenv("WORKSPACE_QUOTA_BYTES", DEFAULT_QUOTA_BYTES)),
+            max_age_s=float(os.getenv("WORKSPACE_MAX_AGE_S", DEFAULT_MAX_AGE_S)),
+            sweep_interval_s=float(
+                os.getenv("WORKSPACE_SWEEP_INTERVAL_S", DEFAULT_SWEEP_INTERVAL_S)
+            ),
+        )
+
+    def get(self, workspace_id: str) -> Workspace:
+        """Returns the workspace of a job, creating it if needed."""
+        if time.time() - self._last_sweep >= self.sweep_interval_s:
+            # Sweeping walks every workspace, so it is kept off the caller,
+            # which is usually the event loop.
+            self._last_sweep = time.time()
+            self._sweeper = threading.Thread(
+                target=self.sweep, name="workspace-sweep", daemon=True
+            )
+            self._sweeper.start()
+        with self._lock:
+            workspace = self._workspaces.get(workspace_id)
+            if workspace is None:
+                directory = os.path.join(self.root, workspace_id)
+                os.makedirs(directory, exist_ok=True)
+                workspace = Workspace(workspace_id, directory, self.quota_bytes)
+                self._workspaces[workspace_id] = workspace
+            return workspace
+
+    def exists(self, workspace_id: str) -> bool:
+        """Whether a workspace has been created and not released."""
+        return os.path.isdir(os.path.join(self.root, workspace_id))
+
+    def release(self, workspace_id: str) -> None:
+        """Deletes a workspace and everything in it."""
+        with self._lock:
+            workspace = self._workspaces.pop(workspace_id, None)
+        directory = os.path.join(self.root, workspace_id)
+        if os.path.isdir(directory):
+            held = workspace.bytes_held() if workspace else 0
+            logger.info("Releasing workspace %s (%d bytes)", workspace_id, held)
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def sweep(self) -> int:
+        """Removes inactive workspaces that have been idle for max_age_s.
+
+        Returns:
+            The number of workspaces removed.
+        """
+        self._last_sweep = time.time()
+        cutoff = self._last_sweep - self.max_age_s
+        removed = 0
+        for entry in os.scandir(self.root):
+            if not entry.is_dir():
+                continue
+            workspace = self._workspaces.get(entry.name)
+            if workspace is not None and workspace.active:
+                continue
+            try:
+                idle = _last_modified(entry.path) < cutoff
+            except FileNotFoundError:
+                continue
+            if idle:
+                logger.warning("Sweeping orphaned workspace %s", entry.name)
+                self.release(entry.name)
+                removed += 1
+        if removed:
+            _swept.add(removed)
+        return removed
+
+    def bytes_held(self) -> int:
+        """Total size of the workspaces opened by this process."""
+        with self._lock:
+            workspaces = list(self._workspaces.values())
+        return sum(workspace.bytes_held() for workspace in workspaces)
+
+    def workspace_count(self) -> int:
+        """Number of workspaces under the root."""
+        return sum(1 for entry in os.scandir(self.root) if entry.is_dir())
+
+
+_workspace_manager: WorkspaceManager | None = None
+
+
+def get_workspace_manager() -> WorkspaceManager:
+    """Returns the process-wide workspace manager, configured from the environment."""
+    global _workspace_manager
+    if _workspace_manager is None:
+        _workspace_manager = WorkspaceManager.from_env()
+    return _workspace_manager
+
+
+def workspace_id(context: ReadonlyContext) -> str:
+    """Workspace ID of a pipeline run: its job ID, else its invocation ID."""
+    return context.state.get("job_id") or context.invocation_id
+
+
+def get_workspace(context: ReadonlyContext) -> Workspace:
+    """Returns the workspace of the pipeline run a tool or agent belongs to."""
+    return get_workspace_manager().get(workspace_id(context))
+
+
+def release_workspace_callback(callback_context: CallbackContext) -> None:
+    """after_agent_callback for the pipeline root that frees runs outside jobs.
+
+    Jobs keep their workspace for the final render; JobManager releases it.
+    """
+    if not callback_context.state.get("job_id"):
+        get_workspace_manager().release(callback_context.invocation_id)
+
+
+def _observe_bytes(options: CallbackOptions) -> list[Observation]:
+    if _workspace_manager is None:
+        return []
+    return [Observation(_workspace_manager.bytes_held())]
+
+
+def _observe_count(options: CallbackOptions) -> list[Observation]:
+    if _workspace_manager is None:
+        return []
+    return [Observation(_workspace_manager.workspace_count())]
+
+
+_meter.create_observable_gauge(
+    "pipeline.workspace.bytes",
+    callbacks=[_observe_bytes],
+    unit="By",
+    description="Bytes held in job workspaces on local disk.",
+)
+_meter.create_observable_gauge(
+    "pipeline.workspace.count",
+    callbacks=[_observe_count],
+    description="Job workspaces on local disk.",
+)
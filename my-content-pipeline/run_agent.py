@@ -2,9 +2,11 @@ import asyncio
 
 from google.adk.runners import Runner
 from google.adk.sessions import InMemorySessionService
-from app.agent import root_agent
 from google.genai import types as genai_types
 
+from app.agent import root_agent
+from app.utils.artifact_store import SpillingArtifactService
+
 
 async def main():
     """Runs the agent with a sample query."""
@@ -13,15 +15,17 @@ async def main():
         app_name="app", user_id="test_user", session_id="test_session"
     )
     runner = Runner(
-        agent=root_agent, app_name="app", session_service=session_service
+        agent=root_agent,
+        app_name="app",
+        session_service=session_service,
+        artifact_service=SpillingArtifactService(),
     )
     query = "a blog post about the benefits of using a standing desk"
     async for event in runner.run_async(
         user_id="test_user",
         session_id="test_session",
         new_message=genai_types.Content(
-            role="user", 
-            parts=[genai_types.Part.from_text(text=query)]
+            role="user", parts=[genai_types.Part.from_text(text=query)]
         ),
     ):
         if event.is_final_response():
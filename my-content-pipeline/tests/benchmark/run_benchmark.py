@@ -0,0 +1,262 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""End-to-end benchmark of content_creation_pipeline with fake model backends.
+
+Gemini, Imagen, TTS and google_search are replaced by the deterministic fakes
+in app/utils/fake_backends.py; everything else (page extraction, LDA, audio
+concatenation, the moviepy/ffmpeg render, artifact saving) runs for real.
+Per-stage wall time, CPU, peak RSS and output sizes are written as JSON for
+regression tracking.
+
+Usage:
+    uv run python tests/benchmark/run_benchmark.py --sections 8 --runs 3
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from dataclasses import asdict, fields
+from typing import Any
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+os.environ.setdefault("GOOGLE_CLOUD_PROJECT", "benchmark")
+
+from app.utils.video import ENCODING_PROFILES
+
+# Render pool workers re-import this script (as __mp_main__) but only run
+# render functions; loading the pipeline and ADK there would inflate every
+# worker's memory, and with it the render_rss_bytes being measured.
+if __name__ == "__main__":
+    from google.adk.runners import Runner
+    from google.adk.sessions import InMemorySessionService
+    from google.genai import types
+
+    from app.agents.pipelines import content_creation_pipeline
+    from app.tools.multimedia import ENCODING_PROFILE_KEY
+    from app.utils.artifact_store import SpillingArtifactService
+    from app.utils.fake_backends import FakeBackendConfig, install_fake_backends
+
+APP_NAME = "benchmark"
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".results")
+
+
+def _rusage() -> dict[str, float]:
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return {
+        "cpu_s": own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime,
+        "peak_rss_bytes": own.ru_maxrss * 1024,
+        "children_peak_rss_bytes": children.ru_maxrss * 1024,
+    }
+
+
+async def _artifact_sizes(
+    artifact_service: "SpillingArtifactService", user_id: str, session_id: str
+) -> dict[str, dict[str, int]]:
+    sizes: dict[str, dict[str, int]] = defaultdict(lambda: {"count": 0, "bytes": 0})
+    for name in await artifact_service.list_artifact_keys(
+        app_name=APP_NAME, user_id=user_id, session_id=session_id
+    ):
+        part = await artifact_service.load_artifact(
+            app_name=APP_NAME, user_id=user_id, session_id=session_id, filename=name
+        )
+        kind = name.split("_", 1)[0]
+        sizes[kind]["count"] += 1
+        sizes[kind]["bytes"] += (
+            len(part.inline_data.data or b"") if part and part.inline_data else 0
+        )
+    return dict(sizes)
+
+
+async def run_once(run: int, topic: str, profile: str) -> dict[str, Any]:
+    """Runs the pipeline once and returns its measurements."""
+    session_service = InMemorySessionService()
+    # Videos and narration are spilled to disk rather than held in memory,
+    # so they do not count towards the measured peak RSS.
+    artifact_service = SpillingArtifactService()
+    runner = Runner(
+        app_name=APP_NAME,
+        agent=content_creation_pipeline,
+        session_service=session_service,
+        artifact_service=artifact_service,
+    )
+    user_id = "benchmark_user"
+    session = await session_service.create_session(
+        app_name=APP_NAME,
+        user_id=user_id,
+        state={"job_id": f"benchmark-{run}", ENCODING_PROFILE_KEY: profile},
+    )
+
+    before = _rusage()
+    start = time.perf_counter()
+    errors = []
+    async for event in runner.run_async(
+        user_id=user_id,
+        session_id=session.id,
+        new_message=types.Content(
+            role="user", parts=[types.Part.from_text(text=topic)]
+        ),
+    ):
+        if event.error_message:
+            errors.append(event.error_message)
+    wall_s = time.perf_counter() - start
+    after = _rusage()
+
+    finished = await session_service.get_session(
+        app_name=APP_NAME, user_id=user_id, session_id=session.id
+    )
+    summary = finished.state.get("job_metrics", {}) if finished else {}
+    stages = [
+        {
+            k: stage[k]
+            for k in (
+                "name",
+                "kind",
+                "duration_s",
+                "cpu_s",
+                "peak_rss_bytes",
+                "render_rss_bytes",
+                "usage",
+                "error",
+            )
+        }
+        for stage in summary.get("stages", [])
+    ]
+    outputs = await _artifact_sizes(artifact_service, user_id, session.id)
+    artifact_store = artifact_service.usage()
+    artifact_service.close()
+    return {
+        "run": run,
+        "wall_s": round(wall_s, 3),
+        "cpu_s": round(after["cpu_s"] - before["cpu_s"], 3),
+        "peak_rss_bytes": after["peak_rss_bytes"],
+        "children_peak_rss_bytes": after["children_peak_rss_bytes"],
+        "render_rss_bytes": summary.get("render_rss_bytes", 0),
+        "totals": summary.get("totals", {}),
+        "stages": stages,
+        "outputs": outputs,
+        "artifact_store": artifact_store,
+        "errors": errors,
+    }
+
+
+def _aggregate(runs: list[dict[str, Any]]) -> dict[str, dict[str, float]]:
+    """Median wall/CPU time per stage name across runs."""
+    by_stage: dict[str, list[dict[str, Any]]] = defaultdict(list)
+    for run in runs:
+        for stage in run["stages"]:
+            by_stage[f"{stage['kind']}:{stage['name']}"].append(stage)
+
+    def median(values: list[float]) -> float:
+        values = sorted(values)
+        mid = len(values) // 2
+        return values[mid] if len(values) % 2 else (values[mid - 1] + values[mid]) / 2
+
+    return {
+        name: {
+            "calls": len(stages),
+            "median_duration_s": round(median([s["duration_s"] for s in stages]), 4),
+            "total_duration_s": round(sum(s["duration_s"] for s in stages), 4),
+            "median_cpu_s": round(median([s["cpu_s"] for s in stages]), 4),
+        }
+        for name, stages in sorted(by_stage.items())
+    }
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=1)
+    parser.add_argument("--topic", default="the benefits of using a standing desk")
+    parser.add_argument("--output", default=os.path.join(RESULTS_DIR, "benchmark.json"))
+    parser.add_argument(
+        "--workdir", help="Directory for generated files (default: temp dir)"
+    )
+    parser.add_argument(
+        "--profile",
+        choices=sorted(ENCODING_PROFILES),
+        default="standard",
+        help="Encoding profile",
+    )
+    for f in fields(FakeBackendConfig):
+        parser.add_argument(
+            f"--{f.name.replace('_', '-')}", type=type(f.default), default=f.default
+        )
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    config = FakeBackendConfig(
+        **{f.name: getattr(args, f.name) for f in fields(FakeBackendConfig)}
+    )
+    output = os.path.abspath(args.output)
+    commit = _git_commit()
+    backends = install_fake_backends(config)
+
+    # Keep generated files, including job workspaces, out of the repo.
+    workdir = args.workdir or tempfile.mkdtemp(prefix="cocreator-benchmark-")
+    os.makedirs(workdir, exist_ok=True)
+    os.chdir(workdir)
+    os.environ.setdefault("WORKSPACE_ROOT", os.path.join(workdir, "workspaces"))
+    try:
+        runs = [
+            asyncio.run(run_once(i, args.topic, args.profile)) for i in range(args.runs)
+        ]
+    finally:
+        backends.close()
+
+    stages = _aggregate(runs)
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "git_commit": commit,
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "config": {**asdict(config), "profile": args.profile},
+        "runs": runs,
+        "stages": stages,
+    }
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    for name, stats in stages.items():
+        print(
+            f"{name:55s} {stats['calls']:4d} calls  median {stats['median_duration_s']:8.3f}s"
+        )
+    print(f"Wrote {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Cold start of the API server, measured from outside the process.
+
+Each run starts `uvicorn app.server:app` in a fresh process and polls it.
+The report gives, per run and as medians:
+
+- `listening_s`: from spawning the process to its first HTTP response, i.e.
+  imports plus uvicorn startup;
+- `ready_s`: from spawning the process to the first 200 from `/readyz`,
+  i.e. until the startup checks of app/utils/startup.py succeeded;
+- `checks`: the duration of each startup check, from the `/readyz` report.
+
+The server needs Google Cloud credentials and a project (the artifact
+bucket check creates the bucket if missing); set FAKE_MODEL_BACKENDS to
+keep it from calling Vertex AI.
+
+Usage:
+    uv run python tests/benchmark/run_cold_start_benchmark.py --runs 5
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+PROJECT_DIR = os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+)
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".results")
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _get(url: str) -> tuple[int, bytes] | None:
+    """Status and body of a GET, or None while the server does not answer."""
+    try:
+        with urllib.request.urlopen(url, timeout=5) as response:
+            return response.status, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+    except OSError:
+        return None
+
+
+def cold_start(timeout_s: float, poll_s: float) -> dict:
+    """Starts a server and times it until it is listening and until it is ready."""
+    port = _free_port()
+    readyz = f"http://127.0.0.1:{port}/readyz"
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.server:app", "--port", str(port)],
+        cwd=PROJECT_DIR,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    listening_s = None
+    try:
+        while time.perf_counter() - started < timeout_s:
+            if server.poll() is not None:
+                raise RuntimeError(f"Server exited with status {server.returncode}")
+            response = _get(readyz)
+            if response is not None:
+                listening_s = listening_s or time.perf_counter() - started
+                status, body = response
+                if status == 200:
+                    report = json.loads(body)
+                    return {
+                        "listening_s": round(listening_s, 3),
+                        "ready_s": round(time.perf_counter() - started, 3),
+                        "ready_after_s": report["ready_after_s"],
+                        "checks": {
+                            name: check["duration_s"]
+                            for name, check in report["checks"].items()
+                        },
+                    }
+            time.sleep(poll_s)
+        raise TimeoutError(f"Server not ready after {timeout_s}s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--timeout-s", type=float, default=120.0)
+    parser.add_argument("--poll-s", type=float, default=0.05)
+    parser.add_argument(
+        "--output", default=os.path.join(RESULTS_DIR, "cold_start.json")
+    )
+    args = parser.parse_args()
+
+    runs = [cold_start(args.timeout_s, args.poll_s) for _ in range(args.runs)]
+    checks = {name for run in runs for name in run["checks"]}
+    report = {
+        "config": vars(args),
+        "runs": runs,
+        "listening_s": statistics.median(run["listening_s"] for run in runs),
+        "ready_s": statistics.median(run["ready_s"] for run in runs),
+        "checks": {
+            name: statistics.median(
+                run["checks"][name]
+                for run in runs
+                if run["checks"].get(name) is not None
+            )
+            for name in sorted(checks)
+        },
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"listening  {report['listening_s']:7.2f} s")
+    print(f"ready      {report['ready_s']:7.2f} s")
+    for name, duration in report["checks"].items():
+        print(f"  {name:16s} {duration:7.2f} s")
+    print(f"Wrote {os.path.abspath(args.output)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Cost per minute of audio of the loudness normalization in app/utils/loudness.py.
+
+Sections of speech-like noise (syllable-rate bursts with pauses) are
+generated at levels spread like those of different TTS voices. The report
+times, per minute of audio:
+
+- `normalize`: the NumPy pass (loudness, gain, limiter) over all sections
+  at once;
+- `voiceover`: join_voiceover on each section's MP3, i.e. the ffmpeg decode
+  and encode around the NumPy pass, which is what synthesize_voiceover adds
+  to a section;
+- `reencode`: the same decode and encode without normalizing, for
+  comparison.
+
+Usage:
+    uv run python tests/benchmark/run_loudness_benchmark.py --sections 8 --section-s 60
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from typing import Any
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from app.utils.loudness import (
+    SAMPLE_RATE,
+    encode_mp3,
+    integrated_loudness,
+    join_voiceover,
+    normalize_loudness,
+)
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".results")
+
+
+def speech_like(
+    rng: np.random.Generator, seconds: float, level_db: float
+) -> np.ndarray:
+    """Noise shaped by a 4 Hz syllable envelope with pauses, at a given level."""
+    t = np.arange(round(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    envelope = np.clip(np.sin(2 * np.pi * 4 * t), 0, None) ** 2
+    envelope *= np.sin(2 * np.pi * 0.2 * t) > -0.5  # a pause every few seconds
+    noise = np.convolve(rng.standard_normal(len(t)), np.ones(4) / 4, mode="same")
+    samples = envelope * noise
+    return (samples / np.abs(samples).max() * 10 ** (level_db / 20)).astype(np.float32)
+
+
+def _timed(fn: Callable[[], Any], runs: int) -> float:
+    durations = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sections", type=int, default=8)
+    parser.add_argument(
+        "--section-s", type=float, default=60.0, help="Length of each section"
+    )
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=os.path.join(RESULTS_DIR, "loudness.json"))
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    levels = rng.uniform(-12, -1, args.sections)
+    buffers = [speech_like(rng, args.section_s, level) for level in levels]
+    minutes = args.sections * args.section_s / 60
+
+    with tempfile.TemporaryDirectory() as workdir:
+        paths = []
+        for i, buffer in enumerate(buffers):
+            paths.append(os.path.join(workdir, f"section_{i}.mp3"))
+            encode_mp3(buffer, paths[-1])
+        output = os.path.join(workdir, "out.mp3")
+        normalize_s = _timed(lambda: normalize_loudness(buffers), args.runs)
+        voiceover_s = _timed(
+            lambda: [join_voiceover([p], output) for p in paths], args.runs
+        )
+        reencode_s = _timed(
+            lambda: [join_voiceover([p], output, normalize=False) for p in paths],
+            args.runs,
+        )
+
+    before = integrated_loudness(buffers)
+    after = integrated_loudness(normalize_loudness(buffers)[0])
+    report = {
+        "config": vars(args),
+        "audio_minutes": minutes,
+        "ms_per_audio_minute": {
+            "normalize": round(normalize_s / minutes * 1000, 2),
+            "voiceover": round(voiceover_s / minutes * 1000, 2),
+            "reencode": round(reencode_s / minutes * 1000, 2),
+        },
+        "loudness_spread_lu": {
+            "before": round(float(before.max() - before.min()), 2),
+            "after": round(float(after.max() - after.min()), 2),
+        },
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    for name, ms in report["ms_per_audio_minute"].items():
+        print(f"{name:10s} {ms:8.2f} ms per minute of audio")
+    spread = report["loudness_spread_lu"]
+    print(
+        f"Loudness spread across sections: {spread['before']} LU -> {spread['after']} LU"
+    )
+    print(f"Wrote {os.path.abspath(args.output)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -19,6 +19,7 @@ from google.adk.sessions import InMemorySessionService
 from google.genai import types
 
 from app.agent import root_agent
+from app.utils.artifact_store import SpillingArtifactService
 
 
 def test_agent_stream() -> None:
@@ -30,7 +31,12 @@ def test_agent_stream() -> None:
     session_service = InMemorySessionService()
 
     session = session_service.create_session_sync(user_id="test_user", app_name="test")
-    runner = Runner(agent=root_agent, session_service=session_service, app_name="test")
+    runner = Runner(
+        agent=root_agent,
+        session_service=session_service,
+        artifact_service=SpillingArtifactService(),
+        app_name="test",
+    )
 
     message = types.Content(
         role="user", parts=[types.Part.from_text(text="Why is the sky blue?")]
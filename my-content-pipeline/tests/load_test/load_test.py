@@ -12,19 +12,60 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import json
 import os
+import random
 import time
 import uuid
+from typing import Any
 
 import requests
-from locust import HttpUser, between, task
+from locust import HttpUser, between, events, task
 
 ENDPOINT = "/run_sse"
+JOBS_ENDPOINT = "/jobs"
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".results")
+
+# Scenario settings. Run the server with FAKE_MODEL_BACKENDS=1 (see README)
+# so that jobs exercise the full pipeline without calling Vertex AI.
+POLL_INTERVAL = float(os.environ.get("LOAD_TEST_POLL_INTERVAL", "5"))
+JOB_TIMEOUT = float(os.environ.get("LOAD_TEST_JOB_TIMEOUT", "1800"))
+INSTANCE_LABEL = os.environ.get("LOAD_TEST_INSTANCE", "local")
+DOWNLOAD_KINDS = os.environ.get("LOAD_TEST_DOWNLOAD", "video").split(",")
+TOPICS = [
+    "the benefits of using a standing desk",
+    "how coral reefs recover after bleaching",
+    "the history of the printing press",
+    "why sourdough bread rises",
+]
+
+
+def _user_mix() -> dict[str, int]:
+    """Parses LOAD_TEST_USER_MIX, e.g. "video=3,chat=1", into class weights."""
+    mix = {"chat": 1, "video": 1}
+    for item in os.environ.get("LOAD_TEST_USER_MIX", "").split(","):
+        if "=" in item:
+            name, weight = item.split("=", 1)
+            mix[name.strip()] = int(weight)
+    return mix
+
+
+USER_MIX = _user_mix()
+JOB_RESULTS: list[dict[str, Any]] = []
+TEST_STARTED_AT = time.time()
+
+
+def _auth_headers() -> dict[str, str]:
+    headers = {"Content-Type": "application/json"}
+    if os.environ.get("_ID_TOKEN"):
+        headers["Authorization"] = f"Bearer {os.environ['_ID_TOKEN']}"
+    return headers
 
 
 class ChatStreamUser(HttpUser):
     """Simulates a user interacting with the chat stream API."""
 
+    weight = USER_MIX["chat"]
     wait_time = between(1, 3)  # Wait 1-3 seconds between tasks
 
     @task
@@ -98,3 +139,148 @@ class ChatStreamUser(HttpUser):
                 )
             else:
                 response.failure(f"Unexpected status code: {response.status_code}")
+
+
+class VideoJobUser(HttpUser):
+    """Simulates a user creating a video: submit, poll progress, download."""
+
+    weight = USER_MIX["video"]
+    wait_time = between(1, 3)
+
+    def _fire(
+        self, name: str, response_time: float, exception: Exception | None = None
+    ) -> None:
+        self.environment.events.request.fire(
+            request_type="JOB",
+            name=name,
+            response_time=response_time,
+            response_length=0,
+            exception=exception,
+            context={},
+        )
+
+    @task
+    def video_job(self) -> None:
+        """Runs one pipeline job end to end."""
+        headers = _auth_headers()
+        submitted_at = time.time()
+        with self.client.post(
+            JOBS_ENDPOINT,
+            name=f"{JOBS_ENDPOINT} submit",
+            headers=headers,
+            json={"topic": random.choice(TOPICS)},
+            catch_response=True,
+        ) as response:
+            if response.status_code == 503:
+                # Backpressure from the server is expected under saturation.
+                response.success()
+                JOB_RESULTS.append({"status": "rejected", "submitted_at": submitted_at})
+                return
+            if response.status_code != 202:
+                response.failure(f"Unexpected status code: {response.status_code}")
+                return
+            job_id = response.json()["job_id"]
+
+        status: dict[str, Any] = {}
+        while time.time() - submitted_at < JOB_TIMEOUT:
+            time.sleep(POLL_INTERVAL)
+            poll = self.client.get(
+                f"{JOBS_ENDPOINT}/{job_id}",
+                name=f"{JOBS_ENDPOINT}/[id] poll",
+                headers=headers,
+            )
+            if poll.status_code != 200:
+                continue
+            status = poll.json()
+            if status["status"] in ("succeeded", "failed"):
+                break
+        else:
+            self._fire(
+                "job timeout", (time.time() - submitted_at) * 1000, TimeoutError(job_id)
+            )
+            JOB_RESULTS.append({"status": "timeout", "submitted_at": submitted_at})
+            return
+
+        elapsed_ms = (time.time() - submitted_at) * 1000
+        error = (
+            RuntimeError(status.get("error")) if status["status"] == "failed" else None
+        )
+        self._fire("job end-to-end", elapsed_ms, error)
+        stages = (status.get("metrics") or {}).get("stages", [])
+        for stage in stages:
+            self._fire(f"{stage['kind']} {stage['name']}", stage["duration_s"] * 1000)
+
+        for filename in status.get("artifacts", []):
+            kind = filename.split("_", 1)[0]
+            if kind in DOWNLOAD_KINDS:
+                self.client.get(
+                    f"{JOBS_ENDPOINT}/{job_id}/artifacts/{filename}",
+                    name=f"{JOBS_ENDPOINT}/[id]/artifacts {kind}",
+                    headers=headers,
+                )
+
+        JOB_RESULTS.append(
+            {
+                "status": status["status"],
+                "submitted_at": submitted_at,
+                "latency_s": elapsed_ms / 1000,
+                "stages": [
+                    {"name": f"{s['kind']} {s['name']}", "duration_s": s["duration_s"]}
+                    for s in stages
+                ],
+            }
+        )
+
+
+def _percentiles(values: list[float]) -> dict[str, float]:
+    if not values:
+        return {}
+    values = sorted(values)
+
+    def pick(q: float) -> float:
+        return round(values[min(int(q * len(values)), len(values) - 1)], 3)
+
+    return {"p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99), "max": values[-1]}
+
+
+@events.test_start.add_listener
+def _on_test_start(**kwargs: Any) -> None:
+    global TEST_STARTED_AT
+    TEST_STARTED_AT = time.time()
+    JOB_RESULTS.clear()
+
+
+@events.quitting.add_listener
+def _write_job_report(environment: Any, **kwargs: Any) -> None:
+    """Writes throughput, error rate and stage latency percentiles for jobs."""
+    if not JOB_RESULTS:
+        return
+    elapsed_s = max(time.time() - TEST_STARTED_AT, 1e-6)
+    finished = [r for r in JOB_RESULTS if r["status"] in ("succeeded", "failed")]
+    succeeded = [r for r in finished if r["status"] == "succeeded"]
+    stage_durations: dict[str, list[float]] = {}
+    for result in succeeded:
+        for stage in result["stages"]:
+            stage_durations.setdefault(stage["name"], []).append(stage["duration_s"])
+
+    report = {
+        "instance": INSTANCE_LABEL,
+        "user_mix": USER_MIX,
+        "users": environment.runner.user_count if environment.runner else None,
+        "elapsed_s": round(elapsed_s, 1),
+        "jobs": {
+            status: sum(1 for r in JOB_RESULTS if r["status"] == status)
+            for status in ("succeeded", "failed", "timeout", "rejected")
+        },
+        "jobs_per_hour": round(len(succeeded) * 3600 / elapsed_s, 2),
+        "error_rate": round(1 - len(succeeded) / len(JOB_RESULTS), 4),
+        "job_latency_s": _percentiles([r["latency_s"] for r in succeeded]),
+        "stage_latency_s": {
+            name: _percentiles(values)
+            for name, values in sorted(stage_durations.items())
+        },
+    }
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"video_jobs_{INSTANCE_LABEL}.json")
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
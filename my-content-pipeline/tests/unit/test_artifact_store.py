@@ -0,0 +1,130 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import os
+from pathlib import Path
+from typing import Any
+
+from google.genai import types
+
+from app.utils.artifact_store import SpillingArtifactService
+from app.utils.bundle import artifact_chunks
+
+IDS: dict[str, Any] = {"app_name": "app", "user_id": "u1", "session_id": "s1"}
+
+
+def test_artifacts_spilled_and_evicted(tmp_path: Path) -> None:
+    """Large and least recently used artifacts go to disk, and disk stays within budget."""
+    service = SpillingArtifactService(
+        memory_budget_bytes=250,
+        spill_threshold_bytes=1000,
+        disk_budget_bytes=2500,
+        spill_root=str(tmp_path),
+    )
+
+    async def save(name: str, data: bytes) -> int:
+        part = types.Part.from_bytes(data=data, mime_type="application/octet-stream")
+        return await service.save_artifact(**IDS, filename=name, artifact=part)
+
+    async def load(name: str, version: int | None = None) -> bytes | None:
+        part = await service.load_artifact(**IDS, filename=name, version=version)
+        return part.inline_data.data if part and part.inline_data else None
+
+    async def run() -> None:
+        await save("small_a", b"a" * 100)
+        await save("small_b", b"b" * 100)
+        assert service.usage()["memory_bytes"] == 200
+        await load("small_a")
+        # Over the memory budget: small_b, the least recently used, is spilled.
+        await save("small_c", b"c" * 100)
+        assert service.usage()["memory_contents"] == 2
+        assert service.spilled_path(**IDS, filename="small_b") is not None
+        assert await load("small_b") == b"b" * 100
+
+        # Large artifacts are written to disk straight away.
+        video = os.urandom(1500)
+        assert await save("video", video) == 0
+        path = service.spilled_path(**IDS, filename="video")
+        assert path is not None and Path(path).read_bytes() == video
+        chunks = artifact_chunks(service, **IDS, filename="video", chunk_size=512)
+        assert b"".join([bytes(c) async for c in chunks]) == video
+
+        # A second version goes over the disk budget: the least recently used
+        # spilled content (small_b) is evicted first, then the first video.
+        assert await save("video", os.urandom(1200)) == 1
+        usage = service.usage()
+        assert usage["disk_bytes"] <= 2500
+        assert usage["evicted_contents"] == 2
+        assert await load("small_b") is None
+        assert await load("video", 0) is None
+        assert await service.list_versions(**IDS, filename="video") == [1]
+        assert await load("small_a") == b"a" * 100
+        assert await service.list_artifact_keys(**IDS) == [
+            "small_a",
+            "small_c",
+            "video",
+        ]
+
+        await service.delete_artifact(**IDS, filename="video")
+        assert service.usage()["disk_bytes"] == 0
+        assert os.listdir(service.spill_dir) == []
+
+    asyncio.run(run())
+    service.close()
+    assert not os.path.exists(service.spill_dir)
+
+
+def test_duplicate_contents_stored_once(tmp_path: Path) -> None:
+    """Versions with the same bytes share one stored content, removed with the last of them."""
+    service = SpillingArtifactService(
+        spill_threshold_bytes=1000, spill_root=str(tmp_path)
+    )
+    video = os.urandom(2000)
+    other = {**IDS, "session_id": "s2"}
+
+    async def save(ids: dict, name: str, data: bytes, mime_type: str) -> None:
+        part = types.Part.from_bytes(data=data, mime_type=mime_type)
+        await service.save_artifact(**ids, filename=name, artifact=part)
+
+    async def run() -> None:
+        await save(IDS, "video_a.mp4", video, "video/mp4")
+        await save(IDS, "video_a.mp4", video, "video/mp4")
+        await save(other, "copy.bin", video, "application/octet-stream")
+        await save(IDS, "image.png", b"png", "image/png")
+        await save(other, "image.png", b"png", "image/png")
+        usage = service.usage()
+        assert usage["artifact_versions"] == 5
+        assert (usage["disk_contents"], usage["disk_bytes"]) == (1, 2000)
+        assert (usage["memory_contents"], usage["memory_bytes"]) == (1, 3)
+        assert usage["deduplicated_bytes"] == 2 * 2000 + 3
+        assert len(os.listdir(service.spill_dir)) == 1
+
+        # Each reference keeps its own MIME type.
+        part = await service.load_artifact(**other, filename="copy.bin")
+        assert part is not None and part.inline_data is not None
+        assert (part.inline_data.data, part.inline_data.mime_type) == (
+            video,
+            "application/octet-stream",
+        )
+
+        await service.delete_artifact(**IDS, filename="video_a.mp4")
+        assert await service.load_artifact(**other, filename="copy.bin") is not None
+        assert service.usage()["disk_bytes"] == 2000
+        await service.delete_artifact(**other, filename="copy.bin")
+        assert service.usage()["disk_bytes"] == 0
+        assert os.listdir(service.spill_dir) == []
+
+    asyncio.run(run())
+    service.close()
@@ -0,0 +1,90 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import wave
+from pathlib import Path
+
+import pytest
+from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
+
+from app.utils import asset_index
+from app.utils.asset_index import AssetIndex
+from app.utils.fake_backends import FakeBackendConfig, FakeImageModel, _tone_mp3
+from app.utils.media_probe import probe_audio, probe_image
+
+
+def test_header_probe_matches_ffmpeg(tmp_path: Path) -> None:
+    """WAV and MP3 durations read from headers agree with a full ffmpeg probe."""
+    wav = tmp_path / "tone.wav"
+    with wave.open(str(wav), "wb") as f:
+        f.setnchannels(2)
+        f.setsampwidth(2)
+        f.setframerate(16000)
+        f.writeframes(b"\0" * 4 * 16000 * 3)
+    mp3 = tmp_path / "tone.mp3"
+    mp3.write_bytes(_tone_mp3(27))
+
+    info = probe_audio(str(wav))
+    assert (info.duration_s, info.sample_rate, info.channels, info.codec) == (
+        3.0,
+        16000,
+        2,
+        "pcm",
+    )
+    info = probe_audio(str(mp3))
+    assert info.codec == "mp3"
+    assert info.sample_rate == 24000
+    assert info.duration_s == pytest.approx(
+        ffmpeg_parse_infos(str(mp3))["duration"], abs=0.03
+    )
+
+
+def test_index_persists_and_reuses_records(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Records survive a reload and are recomputed only when a file changes."""
+    model = FakeImageModel(FakeBackendConfig(image_width=64, image_height=36))
+    image = tmp_path / "image.png"
+    image_bytes = model.generate_images(prompt="x")[0]._image_bytes
+    image.write_bytes(image_bytes)
+    audio = tmp_path / "audio.mp3"
+    audio.write_bytes(_tone_mp3(10))
+
+    index = AssetIndex(str(tmp_path / "asset_index.json"))
+    image_record = index.add(str(image), image_bytes)
+    assert (image_record.width, image_record.height) == probe_image(str(image))[:2]
+    # MP3 frames pad the tone by up to one frame plus the encoder delay.
+    assert index.get(str(audio)).duration_s == pytest.approx(1.0, abs=0.1)
+
+    described = []
+    describe = asset_index.describe
+
+    def counting_describe(
+        path: str, data: bytes | None = None
+    ) -> asset_index.AssetRecord:
+        described.append(path)
+        return describe(path, data)
+
+    monkeypatch.setattr(asset_index, "describe", counting_describe)
+    reloaded = AssetIndex(index.path)
+    assert reloaded.records() == index.records()
+    assert reloaded.get(str(image)) == image_record
+    assert described == []
+
+    audio.write_bytes(_tone_mp3(20))
+    reloaded.get(str(audio))
+    assert described == [str(audio)]
+    assert AssetIndex(index.path).get(str(audio)).duration_s == pytest.approx(
+        2.0, abs=0.1
+    )
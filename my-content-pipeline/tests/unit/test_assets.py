@@ -0,0 +1,340 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import os
+from pathlib import Path
+from typing import Any
+
+import pytest
+from google.adk.agents import BaseAgent, SequentialAgent
+from google.adk.artifacts import InMemoryArtifactService
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from app.agents.assets import (
+    AssetProducerAgent,
+    SpeculativeImageAgent,
+    match_speculative_images,
+)
+from app.tools import multimedia
+from app.utils.fake_backends import FakeBackendConfig, FakeImageModel, FakeTtsClient
+from app.utils.preview import (
+    PREVIEW_PLAYLIST,
+    hls_playlist,
+    segment_name,
+    target_duration,
+)
+from app.utils.render_pool import RenderPool, RenderPoolSaturated
+from app.utils.segment_cache import SegmentCache
+from app.utils.typing import SectionPlan
+from app.utils.video import get_encoding_profile
+from app.utils.workspace import WorkspaceManager
+
+
+def _plan(sections: int) -> dict:
+    return {
+        "sections": [
+            {
+                "heading": f"Part {i}",
+                "transcript": f"Narration for part {i}.",
+                "image_prompt": f"Scene {i}",
+            }
+            for i in range(sections)
+        ]
+    }
+
+
+def _run_agent(
+    agent: BaseAgent,
+    plan: dict,
+    artifacts: InMemoryArtifactService | None = None,
+    state: dict | None = None,
+) -> tuple[dict, list, str]:
+    """Runs the agent on a plan; returns the produced assets, the events and the session ID."""
+
+    async def run() -> tuple[dict, list, str]:
+        sessions = InMemorySessionService()
+        runner = Runner(
+            app_name="app",
+            agent=agent,
+            session_service=sessions,
+            artifact_service=artifacts or InMemoryArtifactService(),
+        )
+        session = await sessions.create_session(
+            app_name="app", user_id="u", state={"media_plan": plan, **(state or {})}
+        )
+        events = [
+            event
+            async for event in runner.run_async(
+                user_id="u",
+                session_id=session.id,
+                new_message=types.Content(role="user", parts=[types.Part(text="go")]),
+            )
+        ]
+        finished = await sessions.get_session(
+            app_name="app", user_id="u", session_id=session.id
+        )
+        assert finished is not None
+        return finished.state["multimedia_assets"], events, session.id
+
+    return asyncio.run(run())
+
+
+@pytest.fixture
+def fake_backends(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(
+        "app.utils.workspace._workspace_manager",
+        WorkspaceManager(str(tmp_path / "workspaces")),
+    )
+    config = FakeBackendConfig(image_width=64, image_height=36, words_per_second=20)
+    monkeypatch.setattr("app.utils.backends._image_model", FakeImageModel(config))
+    monkeypatch.setattr("app.utils.backends._tts_client", FakeTtsClient(config))
+
+
+def test_assets_generated_from_plan(tmp_path: Path, fake_backends: None) -> None:
+    """Every planned section gets an image and a voiceover, in plan order."""
+    assets, events, _ = _run_agent(
+        AssetProducerAgent(name="multimedia_producer_agent", prerender=False), _plan(3)
+    )
+    assert [s["heading"] for s in assets["sections"]] == ["Part 0", "Part 1", "Part 2"]
+    assert all(os.path.exists(p) for p in assets["image_paths"] + assets["audio_paths"])
+    # Written to the run's workspace, not the working directory.
+    workspaces = tmp_path / "workspaces"
+    assert all(
+        p.startswith(str(workspaces))
+        for p in assets["image_paths"] + assets["audio_paths"]
+    )
+    # An image, its thumbnail and a voiceover per section.
+    assert len(events[-1].actions.artifact_delta) == 9
+
+
+def test_failed_image_skips_its_section(
+    monkeypatch: pytest.MonkeyPatch, fake_backends: None
+) -> None:
+    """An Imagen error drops its section instead of failing the job."""
+    model = FakeImageModel(FakeBackendConfig(image_width=64, image_height=36))
+
+    def generate_images(prompt: str, **kwargs: Any) -> list:
+        if prompt == "Scene 1":
+            raise RuntimeError("Imagen quota exceeded")
+        return FakeImageModel.generate_images(model, prompt, **kwargs)
+
+    monkeypatch.setattr(model, "generate_images", generate_images)
+    monkeypatch.setattr("app.utils.backends._image_model", model)
+    assets, _, _ = _run_agent(
+        AssetProducerAgent(name="multimedia_producer_agent", prerender=False), _plan(3)
+    )
+    assert [s["heading"] for s in assets["sections"]] == ["Part 0", "Part 2"]
+
+
+def test_segments_prerendered_as_sections_complete(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, fake_backends: None
+) -> None:
+    """Each section's segment is cached and published to the progressive preview."""
+    cache = SegmentCache(str(tmp_path / "segments"))
+    pool = RenderPool(workers=1, threads_per_render=1)
+    artifacts = InMemoryArtifactService()
+    monkeypatch.setattr("app.utils.segment_cache._segment_cache", cache)
+    monkeypatch.setattr("app.utils.render_pool._render_pool", pool)
+    model = FakeImageModel(FakeBackendConfig(image_width=64, image_height=36))
+    admitted_while_generating = []
+
+    def generate_images(prompt: str, **kwargs: Any) -> list:
+        admitted_while_generating.append(pool.in_flight)
+        return FakeImageModel.generate_images(model, prompt, **kwargs)
+
+    monkeypatch.setattr(model, "generate_images", generate_images)
+    monkeypatch.setattr("app.utils.backends._image_model", model)
+    try:
+        assets, events, session_id = _run_agent(
+            AssetProducerAgent(
+                name="multimedia_producer_agent", prerender=True, preview=True
+            ),
+            _plan(2),
+            artifacts,
+        )
+    finally:
+        pool.shutdown()
+    # Prerenders take no render admissions, let alone while images are generated.
+    assert admitted_while_generating == [0, 0]
+    assert pool.in_flight == 0
+    # Cached under the key the video tool looks up, so it only has to concat.
+    for image, audio in zip(assets["image_paths"], assets["audio_paths"], strict=True):
+        assert (
+            cache.get(cache.key(image, audio, (64, 36), get_encoding_profile()))
+            is not None
+        )
+
+    updates = [
+        e.actions.state_delta["preview_sections"]
+        for e in events
+        if "preview_sections" in e.actions.state_delta
+    ]
+    assert updates and updates[-1] == 2
+
+    async def load(filename: str) -> bytes:
+        part = await artifacts.load_artifact(
+            app_name="app", user_id="u", session_id=session_id, filename=filename
+        )
+        assert part is not None and part.inline_data is not None
+        return part.inline_data.data or b""
+
+    playlist = asyncio.run(load(PREVIEW_PLAYLIST)).decode()
+    assert playlist.count("#EXTINF:") == 2
+    assert "#EXT-X-TARGETDURATION:2\n" in playlist
+    assert playlist.rstrip().endswith("#EXT-X-ENDLIST")
+    segment = asyncio.run(load(segment_name(1)))
+    # MPEG-TS packets are 188 bytes, each starting with a 0x47 sync byte.
+    assert segment[0] == segment[188] == 0x47
+
+
+def test_every_section_prerendered_beyond_pool_capacity(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, fake_backends: None
+) -> None:
+    """Prerenders wait for a worker instead of being rejected by a busy pool."""
+    cache = SegmentCache(str(tmp_path / "segments"))
+    pool = RenderPool(workers=1, threads_per_render=1, max_queued=0)
+    monkeypatch.setattr("app.utils.segment_cache._segment_cache", cache)
+    monkeypatch.setattr("app.utils.render_pool._render_pool", pool)
+    try:
+        assets, _, _ = _run_agent(
+            AssetProducerAgent(
+                name="multimedia_producer_agent", prerender=True, preview=False
+            ),
+            _plan(pool.capacity + 3),
+        )
+    finally:
+        pool.shutdown()
+    assert len(assets["sections"]) == pool.capacity + 3
+    for image, audio in zip(assets["image_paths"], assets["audio_paths"], strict=True):
+        key = cache.key(image, audio, (64, 36), get_encoding_profile())
+        assert cache.get(key) is not None
+
+
+def test_preview_completed_when_a_prerender_fails(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, fake_backends: None
+) -> None:
+    """A section whose prerender fails is left out of the preview, which still ends."""
+    pool = RenderPool(workers=1, threads_per_render=1)
+    artifacts = InMemoryArtifactService()
+    monkeypatch.setattr(
+        "app.utils.segment_cache._segment_cache",
+        SegmentCache(str(tmp_path / "segments")),
+    )
+    monkeypatch.setattr("app.utils.render_pool._render_pool", pool)
+    failures: list[Any] = []
+
+    async def prerender_segment(*args: Any, **kwargs: Any) -> dict[str, str]:
+        if not failures:
+            failures.append(args[0])
+            raise RenderPoolSaturated("no worker")
+        return await multimedia.prerender_segment(*args, **kwargs)
+
+    monkeypatch.setattr("app.agents.assets.prerender_segment", prerender_segment)
+    try:
+        _, _, session_id = _run_agent(
+            AssetProducerAgent(
+                name="multimedia_producer_agent", prerender=True, preview=True
+            ),
+            _plan(3),
+            artifacts,
+        )
+    finally:
+        pool.shutdown()
+
+    playlist = asyncio.run(
+        artifacts.load_artifact(
+            app_name="app",
+            user_id="u",
+            session_id=session_id,
+            filename=PREVIEW_PLAYLIST,
+        )
+    )
+    assert playlist is not None and playlist.inline_data is not None
+    text = (playlist.inline_data.data or b"").decode()
+    assert text.count("#EXTINF:") == 2
+    assert text.rstrip().endswith("#EXT-X-ENDLIST")
+
+
+def test_preview_target_duration_fixed() -> None:
+    """The playlist's target duration does not follow the segments published so far."""
+    target = target_duration(["one two three four five", "one two"])
+    assert target == 3
+    playlists = [
+        hls_playlist([0.5, 2.6][:n], target, complete=n == 2) for n in range(3)
+    ]
+    assert all("#EXT-X-TARGETDURATION:3\n" in p for p in playlists)
+
+
+def test_unused_speculative_images_deleted(
+    monkeypatch: pytest.MonkeyPatch, fake_backends: None
+) -> None:
+    """Failed speculation is skipped, and only reused speculative images stay artifacts."""
+    model = FakeImageModel(FakeBackendConfig(image_width=64, image_height=36))
+
+    def generate_images(prompt: str, **kwargs: Any) -> list:
+        if prompt == "Outline 1":
+            raise RuntimeError("Imagen quota exceeded")
+        return FakeImageModel.generate_images(model, prompt, **kwargs)
+
+    monkeypatch.setattr(model, "generate_images", generate_images)
+    monkeypatch.setattr("app.utils.backends._image_model", model)
+    outline = {
+        "sections": [
+            {"heading": heading, "image_prompt": f"Outline {i}"}
+            for i, heading in enumerate(["Part 0", "Part 1", "Something else entirely"])
+        ]
+    }
+    artifacts = InMemoryArtifactService()
+    agent = SequentialAgent(
+        name="writing",
+        sub_agents=[
+            SpeculativeImageAgent(name="speculative_image_agent"),
+            AssetProducerAgent(name="multimedia_producer_agent", prerender=False),
+        ],
+    )
+    assets, events, session_id = _run_agent(
+        agent, _plan(2), artifacts, {"outline_image_plan": outline}
+    )
+
+    speculative = events[0].actions.state_delta["speculative_images"]
+    assert [i["heading"] for i in speculative] == ["Part 0", "Something else entirely"]
+    assert assets["image_paths"][0] == speculative[0]["image_path"]
+    keys = asyncio.run(
+        artifacts.list_artifact_keys(app_name="app", user_id="u", session_id=session_id)
+    )
+    # Two images with their thumbnails and two voiceovers; the unused image is gone.
+    assert len(keys) == 6
+    assert not set(speculative[1]["artifacts"]) & set(keys)
+    assert set(keys) == {f for e in events for f in e.actions.artifact_delta}
+
+
+def test_speculative_images_matched_by_heading() -> None:
+    """Each speculative image goes to the final section whose heading best matches."""
+    sections = [
+        SectionPlan(heading=h, transcript="", image_prompt="")
+        for h in ["Why Solar Power Matters", "Storage Costs", "A Brand New Section"]
+    ]
+    speculative = [
+        {"heading": "Storage costs", "image_path": "storage.png"},
+        {"heading": "Why solar power matters today", "image_path": "solar.png"},
+        {"heading": "Why solar matters", "image_path": "solar_2.png"},
+    ]
+    matches = match_speculative_images(sections, speculative)
+    assert {i: m["image_path"] for i, m in matches.items()} == {
+        0: "solar.png",
+        1: "storage.png",
+    }
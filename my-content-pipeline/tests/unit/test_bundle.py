@@ -0,0 +1,103 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import io
+import json
+import os
+import zipfile
+
+from google.adk.artifacts import InMemoryArtifactService
+from google.genai import types
+
+from app.utils.bundle import artifact_chunks, package_entries, stream_zip
+
+CHUNK = 64 * 1024
+
+
+def test_package_streamed_as_zip() -> None:
+    """A job's package is zipped chunk by chunk, media stored and text deflated."""
+    service = InMemoryArtifactService()
+    ids = {"app_name": "app", "user_id": "u1", "session_id": "s1"}
+    artifacts = {
+        "image_a.webp": (os.urandom(100_000), "image/webp"),
+        "image_a_thumb.webp": (b"thumb", "image/webp"),
+        "audio_a.mp3": (os.urandom(50_000), "audio/mpeg"),
+        "video_high_b.mp4": (os.urandom(300_000), "video/mp4"),
+        "image_c.webp": (b"unused image", "image/webp"),
+    }
+    state = {
+        "draft_article": "<h1>Tides</h1><p>The moon pulls the sea.</p>",
+        "multimedia_assets": {
+            "sections": [
+                {
+                    "heading": "Pull",
+                    "transcript": "The moon pulls the sea.",
+                    "image_prompt": "A full moon over the ocean",
+                    "image_path": "/w/images/image_a.png",
+                    "audio_path": "/w/audio/audio_a.mp3",
+                }
+            ]
+        },
+    }
+
+    async def run() -> list[bytes]:
+        for name, (data, mime_type) in artifacts.items():
+            await service.save_artifact(
+                **ids,
+                filename=name,
+                artifact=types.Part.from_bytes(data=data, mime_type=mime_type),
+            )
+        entries = package_entries(
+            state,
+            list(artifacts),
+            lambda name: artifact_chunks(
+                service, **ids, filename=name, chunk_size=CHUNK
+            ),
+            job={"job_id": "j1"},
+        )
+        return [piece async for piece in stream_zip(entries)]
+
+    pieces = asyncio.run(run())
+    # Nothing is buffered beyond one chunk and its headers.
+    assert max(len(p) for p in pieces) < CHUNK + 1024
+
+    with zipfile.ZipFile(io.BytesIO(b"".join(pieces))) as archive:
+        assert archive.testzip() is None
+        infos = {i.filename: i for i in archive.infolist()}
+        assert list(infos) == [
+            "article.md",
+            "manifest.json",
+            "scenes/01/image.webp",
+            "scenes/01/voiceover.mp3",
+            "scenes/01/transcript.txt",
+            "scenes/01/prompt.txt",
+            "video/video_high_b.mp4",
+            "images/image_c.webp",
+        ]
+        assert archive.read("scenes/01/image.webp") == artifacts["image_a.webp"][0]
+        assert (
+            archive.read("video/video_high_b.mp4") == artifacts["video_high_b.mp4"][0]
+        )
+        assert infos["video/video_high_b.mp4"].compress_type == zipfile.ZIP_STORED
+        assert infos["article.md"].compress_type == zipfile.ZIP_DEFLATED
+        article = archive.read("article.md").decode()
+        assert "The moon pulls the sea." in article
+        assert "![Image](scenes/01/image.webp)" in article
+        manifest = json.loads(archive.read("manifest.json"))
+        assert manifest["job_id"] == "j1"
+        assert (
+            manifest["sections"][0]["files"]["voiceover"] == "scenes/01/voiceover.mp3"
+        )
+        assert manifest["videos"] == ["video/video_high_b.mp4"]
@@ -0,0 +1,80 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from google.genai import types
+
+from app.utils.context import compact_contents, estimate_tokens
+
+
+def _contents(page: str) -> list[types.Content]:
+    return [
+        types.Content(role="user", parts=[types.Part(text="Write about tides.")]),
+        types.Content(
+            role="user",
+            parts=[
+                types.Part(text="For context:"),
+                types.Part(
+                    text=f"[url_extraction_agent] `extract_content_from_url` tool returned result: {page}"
+                ),
+                types.Part(
+                    text="[analysis_agent] said: Themes are moon, gravity, coast."
+                ),
+            ],
+        ),
+        types.Content(role="model", parts=[types.Part(text="  own   turn  ")]),
+    ]
+
+
+def _texts(contents: list[types.Content]) -> list[list[str]]:
+    return [[part.text or "" for part in content.parts or []] for content in contents]
+
+
+def test_whitespace_collapsed_without_budget() -> None:
+    """Unbudgeted stages only lose whitespace, and their own turns are kept."""
+    contents = _contents("tide\n\n\n      " * 100)
+    result = compact_contents(contents, budget_tokens=None)
+    texts = _texts(contents)
+    extraction = texts[1][1]
+    assert "\n" not in extraction and "  " not in extraction
+    assert texts[2][0] == "  own   turn  "
+    assert result.tokens_saved > 0
+    assert not result.originals
+
+
+def test_oldest_bulky_parts_summarised_to_budget() -> None:
+    """Over budget, bulky parts become a head plus an artifact reference."""
+    page = "The moon pulls the ocean. " * 400
+    contents = _contents(page)
+    result = compact_contents(contents, budget_tokens=500)
+    texts = _texts(contents)
+    extraction = texts[1][1]
+    ((filename, original),) = result.originals.items()
+    assert filename in extraction
+    assert page.strip() in original
+    assert texts[1][2].endswith("coast.")
+    total = sum(estimate_tokens(text) for content in texts for text in content)
+    assert total <= 500
+    assert result.tokens_before - result.tokens_saved == total
+
+
+def test_previous_stage_output_kept_whole() -> None:
+    """The most recent stage's output is never summarised, even over budget."""
+    contents = _contents("short page")
+    assets = "[analysis_agent] said: " + "generated_images/image_1.png " * 200
+    parts = contents[1].parts
+    assert parts is not None
+    parts[2].text = assets
+    result = compact_contents(contents, budget_tokens=10)
+    assert _texts(contents)[1][2] == assets
+    assert not result.originals
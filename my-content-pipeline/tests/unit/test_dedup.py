@@ -0,0 +1,80 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import random
+
+from app.utils.dedup import deduplicate_sources
+
+BOILERPLATE = "Home | News | About\nWe use cookies. Subscribe to our newsletter."
+
+
+def _article(seed: int, paragraphs: int = 10) -> list[str]:
+    rng = random.Random(seed)
+    words = [f"w{i}" for i in range(500)]
+    return [" ".join(rng.choice(words) for _ in range(60)) for _ in range(paragraphs)]
+
+
+def test_syndicated_copy_dropped_as_duplicate() -> None:
+    """A lightly edited copy is dropped in favour of the earlier source."""
+    original = _article(1)
+    copy = [*original[:-1], " ".join(_article(2, 1))]
+    result = deduplicate_sources(
+        {
+            "a": "\n".join([BOILERPLATE, *original]),
+            "b": "\n".join([BOILERPLATE, *copy]),
+            "c": "\n".join([BOILERPLATE, *_article(3)]),
+        }
+    )
+    assert list(result.kept) == ["a", "c"]
+    assert result.dropped == {"b": "a"}
+    assert "cookies" in result.kept["a"] and "cookies" not in result.kept["c"]
+    assert result.bytes_dropped > 0
+    assert result.tokens_dropped == result.bytes_dropped // 4
+
+
+def test_boilerplate_only_page_dropped() -> None:
+    """A page that is nothing but shared boilerplate is dropped."""
+    result = deduplicate_sources(
+        {
+            "a": "\n".join([BOILERPLATE, *_article(1)]),
+            "b": BOILERPLATE + "\nSorry, page not found.",
+        }
+    )
+    assert list(result.kept) == ["a"]
+    assert result.dropped == {"b": None}
+
+
+def test_distinct_articles_sharing_boilerplate_kept() -> None:
+    """Two articles of one site are both kept, however much boilerplate they share."""
+    site = "\n".join(
+        [
+            f"Section {i} | Latest {i} | Topics {i} | Video {i} | Podcasts {i}"
+            for i in range(80)
+        ]
+        + [
+            "We use cookies to improve your experience. By continuing you accept our policy."
+        ]
+        + [
+            f"Footer link {i}: Privacy, Terms, Careers, Advertise, Contact, Help"
+            for i in range(40)
+        ]
+    )
+    result = deduplicate_sources(
+        {
+            "a": "\n".join([site, *_article(1, paragraphs=1)]),
+            "b": "\n".join([site, *_article(2, paragraphs=1)]),
+        }
+    )
+    assert list(result.kept) == ["a", "b"]
+    assert "Footer link" not in result.kept["b"]
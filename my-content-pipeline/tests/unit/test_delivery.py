@@ -0,0 +1,139 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import os
+import time
+from pathlib import Path
+from typing import Any
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+from google.adk.artifacts import InMemoryArtifactService
+from google.genai import types
+from google.oauth2 import credentials as oauth2_credentials
+
+from app.utils.delivery import (
+    LOCAL_DELIVERY_PATH,
+    DeliveryUnavailable,
+    DeliveryUrl,
+    LocalDelivery,
+    SignedUrlDelivery,
+    create_delivery,
+    delivered,
+)
+from app.utils.gcs import ContentAddressedGcsArtifactService
+
+
+def test_local_delivery_urls(tmp_path: Path) -> None:
+    """Local delivery copies artifacts out once and serves them under signed, expiring URLs."""
+    service = InMemoryArtifactService()
+    ids = {"app_name": "app", "user_id": "u1", "session_id": "s1"}
+    delivery = LocalDelivery(service, directory=str(tmp_path), ttl_s=60, secret=b"key")
+
+    async def url(filename: str) -> DeliveryUrl:
+        return await delivery.url(**ids, filename=filename)
+
+    async def save(data: bytes) -> None:
+        await service.save_artifact(
+            **ids,
+            filename="video.mp4",
+            artifact=types.Part.from_bytes(data=data, mime_type="video/mp4"),
+        )
+
+    asyncio.run(save(b"first"))
+    first = asyncio.run(url("video.mp4"))
+    parts = urlsplit(first.url)
+    assert parts.path.startswith(LOCAL_DELIVERY_PATH + "/")
+    key, filename = parts.path.split("/")[-2:]
+    query = {k: v[0] for k, v in parse_qs(parts.query).items()}
+    assert Path(delivery.resolve(key, filename, **query)).read_bytes() == b"first"
+
+    with pytest.raises(PermissionError):
+        delivery.resolve(key, filename, query["expires"], "0" * 64)
+    with pytest.raises(PermissionError):
+        delivery.resolve(
+            key, filename, str(int(query["expires"]) + 60), query["signature"]
+        )
+    expired = LocalDelivery(service, directory=str(tmp_path), ttl_s=-1, secret=b"key")
+    stale = urlsplit(asyncio.run(expired.url(**ids, filename="video.mp4")).url)
+    with pytest.raises(PermissionError):
+        delivery.resolve(
+            key, filename, **{k: v[0] for k, v in parse_qs(stale.query).items()}
+        )
+
+    # A new version gets its own copy and URL.
+    asyncio.run(save(b"second"))
+    second = urlsplit(asyncio.run(url("video.mp4")).url)
+    key = second.path.split("/")[-2]
+    query = {k: v[0] for k, v in parse_qs(second.query).items()}
+    assert Path(delivery.resolve(key, filename, **query)).read_bytes() == b"second"
+
+    with pytest.raises(FileNotFoundError):
+        asyncio.run(url("missing.mp4"))
+
+    # Copies are deleted once their last URL has expired.
+    stale_time = time.time() - 120
+    os.utime(tmp_path / key, (stale_time, stale_time))
+    assert delivery.prune() == 1
+    assert not (tmp_path / key).exists()
+    assert delivery.prune() == 0
+
+
+def test_signed_delivery_unavailable_with_user_credentials(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """User credentials cannot sign, so signed delivery gives way to proxying."""
+    lookups = []
+
+    class Blob:
+        name = "app/u1/s1/video.mp4/0"
+
+    async def latest_artifact_blob(*args: Any, **kwargs: Any) -> Blob:
+        lookups.append(kwargs["filename"])
+        return Blob()
+
+    class Client:
+        _credentials = oauth2_credentials.Credentials(token="token")
+
+    monkeypatch.setattr("app.utils.delivery.latest_artifact_blob", latest_artifact_blob)
+    service = ContentAddressedGcsArtifactService("bucket")
+    service.storage_client = Client()
+    delivery = SignedUrlDelivery(service)
+    ids = {
+        "app_name": "app",
+        "user_id": "u1",
+        "session_id": "s1",
+        "filename": "video.mp4",
+    }
+    for _ in range(2):
+        with pytest.raises(DeliveryUnavailable, match="service account"):
+            asyncio.run(delivery.url(**ids))
+    # Found out once; later downloads do not look the blob up again.
+    assert lookups == ["video.mp4"]
+
+
+def test_delivery_modes() -> None:
+    """Media is delivered by URL; playlists and unknown modes are not."""
+    assert (
+        delivered("video_high_1.mp4")
+        and delivered("image_1.webp")
+        and delivered("audio_1.mp3")
+    )
+    assert not delivered("preview.m3u8")
+    assert create_delivery(InMemoryArtifactService(), "proxy") is None
+    with pytest.raises(ValueError):
+        create_delivery(InMemoryArtifactService(), "signed")
+    with pytest.raises(ValueError):
+        create_delivery(InMemoryArtifactService(), "cdn")
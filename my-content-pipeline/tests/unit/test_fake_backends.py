@@ -0,0 +1,38 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import io
+
+import pytest
+from PIL import Image
+
+from app.utils.fake_backends import FakeBackendConfig, FakeImageModel
+
+
+def test_config_from_env(monkeypatch: pytest.MonkeyPatch) -> None:
+    """FAKE_* variables override the defaults with the right types."""
+    monkeypatch.setenv("FAKE_SECTIONS", "12")
+    monkeypatch.setenv("FAKE_LLM_LATENCY_S", "0.5")
+    config = FakeBackendConfig.from_env()
+    assert config.sections == 12
+    assert config.llm_latency_s == 0.5
+
+
+def test_fake_image_is_deterministic() -> None:
+    """The same prompt yields the same PNG at the configured size."""
+    model = FakeImageModel(FakeBackendConfig(image_width=64, image_height=36))
+    first = model.generate_images(prompt="a cat")[0]._image_bytes
+    second = model.generate_images(prompt="a cat")[0]._image_bytes
+    assert first == second
+    assert Image.open(io.BytesIO(first)).size == (64, 36)
@@ -0,0 +1,216 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import inspect
+from typing import Any
+
+import pytest
+from google.adk.artifacts import GcsArtifactService
+from google.api_core import exceptions
+from google.genai import types
+
+from app.utils.gcs import CONTENT_PREFIX, ContentAddressedGcsArtifactService
+
+IDS = {"app_name": "app", "user_id": "u1", "session_id": "s1"}
+
+
+class FakeBlob:
+    """The part of storage.Blob the artifact service uses, kept in a dict."""
+
+    def __init__(self, bucket: "FakeBucket", name: str) -> None:
+        self.bucket = bucket
+        self.name = name
+        self.metadata: dict[str, str] | None = None
+        self.content_type: str | None = None
+        self.metageneration: int | None = None
+
+    def upload_from_string(
+        self,
+        data: bytes,
+        content_type: str | None = None,
+        if_generation_match: int | None = None,
+    ) -> None:
+        if if_generation_match == 0 and self.name in self.bucket.objects:
+            raise exceptions.PreconditionFailed(self.name)
+        self.bucket.uploads += 1
+        self.bucket.objects[self.name] = {
+            "data": data,
+            "content_type": content_type,
+            "metadata": self.metadata,
+            "metageneration": 1,
+        }
+
+    def patch(self) -> None:
+        if self.name not in self.bucket.objects:
+            raise exceptions.NotFound(self.name)
+        stored = self.bucket.objects[self.name]
+        stored["metadata"] = self.metadata
+        stored["metageneration"] += 1
+
+    def delete(self, if_metageneration_match: int | None = None) -> None:
+        stored = self.bucket.objects.get(self.name)
+        if stored is None:
+            raise exceptions.NotFound(self.name)
+        if if_metageneration_match not in (None, stored["metageneration"]):
+            raise exceptions.PreconditionFailed(self.name)
+        del self.bucket.objects[self.name]
+
+    def download_as_bytes(self) -> bytes:
+        if self.name not in self.bucket.objects:
+            raise exceptions.NotFound(self.name)
+        return self.bucket.objects[self.name]["data"]
+
+
+class FakeBucket:
+    def __init__(self) -> None:
+        self.objects: dict[str, dict[str, Any]] = {}
+        self.uploads = 0
+
+    def blob(self, name: str) -> FakeBlob:
+        return FakeBlob(self, name)
+
+    def get_blob(self, name: str) -> FakeBlob | None:
+        if name not in self.objects:
+            return None
+        blob = FakeBlob(self, name)
+        stored = self.objects[name]
+        blob.metadata = stored["metadata"]
+        blob.content_type = stored["content_type"]
+        blob.metageneration = stored["metageneration"]
+        return blob
+
+
+class FakeClient:
+    def list_blobs(
+        self, bucket: FakeBucket, prefix: str = "", max_results: int | None = None
+    ) -> list[FakeBlob]:
+        names = sorted(n for n in bucket.objects if n.startswith(prefix))
+        return [bucket.get_blob(n) for n in names[:max_results]]
+
+
+def fake_service() -> ContentAddressedGcsArtifactService:
+    service = ContentAddressedGcsArtifactService("bucket")
+    service.storage_client = FakeClient()
+    service.bucket = FakeBucket()
+    return service
+
+
+def test_contents_stored_once_and_deleted_with_last_reference() -> None:
+    """Equal bytes are uploaded once, and their content goes with the last reference."""
+    service = fake_service()
+    bucket = service.bucket
+    other = {**IDS, "session_id": "s2"}
+    video = b"video" * 100
+
+    def contents() -> list[str]:
+        return [
+            n
+            for n in bucket.objects
+            if n.startswith(CONTENT_PREFIX) and "/refs/" not in n
+        ]
+
+    async def save(ids: dict, name: str, part: types.Part) -> int:
+        return await service.save_artifact(**ids, filename=name, artifact=part)
+
+    async def load(ids: dict[str, str], name: str) -> types.Part:
+        part = await service.load_artifact(
+            app_name=ids["app_name"],
+            user_id=ids["user_id"],
+            session_id=ids["session_id"],
+            filename=name,
+        )
+        assert part is not None
+        return part
+
+    async def run() -> None:
+        part = types.Part.from_bytes(data=video, mime_type="video/mp4")
+        assert await save(IDS, "video.mp4", part) == 0
+        assert await save(IDS, "video.mp4", part) == 1
+        await save(
+            other,
+            "copy.bin",
+            types.Part.from_bytes(data=video, mime_type="application/octet-stream"),
+        )
+        await save(IDS, "notes", types.Part(text="some notes"))
+        assert len(contents()) == 2
+
+        loaded = (await load(other, "copy.bin")).inline_data
+        assert loaded is not None
+        assert (loaded.data, loaded.mime_type) == (video, "application/octet-stream")
+        assert (await load(IDS, "notes")).text == "some notes"
+
+        await service.delete_artifact(**IDS, filename="video.mp4")
+        assert len(contents()) == 2
+        assert (await load(other, "copy.bin")).inline_data == loaded
+        await service.delete_artifact(**other, filename="copy.bin")
+        await service.delete_artifact(**IDS, filename="notes")
+        assert bucket.objects == {}
+
+    asyncio.run(run())
+
+
+def test_stored_content_not_uploaded_again() -> None:
+    """Saving bytes that are already stored only writes the reference."""
+    service = fake_service()
+    part = types.Part.from_bytes(data=b"image", mime_type="image/png")
+
+    async def run() -> None:
+        await service.save_artifact(**IDS, filename="a.png", artifact=part)
+        uploads = service.bucket.uploads
+        await service.save_artifact(**IDS, filename="b.png", artifact=part)
+        # The marker and the reference, not the content.
+        assert service.bucket.uploads == uploads + 2
+
+    asyncio.run(run())
+
+
+def test_reused_private_helpers_keep_their_signatures() -> None:
+    """GcsArtifactService still names and lists versions as the service expects."""
+    assert list(inspect.signature(GcsArtifactService._get_blob_name).parameters) == [
+        "self",
+        "app_name",
+        "user_id",
+        "session_id",
+        "filename",
+        "version",
+    ]
+    assert list(inspect.signature(GcsArtifactService._list_versions).parameters) == [
+        "self",
+        "app_name",
+        "user_id",
+        "session_id",
+        "filename",
+    ]
+    service = GcsArtifactService.__new__(GcsArtifactService)
+    assert service._get_blob_name("app", "u1", "s1", "a.png", 3) == "app/u1/s1/a.png/3"
+
+
+def test_client_created_on_first_use(monkeypatch: pytest.MonkeyPatch) -> None:
+    """The storage client and bucket name are only resolved when first used."""
+    clients: list[dict[str, Any]] = []
+
+    class Client:
+        def __init__(self, **kwargs: Any) -> None:
+            clients.append(kwargs)
+
+        def bucket(self, name: str) -> str:
+            return name
+
+    monkeypatch.setattr("google.cloud.storage.Client", Client)
+    service = ContentAddressedGcsArtifactService(lambda: "lazy", project="p")
+    assert clients == []
+    assert service.bucket == "lazy"
+    assert service.bucket_name == "lazy"
+    assert clients == [{"project": "p"}]
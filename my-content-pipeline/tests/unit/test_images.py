@@ -0,0 +1,50 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import io
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from app.utils.fake_backends import FakeBackendConfig, FakeImageModel
+from app.utils.images import DELIVERY_FORMAT, THUMBNAIL_WIDTH, normalize_image
+from app.utils.video import ENCODING_PROFILES, load_frame
+
+
+def test_variants_from_one_decode(tmp_path: Path) -> None:
+    """The render frame matches what a render would resize to; copies are smaller."""
+    model = FakeImageModel(FakeBackendConfig(image_width=1280, image_height=720))
+    source = model.generate_images(prompt="x")[0]._image_bytes
+    image_path = tmp_path / "image.png"
+    image_path.write_bytes(source)
+
+    draft = normalize_image(source, ENCODING_PROFILES["draft"])
+    assert draft.size == (1280, 720)
+    assert draft.frame_size == (640, 360)
+    assert draft.frame is not None
+    frame_path = tmp_path / "frame.png"
+    frame_path.write_bytes(draft.frame)
+    assert np.array_equal(
+        load_frame(str(frame_path), (640, 360)), load_frame(str(image_path), (640, 360))
+    )
+
+    with Image.open(io.BytesIO(draft.delivery)) as delivery:
+        assert (delivery.format, delivery.size) == (DELIVERY_FORMAT, (1280, 720))
+    with Image.open(io.BytesIO(draft.thumbnail)) as thumbnail:
+        assert thumbnail.size == (THUMBNAIL_WIDTH, THUMBNAIL_WIDTH * 720 // 1280)
+    assert len(draft.delivery) < len(source)
+
+    # Profiles that keep the images' size need no separate frame.
+    assert normalize_image(source, ENCODING_PROFILES["standard"]).frame is None
@@ -0,0 +1,189 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import io
+import os
+import zipfile
+from collections.abc import AsyncGenerator
+from pathlib import Path
+
+import pytest
+from google.adk.agents import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.artifacts import InMemoryArtifactService
+from google.adk.events import Event
+from google.adk.tools import ToolContext
+from google.genai import types
+
+from app.jobs import JobManager
+from app.utils.typing import JobRequest
+from app.utils.video import EncodingProfile
+from app.utils.workspace import Workspace, WorkspaceManager, get_workspace
+
+
+class _ArtifactAgent(BaseAgent):
+    """Saves one artifact named after the job and finishes, or fails if asked to."""
+
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        tool_context = ToolContext(ctx)
+        job_id = ctx.session.state["job_id"]
+        workspace = get_workspace(tool_context)
+        image_path = workspace.write_bytes("images", "image.png", b"png")
+        audio_path = workspace.write_bytes("audio", "audio.mp3", b"mp3")
+        if ctx.user_content and ctx.user_content.parts == [types.Part(text="fail")]:
+            raise RuntimeError("pipeline failed")
+        await tool_context.save_artifact(
+            f"video_{job_id}.mp4",
+            types.Part.from_bytes(data=b"mp4", mime_type="video/mp4"),
+        )
+        tool_context.state["multimedia_assets"] = {
+            "image_paths": [image_path],
+            "audio_paths": [audio_path],
+        }
+        yield Event(
+            author=self.name,
+            invocation_id=ctx.invocation_id,
+            actions=tool_context.actions,
+        )
+
+
+@pytest.fixture
+def workspaces(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> WorkspaceManager:
+    manager = WorkspaceManager(str(tmp_path / "workspaces"))
+    monkeypatch.setattr("app.utils.workspace._workspace_manager", manager)
+    return manager
+
+
+def test_job_lifecycle(workspaces: WorkspaceManager) -> None:
+    """A submitted job runs to completion and exposes its artifacts."""
+
+    async def run() -> None:
+        manager = JobManager(
+            agent=_ArtifactAgent(name="pipeline"),
+            artifact_service=InMemoryArtifactService(),
+        )
+        job = await manager.submit(JobRequest(topic="tides", user_id="u1"))
+        assert job.status in ("queued", "running")
+        await asyncio.wait_for(asyncio.gather(*manager._tasks.values()), timeout=10)
+
+        finished = manager.get(job.job_id)
+        assert finished is not None
+        job = finished
+        assert job.status == "succeeded"
+        assert job.stage == "pipeline"
+        assert job.artifacts == [f"video_{job.job_id}.mp4"]
+        part = await manager.load_artifact(job, job.artifacts[0])
+        assert part is not None and part.inline_data is not None
+        assert part.inline_data.data == b"mp4"
+        # Assets are kept for the final render.
+        assert workspaces.exists(job.job_id)
+        archive = b"".join([piece async for piece in await manager.bundle(job)])
+        with zipfile.ZipFile(io.BytesIO(archive)) as bundle:
+            assert bundle.read(f"video/video_{job.job_id}.mp4") == b"mp4"
+
+        failed = await manager.submit(JobRequest(topic="fail", user_id="u1"))
+        await asyncio.wait_for(asyncio.gather(*manager._tasks.values()), timeout=10)
+        assert failed.status == "failed"
+        assert not workspaces.exists(failed.job_id)
+        with pytest.raises(ValueError):
+            await manager.bundle(failed)
+
+    asyncio.run(run())
+
+
+def test_draft_approval_renders_final_video(
+    monkeypatch: pytest.MonkeyPatch, workspaces: WorkspaceManager
+) -> None:
+    """Approving a draft job renders the final video from the job's assets."""
+    rendered = []
+
+    async def render(
+        image_paths: list[str],
+        audio_paths: list[str],
+        profile: EncodingProfile,
+        workspace: Workspace,
+        renditions: list[str],
+    ) -> dict[str, str]:
+        rendered.append(
+            ([os.path.basename(p) for p in image_paths], profile.name, renditions)
+        )
+        paths = {}
+        for rendition in renditions:
+            data = f"final {rendition}".encode()
+            paths[rendition] = workspace.write_bytes(
+                "videos", f"{rendition[0]}.mp4", data
+            )
+        return paths
+
+    monkeypatch.setattr("app.jobs.render_video_files", render)
+
+    async def run() -> None:
+        manager = JobManager(
+            agent=_ArtifactAgent(name="pipeline"),
+            artifact_service=InMemoryArtifactService(),
+        )
+        job = await manager.submit(
+            JobRequest(
+                topic="tides",
+                user_id="u1",
+                profile="draft",
+                renditions=["9:16", "16:9"],
+            )
+        )
+        assert job.profile == "draft"
+        with pytest.raises(ValueError):
+            await manager.approve(job, "high")
+        await asyncio.wait_for(asyncio.gather(*manager._tasks.values()), timeout=10)
+
+        approved = await manager.approve(job, "high")
+        assert approved is job and approved.final_render == "running"
+        await asyncio.wait_for(asyncio.gather(*manager._tasks.values()), timeout=10)
+        assert rendered == [(["image.png"], "high", ["9:16", "16:9"])]
+        assert job.final_render == "succeeded"
+        assert job.final_video in job.artifacts
+        assert any(a.startswith("video_high_9x16_") for a in job.artifacts)
+        part = await manager.load_artifact(job, job.final_video)
+        assert part is not None and part.inline_data is not None
+        assert part.inline_data.data == b"final 16:9"
+        # The approved job is done with its local files.
+        assert not workspaces.exists(job.job_id)
+        with pytest.raises(ValueError):
+            await manager.approve(job, "standard")
+
+    asyncio.run(run())
+
+
+def test_unapproved_job_workspace_released(workspaces: WorkspaceManager) -> None:
+    """A succeeded job that is not approved in time gives up its workspace."""
+
+    async def run() -> None:
+        manager = JobManager(
+            agent=_ArtifactAgent(name="pipeline"),
+            artifact_service=InMemoryArtifactService(),
+            approval_window_s=0,
+        )
+        job = await manager.submit(
+            JobRequest(topic="tides", user_id="u1", profile="draft")
+        )
+        await asyncio.wait_for(asyncio.gather(*manager._tasks.values()), timeout=10)
+        await asyncio.sleep(0)
+        assert job.status == "succeeded"
+        assert not workspaces.exists(job.job_id)
+        with pytest.raises(ValueError, match="no longer available"):
+            await manager.approve(job, "high")
+
+    asyncio.run(run())
@@ -0,0 +1,104 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from app.utils.fake_backends import _tone_mp3
+from app.utils.loudness import (
+    CEILING,
+    SAMPLE_RATE,
+    decode_pcm,
+    integrated_loudness,
+    join_voiceover,
+    limit,
+    normalize_loudness,
+)
+from app.utils.media_probe import audio_duration
+
+
+def test_sections_normalized_to_one_loudness() -> None:
+    """Buffers at different levels come out at the target, peaks under the ceiling."""
+    t = np.arange(SAMPLE_RATE * 3) / SAMPLE_RATE
+    # BS.1770 reference: a 997 Hz sine with -20 dBFS peaks measures -23 LUFS.
+    reference = (0.1 * np.sin(2 * np.pi * 997 * t)).astype(np.float32)
+    assert integrated_loudness([reference])[0] == pytest.approx(-23.0, abs=0.1)
+
+    rng = np.random.default_rng(0)
+    quiet = (0.03 * rng.standard_normal(SAMPLE_RATE * 2)).astype(np.float32)
+    loud = np.clip(0.5 * rng.standard_normal(SAMPLE_RATE), -1, 1).astype(np.float32)
+    silent = np.zeros(SAMPLE_RATE // 10, dtype=np.float32)
+    normalized, gains = normalize_loudness(
+        [reference, quiet, loud, silent], target_lufs=-16
+    )
+
+    assert [len(b) for b in normalized] == [
+        len(reference),
+        len(quiet),
+        len(loud),
+        len(silent),
+    ]
+    assert gains[3] == 0
+    assert not normalized[3].any()
+    loudness = integrated_loudness(normalized[:3])
+    # The loud buffer only gets as far as the limiter lets it.
+    assert loudness[:2] == pytest.approx([-16, -16], abs=0.5)
+    assert max(np.abs(b).max() for b in normalized) <= CEILING
+
+
+def test_limiter_catches_intersample_peaks() -> None:
+    """Peaks between samples are limited, and quiet passages are left alone."""
+    # A sine at a quarter of the sample rate, sampled 45 degrees off its
+    # peaks: every sample is at 0.71 but the waveform reaches 1.0.
+    n = np.arange(SAMPLE_RATE // 2)
+    loud = np.sin(np.pi / 2 * n + np.pi / 4).astype(np.float32)
+    quiet = np.zeros(SAMPLE_RATE, dtype=np.float32)
+    quiet[: len(n)] = 0.5 * loud
+    batch = limit(np.stack([np.concatenate([loud, loud]), quiet]))
+
+    # The true peak of a periodic buffer, measured by FFT interpolation.
+    upsampled = np.fft.irfft(np.fft.rfft(batch[0]), n=8 * batch.shape[1]) * 8
+    assert np.abs(upsampled).max() <= CEILING * 10 ** (0.1 / 20)
+    assert np.abs(batch[0]).max() < 0.71 * CEILING
+    np.testing.assert_array_equal(batch[1], quiet)
+
+
+def test_voiceover_chunks_joined_at_target(tmp_path: Path) -> None:
+    """TTS chunks are joined into one MP3 at the target loudness."""
+    chunks = []
+    for i, tenths in enumerate((10, 15)):
+        chunks.append(str(tmp_path / f"chunk_{i}.mp3"))
+        Path(chunks[-1]).write_bytes(_tone_mp3(tenths))
+    output = str(tmp_path / "voiceover.mp3")
+
+    gain_db = join_voiceover(chunks, output, target_lufs=-16)
+
+    assert gain_db > 0
+    # Each MP3 chunk carries up to a frame of encoder padding.
+    assert audio_duration(output) == pytest.approx(2.5, abs=0.25)
+    assert integrated_loudness([decode_pcm([output])])[0] == pytest.approx(-16, abs=0.5)
+
+
+def test_voiceover_at_target_copied(tmp_path: Path) -> None:
+    """A single chunk already at the target loudness is not encoded again."""
+    chunk = tmp_path / "chunk.mp3"
+    chunk.write_bytes(_tone_mp3(20))
+    at_target = str(tmp_path / "at_target.mp3")
+    join_voiceover([str(chunk)], at_target, target_lufs=-16)
+
+    output = str(tmp_path / "voiceover.mp3")
+    assert join_voiceover([at_target], output, target_lufs=-16) == 0.0
+    assert Path(output).read_bytes() == Path(at_target).read_bytes()
@@ -0,0 +1,135 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import inspect
+import subprocess
+import sys
+from collections.abc import AsyncGenerator
+from typing import cast
+
+import pytest
+from google.adk.agents import BaseAgent, LlmAgent, SequentialAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event
+from google.adk.runners import InMemoryRunner
+from google.adk.tools import FunctionTool, ToolContext
+from google.genai import types
+
+from app.utils import metrics
+from app.utils.resources import PeakRssTracker
+
+
+def test_stage_span_attaches_usage_to_job() -> None:
+    """Usage reported inside a stage ends up in the job summary totals."""
+    job = metrics.JobMetrics(job_id="job-1")
+    token = metrics._current_job.set(job)
+    try:
+        with metrics.stage_span("generate_image", kind="tool"):
+            metrics.record_usage(images=1, bytes_out=100)
+            metrics.record_usage(bytes_out=50)
+    finally:
+        metrics._current_job.reset(token)
+
+    summary = job.summary()
+    assert summary["totals"] == {"images": 1, "bytes_out": 150}
+    assert summary["stages"][0]["name"] == "generate_image"
+    assert summary["stages"][0]["duration_s"] >= 0
+
+
+def test_instrumented_tool_keeps_signature_and_records_errors() -> None:
+    """ADK still sees tool_context and error results are marked as failures."""
+
+    @metrics.instrumented_tool
+    async def failing_tool(text: str, tool_context: ToolContext) -> dict:
+        """Fails."""
+        return {"status": "error", "message": "boom"}
+
+    assert "tool_context" in inspect.signature(failing_tool).parameters
+    declaration = FunctionTool(failing_tool)._get_declaration()
+    assert declaration is not None and declaration.parameters is not None
+    assert list(declaration.parameters.properties or {}) == ["text"]
+
+    job = metrics.JobMetrics(job_id="job-2")
+    token = metrics._current_job.set(job)
+    try:
+        asyncio.run(failing_tool("hi", tool_context=cast(ToolContext, None)))
+    finally:
+        metrics._current_job.reset(token)
+    assert job.stages[0].error == "boom"
+
+
+def test_instrument_pipeline_and_prometheus_output() -> None:
+    """Callbacks are attached to every stage and metrics render as text."""
+    writer = LlmAgent(name="writer", model="gemini-2.5-flash")
+    pipeline = SequentialAgent(name="pipeline", sub_agents=[writer])
+    metrics.instrument_pipeline(pipeline)
+
+    assert metrics.finish_job_callback in pipeline.canonical_after_agent_callbacks
+    assert metrics.start_stage_callback in writer.canonical_before_agent_callbacks
+    assert metrics.record_model_usage in writer.canonical_after_model_callbacks
+
+    with metrics.stage_span("render", kind="render"):
+        pass
+    text = metrics.render_prometheus()
+    assert "# TYPE pipeline_stage_duration_seconds histogram" in text
+    assert 'pipeline_stage_duration_seconds_count{kind="render",stage="render"}' in text
+
+    with metrics.stage_span('say "hi"\\\n', kind="tool"):
+        pass
+    text = metrics.render_prometheus()
+    assert 'stage="say \\"hi\\"\\\\\\n"' in text
+
+
+class _FailingAgent(BaseAgent):
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        yield Event(author=self.name, invocation_id=ctx.invocation_id)
+        raise RuntimeError("boom")
+
+
+def test_failed_run_closes_open_stages() -> None:
+    """Stages left open by an agent that raised are closed by abort_job."""
+    failing = _FailingAgent(name="failing")
+    pipeline = SequentialAgent(name="pipeline", sub_agents=[failing])
+    metrics.instrument_pipeline(pipeline)
+    runner = InMemoryRunner(agent=pipeline, app_name="app")
+
+    async def run() -> None:
+        session = await runner.session_service.create_session(
+            app_name="app", user_id="user"
+        )
+        message = types.Content(role="user", parts=[types.Part(text="go")])
+        with pytest.raises(RuntimeError):
+            async for _ in runner.run_async(
+                user_id="user", session_id=session.id, new_message=message
+            ):
+                pass
+        job = metrics._current_job.get()
+        assert job is not None
+        assert len(metrics._open_stages) == 2
+        metrics.abort_job("boom")
+        assert metrics._open_stages == {}
+        assert {stage.error for stage in job.stages} == {"boom"}
+
+    asyncio.run(run())
+
+
+def test_peak_rss_tracker_includes_child_processes() -> None:
+    """Memory held by a child process (like ffmpeg) counts toward the peak."""
+    allocate = "import time; data = bytearray(64 << 20); data[::4096] = b'x' * len(data[::4096]); time.sleep(0.5)"
+    with PeakRssTracker(interval_s=0.02) as rss:
+        subprocess.run([sys.executable, "-c", allocate], check=True)
+    assert rss.peak_bytes > 64 << 20
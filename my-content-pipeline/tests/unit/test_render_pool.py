@@ -0,0 +1,47 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import time
+
+import pytest
+
+from app.utils.render_pool import RenderPool, RenderPoolSaturated
+
+
+def test_pool_rejects_renders_beyond_capacity() -> None:
+    """With one worker and no queue, a second concurrent render is rejected."""
+    pool = RenderPool(workers=1, max_queued=0, nice=0)
+
+    async def run() -> None:
+        first = asyncio.create_task(pool.run(time.sleep, 1))
+        await asyncio.sleep(0)  # let the first render be admitted
+        assert pool.saturated
+        with pytest.raises(RenderPoolSaturated):
+            await pool.run(time.sleep, 0)
+        await first
+        assert pool.in_flight == 0
+        assert await pool.run(pow, 2, 10) == 1024
+
+    try:
+        asyncio.run(run())
+    finally:
+        pool.shutdown()
+
+
+def test_pool_sizing_defaults() -> None:
+    """Threads are split between workers and the queue defaults to workers."""
+    pool = RenderPool(workers=2, threads_per_render=3)
+    assert pool.capacity == 4
+    assert pool.threads_per_render == 3
@@ -0,0 +1,76 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from pathlib import Path
+
+import numpy as np
+import pytest
+from moviepy import VideoFileClip
+from PIL import Image
+
+from app.utils.fake_backends import FakeBackendConfig, FakeImageModel, _tone_mp3
+from app.utils.renditions import (
+    RENDITIONS,
+    render_renditions,
+    rendition_frame_size,
+    smart_crop,
+)
+from app.utils.video import ENCODING_PROFILES
+
+
+def test_smart_crop_keeps_the_detailed_region() -> None:
+    """A vertical crop of a landscape image moves onto its detail."""
+    pixels = np.full((90, 160), 128, dtype=np.uint8)
+    rng = np.random.default_rng(0)
+    pixels[:, 110:150] = rng.integers(0, 256, size=(90, 40))
+    left, top, width, height = smart_crop(Image.fromarray(pixels), RENDITIONS["9:16"])
+
+    assert (top, height) == (0, 90)
+    assert width == 50
+    assert left <= 110 and left + width >= 150
+
+    # Without any detail, the crop stays centred.
+    flat = Image.new("L", (160, 90), 128)
+    assert smart_crop(flat, RENDITIONS["1:1"]) == (35, 0, 90, 90)
+
+
+def test_renditions_rendered_in_one_pass(tmp_path: Path) -> None:
+    """Every rendition is cropped to its aspect ratio and spans the narration."""
+    image = tmp_path / "image.png"
+    model = FakeImageModel(FakeBackendConfig(image_width=64, image_height=36))
+    image.write_bytes(model.generate_images(prompt="tides")[0]._image_bytes)
+    audio = tmp_path / "audio.mp3"
+    audio.write_bytes(_tone_mp3(10))
+    outputs = {
+        name: str(tmp_path / f"{name.replace(':', 'x')}.mp4") for name in RENDITIONS
+    }
+    profile = ENCODING_PROFILES["draft"]
+
+    result = render_renditions(str(image), str(audio), outputs, profile, threads=1)
+
+    assert result["duration_s"] == pytest.approx(1.0, abs=0.1)
+    assert rendition_frame_size((1408, 768), RENDITIONS["9:16"], profile) == (360, 640)
+    for name, path in outputs.items():
+        with VideoFileClip(path) as video:
+            assert tuple(video.size) == rendition_frame_size(
+                (64, 36), RENDITIONS[name], profile
+            )
+            assert video.duration == pytest.approx(1.0, abs=0.15)
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "16x9.mp4",
+        "1x1.mp4",
+        "9x16.mp4",
+        "audio.mp3",
+        "image.png",
+    ]
@@ -0,0 +1,112 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import threading
+from collections.abc import Iterator
+from http.server import ThreadingHTTPServer
+
+import pytest
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from app.agents.research import ResearchMergeAgent
+from app.utils.fake_backends import FakeBackendConfig, _PageHandler
+
+
+@pytest.fixture
+def base_url() -> Iterator[str]:
+    """Serves fake article pages on a local port."""
+    _PageHandler.config = FakeBackendConfig(page_kb=2)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _PageHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    yield f"http://{host!s}:{port}"
+    server.shutdown()
+    server.server_close()
+
+
+def _merge(state: dict) -> str:
+    """Runs the merge agent on search results; returns the merged research."""
+
+    async def run() -> str:
+        sessions = InMemorySessionService()
+        runner = Runner(
+            app_name="app",
+            agent=ResearchMergeAgent(
+                name="research_merge_agent",
+                search_agent_names=["search_agent_1", "search_agent_2"],
+            ),
+            session_service=sessions,
+        )
+        session = await sessions.create_session(
+            app_name="app", user_id="u", state=state
+        )
+        async for _ in runner.run_async(
+            user_id="u",
+            session_id=session.id,
+            new_message=types.Content(role="user", parts=[types.Part(text="go")]),
+        ):
+            pass
+        finished = await sessions.get_session(
+            app_name="app", user_id="u", session_id=session.id
+        )
+        assert finished is not None
+        return finished.state["research"]
+
+    return asyncio.run(run())
+
+
+def test_merge_is_in_query_order_and_deduplicated(base_url: str) -> None:
+    """Sources are fetched once each and listed in query order."""
+    state = {
+        "research_query_0": "tides",
+        "research_query_1": "moon",
+        "search_results_0": f"Tides: {base_url}/article/2 and {base_url}/article/1.",
+        "search_results_1": f"Moon: {base_url}/article/1, {base_url}/article/3",
+    }
+
+    research = _merge(state)
+    assert research.index("Query 1: tides") < research.index("Query 2: moon")
+    sources = [
+        line.split()[-1] for line in research.splitlines() if line.startswith("### [")
+    ]
+    assert sources == [f"{base_url}/article/{i}" for i in (2, 1, 3)]
+    assert "<script>" not in research and "tracking" not in research
+
+
+def test_source_kept_whole_when_summary_fails(
+    base_url: str, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """A source whose summary fails is merged as extracted; the others are summarized."""
+    _PageHandler.config = FakeBackendConfig(page_kb=40)
+
+    async def summarize_document(text: str, n: int) -> str:
+        if n == 1:
+            raise RuntimeError("quota exceeded")
+        return f"Digest of source {n}."
+
+    monkeypatch.setattr("app.agents.research.summarize_document", summarize_document)
+    research = _merge(
+        {
+            "research_query_0": "tides",
+            "research_query_1": "moon",
+            "search_results_0": f"Tides: {base_url}/article/1 and {base_url}/article/2.",
+            "search_results_1": "",
+        }
+    )
+    first, second = research.split("### [2]")
+    assert "digest of" not in first and len(first) > 20000
+    assert "Digest of source 2." in second
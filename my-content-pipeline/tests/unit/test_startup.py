@@ -0,0 +1,75 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import threading
+import time
+
+from app.utils import startup as startup_module
+from app.utils.startup import Startup, process_started_at
+
+
+def test_startup_checks_run_concurrently() -> None:
+    """Checks run side by side, and the server is ready once the required ones succeeded."""
+    barrier = threading.Barrier(2, timeout=5)
+    startup = Startup(started_at=time.time())
+    startup.add("bucket", barrier.wait)
+    startup.add("logging", barrier.wait)
+    assert startup.report()["ready"] is False
+
+    asyncio.run(startup.run())
+
+    report = startup.report()
+    assert report["ready"] and startup.ready
+    assert report["ready_after_s"] is not None and report["ready_after_s"] >= 0
+    assert {c["status"] for c in report["checks"].values()} == {"ok"}
+
+
+def test_optional_check_failures() -> None:
+    """A failed optional check is reported, and not retried."""
+
+    def fail() -> None:
+        raise ConnectionError("unreachable")
+
+    startup = Startup(started_at=time.time())
+    startup.add("bucket", lambda: None)
+    startup.add("tracing", fail, required=False)
+    asyncio.run(startup.run())
+    assert startup.ready
+    assert startup.report()["checks"]["tracing"]["status"] == "failed"
+    assert "unreachable" in startup.report()["checks"]["tracing"]["error"]
+
+    assert startup.report()["checks"]["tracing"]["attempts"] == 1
+
+
+def test_required_checks_retried() -> None:
+    """A required check that fails is retried until it succeeds."""
+    failures = iter([ConnectionError("503"), TimeoutError("metadata server")])
+
+    def flaky() -> None:
+        if error := next(failures, None):
+            raise error
+
+    startup = Startup(started_at=time.time(), retry_initial_s=0.01)
+    startup.add("bucket", flaky)
+    asyncio.run(startup.run())
+    check = startup.report()["checks"]["bucket"]
+    assert startup.ready
+    assert (check["status"], check["attempts"]) == ("ok", 3)
+    assert "metadata server" in check["error"]
+
+
+def test_process_start_time_precedes_imports() -> None:
+    """Cold start is measured from the process start, before any import."""
+    assert process_started_at() <= startup_module._imported_at
@@ -0,0 +1,75 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import re
+from collections.abc import AsyncGenerator
+
+from google.adk.models import BaseLlm, LlmRequest, LlmResponse
+from google.adk.models.registry import LLMRegistry
+from google.genai import types
+
+from app.utils.summarize import chunk_text, citations, summarize_document
+
+
+class _FirstWordsLlm(BaseLlm):
+    """Summarizes by keeping the first words and every citation tag."""
+
+    calls: int = 0
+
+    @classmethod
+    def supported_models(cls) -> list[str]:
+        return ["test-summarizer"]
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        prompt = "".join(
+            part.text or "" for part in llm_request.contents[-1].parts or []
+        )
+        tags = re.findall(r"\[\d+:\d+-\d+\]", prompt)
+        words = re.sub(r"\[\d+:\d+-\d+\]", "", prompt).split()[:30]
+        yield LlmResponse(
+            content=types.Content(
+                role="model", parts=[types.Part.from_text(text=" ".join(words + tags))]
+            )
+        )
+
+
+def test_chunks_cover_text_at_sentence_boundaries() -> None:
+    text = " ".join(f"Sentence number {i} is here." for i in range(400))
+    chunks = chunk_text(text, chunk_chars=1000)
+    assert "".join(c.text for c in chunks) == text
+    assert all(len(c.text) <= 1000 for c in chunks)
+    assert all(c.text.endswith(". ") for c in chunks[:-1])
+    assert [c.start for c in chunks[1:]] == [c.end for c in chunks[:-1]]
+
+
+def test_digest_is_bounded_and_cites_chunks() -> None:
+    """However long the source, the digest fits and cites every chunk."""
+    LLMRegistry.register(_FirstWordsLlm)
+    text = "\n\n".join(f"Paragraph {i}. " + "tide " * 150 for i in range(200))
+    digest = asyncio.run(
+        summarize_document(
+            text,
+            source_id=3,
+            model="test-summarizer",
+            chunk_chars=4000,
+            digest_chars=1500,
+        )
+    )
+    assert len(digest) <= 1500
+    tags = citations(digest)
+    assert tags[0] == "[3:0-" + tags[0].split("-")[1]
+    assert all(tag.startswith("[3:") for tag in tags)
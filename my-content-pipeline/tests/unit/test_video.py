@@ -0,0 +1,122 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from pathlib import Path
+
+import pytest
+from moviepy import VideoFileClip
+
+from app.utils.fake_backends import FakeBackendConfig, FakeImageModel, _tone_mp3
+from app.utils.segment_cache import SegmentCache
+from app.utils.video import (
+    ENCODING_PROFILES,
+    concat_segments,
+    load_frame,
+    render_segment,
+    render_video,
+)
+
+
+@pytest.fixture
+def section_assets(tmp_path: Path) -> list[tuple[str, str]]:
+    """Two sections of small fake images and tones of different lengths."""
+    model = FakeImageModel(FakeBackendConfig(image_width=64, image_height=36))
+    assets = []
+    for i, tenths in enumerate((10, 15)):
+        image = tmp_path / f"image_{i}.png"
+        image.write_bytes(model.generate_images(prompt=f"section {i}")[0]._image_bytes)
+        audio = tmp_path / f"audio_{i}.mp3"
+        audio.write_bytes(_tone_mp3(tenths))
+        assets.append((str(image), str(audio)))
+    return assets
+
+
+def test_segments_concatenate_without_reencoding(
+    tmp_path: Path, section_assets: list[tuple[str, str]]
+) -> None:
+    """Segments joined by stream copy play back for the sum of their lengths."""
+    segments = []
+    for i, (image, audio) in enumerate(section_assets):
+        segment = str(tmp_path / f"segment_{i}.mp4")
+        result = render_segment(image, audio, segment, size=(64, 36), threads=1)
+        assert result["duration_s"] > 0
+        segments.append(segment)
+
+    video_path = str(tmp_path / "video.mp4")
+    concat_segments(segments, video_path)
+    with VideoFileClip(video_path) as video:
+        assert video.size == [64, 36]
+        assert video.duration == pytest.approx(2.5, abs=0.15)
+
+
+def test_segment_cache_keys_follow_content(
+    tmp_path: Path, section_assets: list[tuple[str, str]]
+) -> None:
+    """Keys change with the assets and the frame size, and LRU pruning evicts."""
+    cache = SegmentCache(str(tmp_path / "cache"), max_bytes=10)
+    standard, draft = ENCODING_PROFILES["standard"], ENCODING_PROFILES["draft"]
+    (image_0, audio_0), (image_1, audio_1) = section_assets
+    key = cache.key(image_0, audio_0, (64, 36), standard)
+    assert key == cache.key(image_0, audio_0, (64, 36), standard)
+    assert key != cache.key(image_1, audio_0, (64, 36), standard)
+    assert key != cache.key(image_0, audio_0, (32, 18), standard)
+    assert key != cache.key(image_0, audio_0, (64, 36), draft)
+
+    assert cache.get(key) is None
+    Path(cache.path(key)).write_bytes(b"x" * 8)
+    assert cache.get(key) == cache.path(key)
+    other = cache.key(image_1, audio_1, (64, 36), standard)
+    Path(cache.path(other)).write_bytes(b"x" * 8)
+    cache.prune()
+    assert sum(cache.get(k) is not None for k in (key, other)) == 1
+
+
+def test_draft_profile_renders_smaller_and_slower_frames(
+    tmp_path: Path, section_assets: list[tuple[str, str]]
+) -> None:
+    """Draft renders are downscaled to 360p at a lower frame rate; nothing is upscaled."""
+    draft = ENCODING_PROFILES["draft"]
+    assert draft.frame_size((1408, 768)) == (660, 360)
+    assert draft.frame_size((64, 36)) == (64, 36)
+    assert ENCODING_PROFILES["high"].frame_size((1408, 768)) == (1408, 768)
+
+    image, audio = section_assets[0]
+    segment = str(tmp_path / "draft.mp4")
+    render_segment(
+        image, audio, segment, size=draft.frame_size((64, 36)), threads=1, profile=draft
+    )
+    with VideoFileClip(segment) as video:
+        assert video.fps == draft.fps
+
+
+def test_timeline_render_decodes_sections_lazily(
+    tmp_path: Path, section_assets: list[tuple[str, str]]
+) -> None:
+    """The timeline render shows each image for its narration and reports its memory."""
+    images, audios = (list(paths) for paths in zip(*section_assets, strict=True))
+    video_path = str(tmp_path / "video.mp4")
+    result = render_video(
+        images, audios, video_path, threads=1, profile=ENCODING_PROFILES["draft"]
+    )
+
+    assert result["duration_s"] == pytest.approx(2.5, abs=0.15)
+    assert result["peak_rss_bytes"] > 0
+    with VideoFileClip(video_path) as video:
+        assert video.size == [64, 36]
+        assert video.duration == pytest.approx(2.5, abs=0.15)
+        assert video.audio is not None
+        # Second image from 1 s on.
+        second = load_frame(images[1])
+        assert abs(video.get_frame(1.5).astype(int) - second).mean() < 20
+    assert sorted(p.name for p in tmp_path.iterdir() if p.suffix == ".m4a") == []
@@ -0,0 +1,73 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+from app.utils.workspace import WorkspaceManager, WorkspaceQuotaExceeded
+
+
+def test_workspace_quota_and_release(tmp_path: Path) -> None:
+    """Writes beyond the quota are rejected and release deletes everything."""
+    manager = WorkspaceManager(str(tmp_path), quota_bytes=100)
+    workspace = manager.get("job-1")
+    path = workspace.write_bytes("images", "a.png", b"x" * 60)
+    assert os.path.dirname(path) == str(tmp_path / "job-1" / "images")
+    with pytest.raises(WorkspaceQuotaExceeded):
+        workspace.write_bytes("images", "b.png", b"x" * 60)
+
+    # Files of unknown size are removed if they turn out not to fit.
+    video = workspace.path("videos", "v.mp4")
+    Path(video).write_bytes(b"x" * 60)
+    with pytest.raises(WorkspaceQuotaExceeded):
+        workspace.check(video)
+    assert not os.path.exists(video)
+    assert manager.bytes_held() == 60
+    workspace.remove(path)
+    assert workspace.bytes_held() == 0
+    workspace.write_bytes("images", "b.png", b"x" * 60)
+
+    manager.release("job-1")
+    assert not manager.exists("job-1")
+    assert manager.bytes_held() == 0
+
+
+def test_sweep_removes_idle_inactive_workspaces(tmp_path: Path) -> None:
+    """Only workspaces that are idle and not in use are swept."""
+    manager = WorkspaceManager(str(tmp_path), max_age_s=60, sweep_interval_s=3600)
+    orphan = tmp_path / "orphan"
+    orphan.mkdir()
+    (orphan / "image.png").write_bytes(b"x")
+    recent = manager.get("recent")
+    recent.write_bytes("audio", "a.mp3", b"x")
+    busy = manager.get("busy")
+    busy.write_bytes("audio", "a.mp3", b"x")
+    # Opening the first workspace started a sweep in the background.
+    assert manager._sweeper is not None
+    manager._sweeper.join(timeout=10)
+    assert sorted(os.listdir(tmp_path)) == ["busy", "orphan", "recent"]
+    stale = time.time() - 120
+    for directory, _, files in os.walk(tmp_path):
+        if "recent" not in directory:
+            for name in [*files, "."]:
+                os.utime(os.path.join(directory, name), (stale, stale))
+
+    with busy.in_use():
+        assert manager.sweep() == 1
+    assert sorted(os.listdir(tmp_path)) == ["busy", "recent"]
+    assert manager.sweep() == 1
+    assert os.listdir(tmp_path) == ["recent"]